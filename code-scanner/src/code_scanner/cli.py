@@ -5,6 +5,7 @@ import json
 from datetime import datetime, timezone
 from pathlib import Path
 
+from code_scanner.compaction import compact_database
 from code_scanner.config import ConfigError, load_config
 from code_scanner.db import Database
 from code_scanner.pipeline import run_scan
@@ -30,6 +31,13 @@ def build_parser() -> argparse.ArgumentParser:
     scan_parser.add_argument("--mode", choices=["full", "incremental"], default="full")
     scan_parser.add_argument("--limit", type=int, default=None)
     scan_parser.add_argument("--repo-regex", default=None)
+    scan_parser.add_argument("--sync-workers", type=int, default=1, help="Parallel clone/fetch threads")
+    scan_parser.add_argument("--scan-workers", type=int, default=1, help="Parallel scan processes")
+    scan_parser.add_argument(
+        "--refresh-discovery",
+        action="store_true",
+        help="Ignore cached provider responses and re-download repo listings",
+    )
 
     report_parser = subparsers.add_parser("report", help="Generate report files from DB")
     report_parser.add_argument("--db-path", default="data/code_scanner.db")
@@ -38,6 +46,21 @@ def build_parser() -> argparse.ArgumentParser:
         default=f"outputs/report-{utc_stamp()}",
     )
     report_parser.add_argument("--run-id", type=int, default=None)
+    report_parser.add_argument(
+        "--new-findings",
+        action="store_true",
+        help="Also write new_findings.csv (queried from the finding history, not the rollups)",
+    )
+
+    compact_parser = subparsers.add_parser("compact", help="Delete old runs and reclaim database space")
+    compact_parser.add_argument("--db-path", default="data/code_scanner.db")
+    compact_parser.add_argument("--keep-last", type=int, default=None, help="Keep the N most recent runs")
+    compact_parser.add_argument("--keep-days", type=int, default=None, help="Keep runs started in the last N days")
+    compact_parser.add_argument(
+        "--full-vacuum",
+        action="store_true",
+        help="Rewrite the whole file (exclusive lock); needed once for databases created by older versions",
+    )
 
     return parser
 
@@ -65,6 +88,9 @@ def main(argv: list[str] | None = None) -> int:
             mode=args.mode,
             limit=args.limit,
             repo_regex=args.repo_regex,
+            sync_workers=args.sync_workers,
+            scan_workers=args.scan_workers,
+            refresh_discovery=args.refresh_discovery,
         )
         print(json.dumps(summary.to_dict(), indent=2, ensure_ascii=True))
         return 0
@@ -74,6 +100,20 @@ def main(argv: list[str] | None = None) -> int:
             db_path=args.db_path,
             output_dir=args.output_dir,
             run_id=args.run_id,
+            include_new_findings=args.new_findings,
+        )
+        print(json.dumps(summary, indent=2, ensure_ascii=True))
+        return 0
+
+    if args.command == "compact":
+        if args.keep_last is None and args.keep_days is None:
+            parser.error("compact needs --keep-last and/or --keep-days")
+            return 2
+        summary = compact_database(
+            db_path=args.db_path,
+            keep_last=args.keep_last,
+            keep_days=args.keep_days,
+            full_vacuum=args.full_vacuum,
         )
         print(json.dumps(summary, indent=2, ensure_ascii=True))
         return 0
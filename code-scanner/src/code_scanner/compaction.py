@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from code_scanner.db import Database
+
+
+DEFAULT_CHUNK_SIZE = 5_000
+# Long enough to wait out a scan's grouped commit.
+BUSY_TIMEOUT_SECONDS = 60.0
+# Rows sampled per index by ANALYZE, so statistics stay cheap on a multi-GB database.
+ANALYSIS_LIMIT = 1000
+# Deleted before their runs so the ON DELETE CASCADE has nothing left to fan out into.
+_RUN_CHILD_TABLES = ("run_top_findings", "run_signal_rollup", "run_repo_rollup", "run_repos")
+
+
+def compact_database(
+    *,
+    db_path: str,
+    keep_last: int | None = None,
+    keep_days: int | None = None,
+    full_vacuum: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict:
+    """Delete old runs and the history only they can see, then reclaim space.
+
+    A run is kept if it is one of the ``keep_last`` most recent runs, started within
+    ``keep_days``, is the latest scan of any repo, or is still running. Every delete
+    touches at most ``chunk_size`` rows per transaction, so a scan writing in WAL mode
+    at the same time only waits for one chunk.
+    """
+    if keep_last is None and keep_days is None:
+        raise ValueError("Set keep_last and/or keep_days")
+
+    db = Database(db_path, busy_timeout_seconds=BUSY_TIMEOUT_SECONDS)
+    db.init_schema()
+    try:
+        kept = _kept_run_ids(db, keep_last=keep_last, keep_days=keep_days)
+        expired = [int(row["id"]) for row in db.query("SELECT id FROM scan_runs ORDER BY id")]
+        expired = [run_id for run_id in expired if run_id not in kept]
+
+        for start in range(0, len(expired), chunk_size):
+            batch = expired[start : start + chunk_size]
+            placeholders = ", ".join("?" * len(batch))
+            for table in _RUN_CHILD_TABLES:
+                _delete_in_batches(db, table, f"run_id IN ({placeholders})", batch, chunk_size)
+            db.conn.execute(f"DELETE FROM scan_runs WHERE id IN ({placeholders})", batch)
+            db.commit()
+
+        deleted_spans = _delete_unreachable_spans(db, chunk_size)
+        deleted_paths = _delete_orphans(
+            db,
+            "file_paths",
+            "SELECT 1 FROM finding_spans WHERE finding_spans.path_id = file_paths.id",
+            chunk_size,
+        )
+        deleted_commits = _delete_orphans(
+            db,
+            "commits",
+            "SELECT 1 FROM run_repos WHERE run_repos.commit_id = commits.id",
+            chunk_size,
+        )
+
+        freed_pages, vacuum = _reclaim_space(db, full_vacuum=full_vacuum, chunk_size=chunk_size)
+        _analyze(db)
+
+        return {
+            "db_path": str(Path(db_path).resolve()),
+            "kept_runs": len(kept),
+            "deleted_runs": len(expired),
+            "deleted_finding_spans": deleted_spans,
+            "deleted_file_paths": deleted_paths,
+            "deleted_commits": deleted_commits,
+            "freed_pages": freed_pages,
+            "vacuum": vacuum,
+        }
+    finally:
+        db.close()
+
+
+def _kept_run_ids(db: Database, *, keep_last: int | None, keep_days: int | None) -> set[int]:
+    kept = {int(row["id"]) for row in db.query("SELECT id FROM scan_runs WHERE status = 'RUNNING'")}
+    kept.update(
+        int(row["run_id"]) for row in db.query("SELECT MAX(run_id) AS run_id FROM run_repos GROUP BY repo_id")
+    )
+    kept.update(
+        int(row["last_run_id"])
+        for row in db.query("SELECT last_run_id FROM repo_scan_state WHERE last_run_id IS NOT NULL")
+    )
+    if keep_last is not None and keep_last > 0:
+        rows = db.query("SELECT id FROM scan_runs ORDER BY id DESC LIMIT ?", (int(keep_last),))
+        kept.update(int(row["id"]) for row in rows)
+    if keep_days is not None:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=keep_days)).isoformat()
+        rows = db.query("SELECT id FROM scan_runs WHERE started_at >= ?", (cutoff,))
+        kept.update(int(row["id"]) for row in rows)
+    return kept
+
+
+def _delete_in_batches(db: Database, table: str, where: str, params: list, chunk_size: int) -> int:
+    """Delete matching rows at most ``chunk_size`` at a time, committing after each batch."""
+    deleted = 0
+    while True:
+        cursor = db.conn.execute(
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT ?)",
+            [*params, chunk_size],
+        )
+        db.commit()
+        if cursor.rowcount <= 0:
+            return deleted
+        deleted += cursor.rowcount
+
+
+def _delete_orphans(db: Database, table: str, referenced: str, chunk_size: int) -> int:
+    """Delete rows of a lookup table nothing refers to, one id range per transaction."""
+    max_id = db.query(f"SELECT MAX(id) FROM {table}")[0][0] or 0
+    deleted = 0
+    for start in range(0, int(max_id), chunk_size):
+        cursor = db.conn.execute(
+            f"DELETE FROM {table} WHERE id > ? AND id <= ? AND NOT EXISTS ({referenced})",
+            (start, start + chunk_size),
+        )
+        deleted += cursor.rowcount
+        db.commit()
+    return deleted
+
+
+def _delete_unreachable_spans(db: Database, chunk_size: int) -> int:
+    """Delete resolved spans that no remaining scan of their repo falls inside."""
+    deleted = 0
+    last_id = 0
+    while True:
+        candidates = db.query(
+            """
+            SELECT id FROM finding_spans
+            WHERE id > ? AND resolved_run_id IS NOT NULL
+            ORDER BY id
+            LIMIT ?
+            """,
+            (last_id, chunk_size),
+        )
+        if not candidates:
+            return deleted
+        last_id = int(candidates[-1]["id"])
+        placeholders = ", ".join("?" * len(candidates))
+        cursor = db.conn.execute(
+            f"""
+            DELETE FROM finding_spans
+            WHERE id IN ({placeholders})
+              AND NOT EXISTS (
+                  SELECT 1 FROM run_repos rr
+                  WHERE rr.repo_id = finding_spans.repo_id
+                    AND rr.run_id >= finding_spans.first_run_id
+                    AND rr.run_id < finding_spans.resolved_run_id
+              )
+            """,
+            [int(row["id"]) for row in candidates],
+        )
+        deleted += cursor.rowcount
+        db.commit()
+
+
+def _analyze(db: Database) -> None:
+    """Refresh planner statistics one table per transaction, sampling a bounded number of rows."""
+    db.conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    tables = db.query("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+    for row in tables:
+        db.conn.execute(f'ANALYZE "{row["name"]}"')
+        db.commit()
+
+
+def _reclaim_space(db: Database, *, full_vacuum: bool, chunk_size: int) -> tuple[int, str]:
+    """Return (pages freed, how) after releasing free pages to the filesystem."""
+    free_before = int(db.query("PRAGMA freelist_count")[0][0])
+    if full_vacuum:
+        # VACUUM rewrites the whole file under an exclusive lock, and is the only way to
+        # switch a database created before incremental vacuum support.
+        db.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        db.conn.execute("VACUUM")
+        return free_before, "full"
+
+    if int(db.query("PRAGMA auto_vacuum")[0][0]) != 2:
+        return 0, "unavailable"
+    while int(db.query("PRAGMA freelist_count")[0][0]) > 0:
+        db.conn.execute(f"PRAGMA incremental_vacuum({int(chunk_size)})").fetchall()
+        db.commit()
+    return free_before, "incremental"
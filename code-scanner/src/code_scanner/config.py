@@ -3,7 +3,16 @@ from __future__ import annotations
 import json
 from pathlib import Path
 
-from code_scanner.models import AppConfig, ProviderSettings, ScanSettings, SignalRule
+from code_scanner.models import (
+    DEFAULT_BRANCH_SOURCES,
+    DEFAULT_EXCLUDE_DIR_NAMES,
+    JOURNAL_MODES,
+    SYNC_MODES,
+    AppConfig,
+    ProviderSettings,
+    ScanSettings,
+    SignalRule,
+)
 
 
 class ConfigError(ValueError):
@@ -32,6 +41,11 @@ def load_config(path: str | Path) -> AppConfig:
             raise ConfigError("Provider entry is missing 'type'")
         if not name:
             raise ConfigError("Provider entry is missing 'name'")
+        default_branch_source = str(item.get("default_branch_source", "api")).strip()
+        if default_branch_source not in DEFAULT_BRANCH_SOURCES:
+            raise ConfigError(
+                f"'default_branch_source' must be one of: {', '.join(DEFAULT_BRANCH_SOURCES)}"
+            )
 
         providers.append(
             ProviderSettings(
@@ -45,6 +59,9 @@ def load_config(path: str | Path) -> AppConfig:
                 root_dir=_optional_str(item.get("root_dir")),
                 recursive=bool(item.get("recursive", False)),
                 use_token_for_clone=bool(item.get("use_token_for_clone", False)),
+                discovery_workers=max(1, int(item.get("discovery_workers", 8))),
+                default_branch_source=default_branch_source,
+                default_branch_cache_ttl_seconds=int(item.get("default_branch_cache_ttl_seconds", 24 * 60 * 60)),
             )
         )
 
@@ -57,14 +74,35 @@ def load_config(path: str | Path) -> AppConfig:
         exclude_repo_patterns=tuple(_ensure_string_list(scan_raw.get("exclude_repo_patterns", []))),
         max_file_size_bytes=int(scan_raw.get("max_file_size_bytes", 500_000)),
         max_files_per_repo=int(scan_raw.get("max_files_per_repo", 40_000)),
+        exclude_dir_names=tuple(
+            _ensure_string_list(scan_raw.get("exclude_dir_names", list(DEFAULT_EXCLUDE_DIR_NAMES)))
+        ),
+        content_cache_max_bytes=int(scan_raw.get("content_cache_max_bytes", 64 * 1024 * 1024)),
+        max_matches_per_rule=int(scan_raw.get("max_matches_per_rule", 10_000)),
+        file_workers=max(1, int(scan_raw.get("file_workers", 1))),
     )
 
+    sync_mode = str(raw.get("sync_mode", "worktree")).strip()
+    if sync_mode not in SYNC_MODES:
+        raise ConfigError(f"'sync_mode' must be one of: {', '.join(SYNC_MODES)}")
+
+    db_journal_mode = str(raw.get("db_journal_mode", "wal")).strip().lower()
+    if db_journal_mode not in JOURNAL_MODES:
+        raise ConfigError(f"'db_journal_mode' must be one of: {', '.join(JOURNAL_MODES)}")
+
     return AppConfig(
         db_path=str(raw.get("db_path", "data/code_scanner.db")),
         repo_cache_dir=str(raw.get("repo_cache_dir", "repo_cache")),
         rules_path=str(raw.get("rules_path", "configs/default_rules.json")),
         providers=tuple(providers),
         scan=scan,
+        findings_cache_path=_optional_str(raw.get("findings_cache_path")),
+        sync_mode=sync_mode,
+        discovery_cache_ttl_seconds=int(raw.get("discovery_cache_ttl_seconds", 15 * 60)),
+        repo_list_ttl_seconds=int(raw.get("repo_list_ttl_seconds", 60 * 60)),
+        db_journal_mode=db_journal_mode,
+        db_commit_interval_seconds=float(raw.get("db_commit_interval_seconds", 2.0)),
+        db_compress_evidence=bool(raw.get("db_compress_evidence", False)),
     )
 
 
@@ -1,27 +1,181 @@
 from __future__ import annotations
 
+import hashlib
 import sqlite3
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterable, Iterator
 
-from code_scanner.models import Finding, RepoDescriptor
+from code_scanner.models import JOURNAL_MODES, Finding, RepoDescriptor
+
+
+SCHEMA_VERSION = 2
+
+# Rows kept per run for the top findings report.
+TOP_FINDINGS_LIMIT = 2000
+
+# Spans ``f`` that a run opened or closed. A span reopened in the same run only moved or
+# changed, so it is neither new nor resolved. Each takes the run id as its one parameter.
+NEW_SPAN_CONDITION = """
+    f.first_run_id = ?
+    AND NOT EXISTS (
+        SELECT 1 FROM finding_spans prior
+        WHERE prior.repo_id = f.repo_id
+          AND prior.fingerprint = f.fingerprint
+          AND prior.resolved_run_id = f.first_run_id
+    )
+"""
+RESOLVED_SPAN_CONDITION = """
+    f.resolved_run_id = ?
+    AND NOT EXISTS (
+        SELECT 1 FROM finding_spans later
+        WHERE later.repo_id = f.repo_id
+          AND later.fingerprint = f.fingerprint
+          AND later.first_run_id = f.resolved_run_id
+    )
+"""
+
+# Evidence shorter than this is stored as-is; zlib's header would outweigh any saving.
+_MIN_COMPRESSED_EVIDENCE = 64
+
+# Stays well under SQLite's bound-parameter limit.
+_LOOKUP_BATCH = 500
+
+
+# UPSERT ... RETURNING needs SQLite 3.35; older builds fall back to a SELECT.
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+_UPSERT_REPO_SQL = """
+    INSERT INTO repos (
+        provider_name,
+        provider_type,
+        external_id,
+        full_name,
+        clone_url,
+        default_branch,
+        web_url,
+        local_path,
+        last_seen_at,
+        clone_auth_user
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(provider_name, external_id) DO UPDATE SET
+        full_name = excluded.full_name,
+        clone_url = excluded.clone_url,
+        default_branch = excluded.default_branch,
+        web_url = excluded.web_url,
+        local_path = excluded.local_path,
+        last_seen_at = excluded.last_seen_at,
+        clone_auth_user = excluded.clone_auth_user
+"""
 
 
 def utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+class GroupCommitError(RuntimeError):
+    """A group transaction could not be committed and its writes were rolled back."""
+
+
 class Database:
-    def __init__(self, db_path: str | Path):
+    """SQLite store for runs, repos and findings.
+
+    ``journal_mode`` (for example ``"wal"``) is applied on open; WAL also relaxes
+    ``synchronous`` to NORMAL. With ``commit_interval_seconds`` above zero, writes are
+    grouped into one transaction that is committed at most that often; each write
+    method is still atomic on its own, so a crash loses whole writes, never part of one.
+    Runs are always committed when they start and finish.
+
+    Findings are stored as spans: each ``finding_spans`` row is one finding, identified
+    by a fingerprint, from the run that first saw it until the run that resolved it
+    (NULL while it is current). ``run_repos`` lists the repos each run scanned, so the
+    ``findings`` view can rebuild any run's full finding set. Signals, detectors, paths
+    and commits are integer keys into lookup tables. ``compress_evidence`` stores longer evidence
+    zlib-compressed; the view decompresses it through the ``evidence_text`` function
+    registered on every connection.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        *,
+        journal_mode: str | None = None,
+        commit_interval_seconds: float = 0.0,
+        compress_evidence: bool = False,
+        busy_timeout_seconds: float = 5.0,
+    ):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = sqlite3.connect(self.db_path, timeout=busy_timeout_seconds)
         self.conn.row_factory = sqlite3.Row
         self.conn.execute("PRAGMA foreign_keys = ON")
+        if self.conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+            # Can only be chosen before the first table exists; lets compaction return
+            # free pages gradually.
+            self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.conn.create_function("evidence_text", 1, _evidence_text, deterministic=True)
+        if journal_mode is not None:
+            if journal_mode not in JOURNAL_MODES:
+                raise ValueError(f"journal_mode must be one of: {', '.join(JOURNAL_MODES)}")
+            self.conn.execute(f"PRAGMA journal_mode = {journal_mode.upper()}")
+            if journal_mode == "wal":
+                # In WAL mode NORMAL cannot corrupt the database; a power loss only drops
+                # the most recent commits.
+                self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.commit_interval_seconds = commit_interval_seconds
+        self.compress_evidence = compress_evidence
+        self._last_commit = time.monotonic()
 
     def close(self) -> None:
+        self.commit()
         self.conn.close()
 
+    def commit(self) -> None:
+        try:
+            self.conn.commit()
+        except sqlite3.Error as exc:
+            self.conn.rollback()
+            self._last_commit = time.monotonic()
+            raise GroupCommitError(f"Commit failed, uncommitted writes were rolled back: {exc}") from exc
+        self._last_commit = time.monotonic()
+
+    def _commit_if_due(self) -> None:
+        """Commit the open group transaction once ``commit_interval_seconds`` have passed."""
+        if self.conn.in_transaction and time.monotonic() - self._last_commit >= self.commit_interval_seconds:
+            self.commit()
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        """Run one atomic write inside the current group transaction.
+
+        A failed write undoes only itself, and the rest of the group is committed right
+        away so no transaction stays open after an error. Callers already act on the
+        group's earlier writes (repo ids, recorded repos), so those are never dropped
+        silently: if the commit itself fails, ``GroupCommitError`` is raised.
+        """
+        if not self.conn.in_transaction:
+            # IMMEDIATE takes the write lock up front, so a busy database fails here,
+            # before anything has been written, rather than on a stale read snapshot.
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._last_commit = time.monotonic()
+        self.conn.execute("SAVEPOINT write")
+        try:
+            yield
+        except BaseException:
+            # The group has held the write lock since BEGIN IMMEDIATE, so its earlier
+            # writes are still valid after this one is undone.
+            self.conn.execute("ROLLBACK TO write")
+            self.conn.execute("RELEASE write")
+            self.commit()
+            raise
+        self.conn.execute("RELEASE write")
+        self._commit_if_due()
+
     def init_schema(self) -> None:
         self.conn.executescript(
             """
@@ -50,9 +204,16 @@ class Database:
                 web_url TEXT,
                 local_path TEXT,
                 last_seen_at TEXT NOT NULL,
+                clone_auth_user TEXT,
                 UNIQUE(provider_name, external_id)
             );
 
+            CREATE TABLE IF NOT EXISTS provider_listings (
+                provider_name TEXT PRIMARY KEY,
+                settings_key TEXT NOT NULL,
+                listed_at TEXT NOT NULL
+            );
+
             CREATE TABLE IF NOT EXISTS repo_scan_state (
                 repo_id INTEGER PRIMARY KEY,
                 last_commit_sha TEXT,
@@ -62,11 +223,83 @@ class Database:
                 FOREIGN KEY(last_run_id) REFERENCES scan_runs(id)
             );
 
-            CREATE TABLE IF NOT EXISTS findings (
+            CREATE TABLE IF NOT EXISTS signals (
+                id INTEGER PRIMARY KEY,
+                signal_code TEXT NOT NULL,
+                category TEXT NOT NULL,
+                severity TEXT NOT NULL,
+                UNIQUE(signal_code, category, severity)
+            );
+
+            CREATE TABLE IF NOT EXISTS detectors (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            );
+
+            CREATE TABLE IF NOT EXISTS file_paths (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE
+            );
+
+            CREATE TABLE IF NOT EXISTS commits (
+                id INTEGER PRIMARY KEY,
+                sha TEXT NOT NULL UNIQUE
+            );
+
+            CREATE TABLE IF NOT EXISTS run_repos (
+                run_id INTEGER NOT NULL,
+                repo_id INTEGER NOT NULL,
+                commit_id INTEGER,
+                findings_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY(run_id, repo_id),
+                FOREIGN KEY(run_id) REFERENCES scan_runs(id) ON DELETE CASCADE,
+                FOREIGN KEY(repo_id) REFERENCES repos(id) ON DELETE CASCADE,
+                FOREIGN KEY(commit_id) REFERENCES commits(id)
+            );
+
+            CREATE TABLE IF NOT EXISTS finding_spans (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                repo_id INTEGER NOT NULL,
+                fingerprint BLOB NOT NULL,
+                path_id INTEGER NOT NULL,
+                line_number INTEGER,
+                signal_id INTEGER NOT NULL,
+                detector_id INTEGER NOT NULL,
+                confidence REAL NOT NULL,
+                evidence,
+                first_run_id INTEGER NOT NULL,
+                resolved_run_id INTEGER,
+                FOREIGN KEY(repo_id) REFERENCES repos(id) ON DELETE CASCADE,
+                FOREIGN KEY(path_id) REFERENCES file_paths(id),
+                FOREIGN KEY(signal_id) REFERENCES signals(id),
+                FOREIGN KEY(detector_id) REFERENCES detectors(id)
+            );
+
+            CREATE TABLE IF NOT EXISTS run_repo_rollup (
                 run_id INTEGER NOT NULL,
                 repo_id INTEGER NOT NULL,
-                commit_sha TEXT,
+                finding_count INTEGER NOT NULL,
+                high_count INTEGER NOT NULL,
+                medium_count INTEGER NOT NULL,
+                low_count INTEGER NOT NULL,
+                PRIMARY KEY(run_id, repo_id),
+                FOREIGN KEY(run_id) REFERENCES scan_runs(id) ON DELETE CASCADE,
+                FOREIGN KEY(repo_id) REFERENCES repos(id) ON DELETE CASCADE
+            );
+
+            CREATE TABLE IF NOT EXISTS run_signal_rollup (
+                run_id INTEGER NOT NULL,
+                signal_id INTEGER NOT NULL,
+                finding_count INTEGER NOT NULL,
+                PRIMARY KEY(run_id, signal_id),
+                FOREIGN KEY(run_id) REFERENCES scan_runs(id) ON DELETE CASCADE,
+                FOREIGN KEY(signal_id) REFERENCES signals(id)
+            );
+
+            CREATE TABLE IF NOT EXISTS run_top_findings (
+                run_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                repo TEXT NOT NULL,
                 file_path TEXT NOT NULL,
                 line_number INTEGER,
                 signal_code TEXT NOT NULL,
@@ -75,18 +308,140 @@ class Database:
                 detector TEXT NOT NULL,
                 confidence REAL NOT NULL,
                 evidence TEXT,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY(run_id) REFERENCES scan_runs(id) ON DELETE CASCADE,
-                FOREIGN KEY(repo_id) REFERENCES repos(id) ON DELETE CASCADE
+                PRIMARY KEY(run_id, position),
+                FOREIGN KEY(run_id) REFERENCES scan_runs(id) ON DELETE CASCADE
             );
 
-            CREATE INDEX IF NOT EXISTS idx_findings_run_id ON findings(run_id);
-            CREATE INDEX IF NOT EXISTS idx_findings_repo_id ON findings(repo_id);
-            CREATE INDEX IF NOT EXISTS idx_findings_signal_code ON findings(signal_code);
-            CREATE INDEX IF NOT EXISTS idx_findings_severity ON findings(severity);
+            CREATE INDEX IF NOT EXISTS idx_run_repos_repo_run ON run_repos(repo_id, run_id);
+            CREATE INDEX IF NOT EXISTS idx_finding_spans_repo_first_run ON finding_spans(repo_id, first_run_id);
+            CREATE INDEX IF NOT EXISTS idx_finding_spans_repo_fingerprint ON finding_spans(repo_id, fingerprint);
+            CREATE INDEX IF NOT EXISTS idx_finding_spans_first_run ON finding_spans(first_run_id);
+            CREATE INDEX IF NOT EXISTS idx_finding_spans_resolved_run ON finding_spans(resolved_run_id);
+            CREATE INDEX IF NOT EXISTS idx_finding_spans_signal_id ON finding_spans(signal_id);
+            CREATE INDEX IF NOT EXISTS idx_finding_spans_path_id ON finding_spans(path_id);
+            CREATE INDEX IF NOT EXISTS idx_run_repos_commit_id ON run_repos(commit_id);
             """
         )
-        self.conn.commit()
+        self._add_column_if_missing("repos", "clone_auth_user", "TEXT")
+        # States written before fingerprints existed hold NULL, forcing one full rescan.
+        self._add_column_if_missing("repo_scan_state", "scan_fingerprint", "TEXT")
+        # Runs finished before rollups existed keep 0 and are reported from the findings view.
+        self._add_column_if_missing("scan_runs", "rollups_ready", "INTEGER NOT NULL DEFAULT 0")
+        # NULL for runs finished before these counts were stored; reports then count live.
+        self._add_column_if_missing("scan_runs", "new_findings", "INTEGER")
+        self._add_column_if_missing("scan_runs", "resolved_findings", "INTEGER")
+        self._migrate_findings_history()
+        self.conn.executescript(
+            """
+            CREATE VIEW IF NOT EXISTS findings AS
+            SELECT
+                f.id,
+                rr.run_id,
+                rr.repo_id,
+                c.sha AS commit_sha,
+                p.path AS file_path,
+                f.line_number,
+                s.signal_code,
+                s.category,
+                s.severity,
+                d.name AS detector,
+                f.confidence,
+                evidence_text(f.evidence) AS evidence,
+                r.started_at AS created_at
+            FROM run_repos rr
+            JOIN scan_runs r ON r.id = rr.run_id
+            JOIN finding_spans f
+                ON f.repo_id = rr.repo_id
+                AND f.first_run_id <= rr.run_id
+                AND (f.resolved_run_id IS NULL OR f.resolved_run_id > rr.run_id)
+            JOIN file_paths p ON p.id = f.path_id
+            JOIN signals s ON s.id = f.signal_id
+            JOIN detectors d ON d.id = f.detector_id
+            LEFT JOIN commits c ON c.id = rr.commit_id;
+
+            CREATE VIEW IF NOT EXISTS current_findings AS
+            SELECT
+                f.id,
+                f.repo_id,
+                lower(hex(f.fingerprint)) AS fingerprint,
+                f.first_run_id,
+                p.path AS file_path,
+                f.line_number,
+                s.signal_code,
+                s.category,
+                s.severity,
+                d.name AS detector,
+                f.confidence,
+                evidence_text(f.evidence) AS evidence
+            FROM finding_spans f
+            JOIN file_paths p ON p.id = f.path_id
+            JOIN signals s ON s.id = f.signal_id
+            JOIN detectors d ON d.id = f.detector_id
+            WHERE f.resolved_run_id IS NULL;
+            """
+        )
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.commit()
+
+    def _migrate_findings_history(self) -> None:
+        """Replay findings stored by older versions into spans, run by run.
+
+        Version 0 kept a flat ``findings`` table and version 1 a ``finding_records``
+        table behind a ``findings`` view; both expose the same columns. Those versions did
+        not record repos scanned with no findings, so such repos' spans stay open until
+        their next scan.
+        """
+        kinds = {
+            row["name"]: row["type"]
+            for row in self.conn.execute(
+                "SELECT name, type FROM sqlite_master WHERE name IN ('findings', 'finding_records')"
+            )
+        }
+        legacy_table = kinds.get("findings") == "table"
+        if not legacy_table and "finding_records" not in kinds:
+            return
+
+        groups = self.conn.execute(
+            "SELECT DISTINCT run_id, repo_id FROM findings ORDER BY run_id, repo_id"
+        ).fetchall()
+        with self._write():
+            for group in groups:
+                rows = self.conn.execute(
+                    """
+                    SELECT commit_sha, file_path, line_number, signal_code, category, severity,
+                           detector, confidence, evidence
+                    FROM findings
+                    WHERE run_id = ? AND repo_id = ?
+                    ORDER BY id
+                    """,
+                    (group["run_id"], group["repo_id"]),
+                ).fetchall()
+                findings = [
+                    Finding(
+                        file_path=str(row["file_path"]),
+                        line_number=row["line_number"],
+                        signal_code=str(row["signal_code"]),
+                        category=str(row["category"]),
+                        severity=str(row["severity"]),
+                        detector=str(row["detector"]),
+                        confidence=float(row["confidence"]),
+                        evidence=row["evidence"] or "",
+                    )
+                    for row in rows
+                ]
+                self._record_findings(int(group["run_id"]), int(group["repo_id"]), rows[0]["commit_sha"], findings)
+            if legacy_table:
+                self.conn.execute("DROP TABLE findings")
+            else:
+                self.conn.execute("DROP VIEW findings")
+                self.conn.execute("DROP TABLE finding_records")
+        self.commit()
+
+    def _add_column_if_missing(self, table: str, column: str, definition: str) -> None:
+        # CREATE TABLE IF NOT EXISTS leaves databases from older versions untouched.
+        columns = {row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
 
     def start_run(self, mode: str, total_repos: int) -> int:
         cursor = self.conn.execute(
@@ -96,7 +451,7 @@ class Database:
             """,
             (utc_now(), mode, int(total_repos)),
         )
-        self.conn.commit()
+        self.commit()
         return int(cursor.lastrowid)
 
     def finish_run(
@@ -109,12 +464,14 @@ class Database:
         findings_count: int,
         error_count: int,
         notes: str | None = None,
+        total_repos: int | None = None,
     ) -> None:
         self.conn.execute(
             """
             UPDATE scan_runs
             SET finished_at = ?,
                 status = ?,
+                total_repos = COALESCE(?, total_repos),
                 scanned_repos = ?,
                 skipped_repos = ?,
                 findings_count = ?,
@@ -125,6 +482,7 @@ class Database:
             (
                 utc_now(),
                 status,
+                None if total_repos is None else int(total_repos),
                 int(scanned_repos),
                 int(skipped_repos),
                 int(findings_count),
@@ -133,56 +491,155 @@ class Database:
                 int(run_id),
             ),
         )
-        self.conn.commit()
+        self._finalize_rollups(run_id)
+        self.commit()
 
-    def upsert_repo(self, repo: RepoDescriptor) -> int:
-        now = utc_now()
+    def _finalize_rollups(self, run_id: int) -> None:
+        """Store the run's top findings in report order and its new/resolved counts; the
+        per-repo and per-signal rollups were already filled as each repo was recorded."""
+        self.conn.execute("DELETE FROM run_top_findings WHERE run_id = ?", (int(run_id),))
         self.conn.execute(
             """
-            INSERT INTO repos (
-                provider_name,
-                provider_type,
-                external_id,
-                full_name,
-                clone_url,
-                default_branch,
-                web_url,
-                local_path,
-                last_seen_at
+            INSERT INTO run_top_findings (
+                run_id, position, repo, file_path, line_number, signal_code, category, severity,
+                detector, confidence, evidence
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(provider_name, external_id) DO UPDATE SET
-                full_name = excluded.full_name,
-                clone_url = excluded.clone_url,
-                default_branch = excluded.default_branch,
-                web_url = excluded.web_url,
-                local_path = excluded.local_path,
-                last_seen_at = excluded.last_seen_at
+            SELECT
+                f.run_id,
+                ROW_NUMBER() OVER (
+                    ORDER BY
+                        CASE f.severity WHEN 'high' THEN 1 WHEN 'medium' THEN 2 ELSE 3 END,
+                        r.full_name ASC,
+                        f.file_path ASC,
+                        f.line_number ASC
+                ),
+                r.full_name,
+                f.file_path,
+                f.line_number,
+                f.signal_code,
+                f.category,
+                f.severity,
+                f.detector,
+                f.confidence,
+                f.evidence
+            FROM findings f
+            JOIN repos r ON r.id = f.repo_id
+            WHERE f.run_id = ?
+            ORDER BY 2
+            LIMIT ?
             """,
-            (
-                repo.provider_name,
-                repo.provider_type,
-                repo.external_id,
-                repo.full_name,
-                repo.clone_url,
-                repo.default_branch,
-                repo.web_url,
-                repo.local_path,
-                now,
-            ),
+            (int(run_id), TOP_FINDINGS_LIMIT),
         )
-
-        row = self.conn.execute(
-            """
-            SELECT id FROM repos WHERE provider_name = ? AND external_id = ?
+        self.conn.execute(
+            f"""
+            UPDATE scan_runs SET
+                rollups_ready = 1,
+                new_findings = (SELECT COUNT(*) FROM finding_spans f WHERE {NEW_SPAN_CONDITION}),
+                resolved_findings = (SELECT COUNT(*) FROM finding_spans f WHERE {RESOLVED_SPAN_CONDITION})
+            WHERE id = ?
             """,
-            (repo.provider_name, repo.external_id),
-        ).fetchone()
-        self.conn.commit()
+            (int(run_id), int(run_id), int(run_id)),
+        )
+
+    def upsert_repo(self, repo: RepoDescriptor) -> int:
+        with self._write():
+            return self._upsert_repo(repo, utc_now())
+
+    def _upsert_repo(self, repo: RepoDescriptor, now: str) -> int:
+        params = (
+            repo.provider_name,
+            repo.provider_type,
+            repo.external_id,
+            repo.full_name,
+            repo.clone_url,
+            repo.default_branch,
+            repo.web_url,
+            repo.local_path,
+            now,
+            repo.clone_auth_user,
+        )
+        if _HAS_RETURNING:
+            row = self.conn.execute(_UPSERT_REPO_SQL + " RETURNING id", params).fetchone()
+        else:
+            self.conn.execute(_UPSERT_REPO_SQL, params)
+            row = self.conn.execute(
+                "SELECT id FROM repos WHERE provider_name = ? AND external_id = ?",
+                (repo.provider_name, repo.external_id),
+            ).fetchone()
         if row is None:
             raise RuntimeError("Failed to fetch repo id after upsert")
         return int(row["id"])
 
+    def record_provider_listing(
+        self,
+        provider_name: str,
+        settings_key: str,
+        listed_at: str,
+        repos: Iterable[RepoDescriptor],
+    ) -> None:
+        """Store a complete listing: repos seen since ``listed_at`` are the provider's current repos."""
+        now = utc_now()
+        with self._write():
+            for repo in repos:
+                self._upsert_repo(repo, now)
+            self.conn.execute(
+                """
+                INSERT INTO provider_listings (provider_name, settings_key, listed_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(provider_name) DO UPDATE SET
+                    settings_key = excluded.settings_key,
+                    listed_at = excluded.listed_at
+                """,
+                (provider_name, settings_key, listed_at),
+            )
+        self.commit()
+
+    def get_listed_repos(
+        self,
+        provider_name: str,
+        settings_key: str,
+        max_age_seconds: int,
+    ) -> list[RepoDescriptor] | None:
+        """Repos from the provider's last complete listing, or None if it is missing or stale.
+
+        Stored descriptors carry no credentials; ``auth_token`` is always None.
+        """
+        row = self.conn.execute(
+            "SELECT settings_key, listed_at FROM provider_listings WHERE provider_name = ?",
+            (provider_name,),
+        ).fetchone()
+        if row is None or row["settings_key"] != settings_key:
+            return None
+        listed_at = str(row["listed_at"])
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(listed_at)
+        if age.total_seconds() > max_age_seconds:
+            return None
+
+        rows = self.conn.execute(
+            """
+            SELECT provider_name, provider_type, external_id, full_name, clone_url, default_branch,
+                   web_url, local_path, clone_auth_user
+            FROM repos
+            WHERE provider_name = ? AND last_seen_at >= ?
+            ORDER BY id
+            """,
+            (provider_name, listed_at),
+        ).fetchall()
+        return [
+            RepoDescriptor(
+                provider_name=str(row["provider_name"]),
+                provider_type=str(row["provider_type"]),
+                external_id=str(row["external_id"]),
+                full_name=str(row["full_name"]),
+                clone_url=row["clone_url"],
+                default_branch=row["default_branch"],
+                web_url=row["web_url"],
+                clone_auth_user=row["clone_auth_user"],
+                local_path=row["local_path"],
+            )
+            for row in rows
+        ]
+
     def get_last_commit_sha(self, repo_id: int) -> str | None:
         row = self.conn.execute(
             "SELECT last_commit_sha FROM repo_scan_state WHERE repo_id = ?",
@@ -193,69 +650,332 @@ class Database:
         value = row["last_commit_sha"]
         return str(value) if value else None
 
-    def update_repo_scan_state(self, repo_id: int, commit_sha: str | None, run_id: int) -> None:
+    def get_last_scan_fingerprint(self, repo_id: int) -> str | None:
+        row = self.conn.execute(
+            "SELECT scan_fingerprint FROM repo_scan_state WHERE repo_id = ?",
+            (int(repo_id),),
+        ).fetchone()
+        if row is None:
+            return None
+        value = row["scan_fingerprint"]
+        return str(value) if value else None
+
+    def get_last_scanned_run_id(self, repo_id: int) -> int | None:
+        row = self.conn.execute(
+            "SELECT last_run_id FROM repo_scan_state WHERE repo_id = ?",
+            (int(repo_id),),
+        ).fetchone()
+        if row is None or row["last_run_id"] is None:
+            return None
+        return int(row["last_run_id"])
+
+    def get_findings(self, run_id: int, repo_id: int) -> list[Finding]:
+        rows = self.conn.execute(
+            """
+            SELECT file_path, line_number, signal_code, category, severity, detector, confidence, evidence
+            FROM findings
+            WHERE run_id = ? AND repo_id = ?
+            ORDER BY id
+            """,
+            (int(run_id), int(repo_id)),
+        ).fetchall()
+        return [
+            Finding(
+                file_path=str(row["file_path"]),
+                line_number=row["line_number"],
+                signal_code=str(row["signal_code"]),
+                category=str(row["category"]),
+                severity=str(row["severity"]),
+                detector=str(row["detector"]),
+                confidence=float(row["confidence"]),
+                evidence=row["evidence"] or "",
+            )
+            for row in rows
+        ]
+
+    def update_repo_scan_state(
+        self,
+        repo_id: int,
+        commit_sha: str | None,
+        run_id: int,
+        scan_fingerprint: str | None = None,
+    ) -> None:
+        with self._write():
+            self._update_repo_scan_state(repo_id, commit_sha, run_id, scan_fingerprint)
+
+    def insert_findings(
+        self,
+        run_id: int,
+        repo_id: int,
+        commit_sha: str | None,
+        findings: list[Finding],
+    ) -> int:
+        """Record the repo's complete finding set for the run (replacing any recorded earlier)."""
+        with self._write():
+            self._record_findings(run_id, repo_id, commit_sha, findings)
+        return len(findings)
+
+    def record_repo_scan(
+        self,
+        run_id: int,
+        repo_id: int,
+        commit_sha: str | None,
+        findings: list[Finding],
+        scan_fingerprint: str | None = None,
+    ) -> int:
+        """Store a repo's findings and advance its scan state as one atomic write."""
+        with self._write():
+            self._record_findings(run_id, repo_id, commit_sha, findings)
+            self._update_repo_scan_state(repo_id, commit_sha, run_id, scan_fingerprint)
+        return len(findings)
+
+    def _update_repo_scan_state(
+        self,
+        repo_id: int,
+        commit_sha: str | None,
+        run_id: int,
+        scan_fingerprint: str | None,
+    ) -> None:
         self.conn.execute(
             """
-            INSERT INTO repo_scan_state (repo_id, last_commit_sha, last_run_id, updated_at)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO repo_scan_state (repo_id, last_commit_sha, last_run_id, scan_fingerprint, updated_at)
+            VALUES (?, ?, ?, ?, ?)
             ON CONFLICT(repo_id) DO UPDATE SET
                 last_commit_sha = excluded.last_commit_sha,
                 last_run_id = excluded.last_run_id,
+                scan_fingerprint = excluded.scan_fingerprint,
                 updated_at = excluded.updated_at
             """,
-            (int(repo_id), commit_sha, int(run_id), utc_now()),
+            (int(repo_id), commit_sha, int(run_id), scan_fingerprint, utc_now()),
         )
-        self.conn.commit()
 
-    def insert_findings(
+    def _record_findings(
         self,
         run_id: int,
         repo_id: int,
         commit_sha: str | None,
         findings: list[Finding],
-    ) -> int:
-        if not findings:
-            return 0
+    ) -> None:
+        """Diff the repo's findings against its open spans and write only what changed.
+
+        A finding that keeps its fingerprint, line, confidence and evidence stays in its
+        span; anything else closes the old span at this run and opens a new one.
+        """
+        commit_id = self._lookup_ids("commits", "sha", {commit_sha})[commit_sha] if commit_sha else None
+        self._update_rollups(run_id, repo_id, findings)
+        self.conn.execute(
+            """
+            INSERT INTO run_repos (run_id, repo_id, commit_id, findings_count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(run_id, repo_id) DO UPDATE SET
+                commit_id = excluded.commit_id,
+                findings_count = excluded.findings_count
+            """,
+            (int(run_id), int(repo_id), commit_id, len(findings)),
+        )
+
+        open_spans = {
+            bytes(row["fingerprint"]): row
+            for row in self.conn.execute(
+                """
+                SELECT id, fingerprint, line_number, confidence, evidence_text(evidence) AS evidence, first_run_id
+                FROM finding_spans
+                WHERE repo_id = ? AND resolved_run_id IS NULL
+                """,
+                (int(repo_id),),
+            )
+        }
+        kept: set[int] = set()
+        opened: list[tuple[bytes, Finding]] = []
+        for fingerprint, finding in zip(_fingerprints(findings), findings):
+            span = open_spans.get(fingerprint)
+            if span is not None and (span["line_number"], span["confidence"], span["evidence"] or "") == (
+                finding.line_number,
+                float(finding.confidence),
+                finding.evidence,
+            ):
+                kept.add(int(span["id"]))
+            else:
+                opened.append((fingerprint, finding))
+
+        closed = [span for span in open_spans.values() if int(span["id"]) not in kept]
+        # Spans opened by this same run (a repeated write) never existed in an earlier run.
+        self.conn.executemany(
+            "DELETE FROM finding_spans WHERE id = ?",
+            [(span["id"],) for span in closed if span["first_run_id"] >= run_id],
+        )
+        self.conn.executemany(
+            "UPDATE finding_spans SET resolved_run_id = ? WHERE id = ?",
+            [(int(run_id), span["id"]) for span in closed if span["first_run_id"] < run_id],
+        )
+        if not opened:
+            return
 
+        path_ids = self._lookup_ids("file_paths", "path", {row.file_path for _, row in opened})
+        detector_ids = self._lookup_ids("detectors", "name", {row.detector for _, row in opened})
+        signal_ids = self._signal_ids({(row.signal_code, row.category, row.severity) for _, row in opened})
         self.conn.executemany(
             """
-            INSERT INTO findings (
-                run_id,
+            INSERT INTO finding_spans (
                 repo_id,
-                commit_sha,
-                file_path,
+                fingerprint,
+                path_id,
                 line_number,
-                signal_code,
-                category,
-                severity,
-                detector,
+                signal_id,
+                detector_id,
                 confidence,
                 evidence,
-                created_at
+                first_run_id
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             [
                 (
-                    int(run_id),
                     int(repo_id),
-                    commit_sha,
-                    row.file_path,
+                    fingerprint,
+                    path_ids[row.file_path],
                     row.line_number,
-                    row.signal_code,
-                    row.category,
-                    row.severity,
-                    row.detector,
+                    signal_ids[(row.signal_code, row.category, row.severity)],
+                    detector_ids[row.detector],
                     float(row.confidence),
-                    row.evidence,
-                    utc_now(),
+                    self._pack_evidence(row.evidence),
+                    int(run_id),
                 )
-                for row in findings
+                for fingerprint, row in opened
             ],
         )
-        self.conn.commit()
-        return len(findings)
+
+    def _update_rollups(self, run_id: int, repo_id: int, findings: list[Finding]) -> None:
+        """Add the repo's findings to the run's rollups, first removing any earlier write for it."""
+        recorded = self.conn.execute(
+            "SELECT 1 FROM run_repos WHERE run_id = ? AND repo_id = ?",
+            (int(run_id), int(repo_id)),
+        ).fetchone()
+        if recorded is not None:
+            previous = self.conn.execute(
+                """
+                SELECT signal_id, COUNT(*) AS finding_count
+                FROM finding_spans
+                WHERE repo_id = ?
+                  AND first_run_id <= ?
+                  AND (resolved_run_id IS NULL OR resolved_run_id > ?)
+                GROUP BY signal_id
+                """,
+                (int(repo_id), int(run_id), int(run_id)),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE run_signal_rollup SET finding_count = finding_count - ? WHERE run_id = ? AND signal_id = ?",
+                [(int(row["finding_count"]), int(run_id), int(row["signal_id"])) for row in previous],
+            )
+
+        severities = Counter(row.severity for row in findings)
+        self.conn.execute(
+            """
+            INSERT INTO run_repo_rollup (run_id, repo_id, finding_count, high_count, medium_count, low_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(run_id, repo_id) DO UPDATE SET
+                finding_count = excluded.finding_count,
+                high_count = excluded.high_count,
+                medium_count = excluded.medium_count,
+                low_count = excluded.low_count
+            """,
+            (
+                int(run_id),
+                int(repo_id),
+                len(findings),
+                severities["high"],
+                severities["medium"],
+                severities["low"],
+            ),
+        )
+
+        signals = Counter((row.signal_code, row.category, row.severity) for row in findings)
+        signal_ids = self._signal_ids(set(signals))
+        self.conn.executemany(
+            """
+            INSERT INTO run_signal_rollup (run_id, signal_id, finding_count)
+            VALUES (?, ?, ?)
+            ON CONFLICT(run_id, signal_id) DO UPDATE SET
+                finding_count = finding_count + excluded.finding_count
+            """,
+            [(int(run_id), signal_ids[signal], count) for signal, count in signals.items()],
+        )
+
+    def _lookup_ids(self, table: str, column: str, values: set[str]) -> dict[str, int]:
+        """Map each value to its id in a lookup table, inserting the ones not seen before."""
+        ids: dict[str, int] = {}
+        pending = list(values)
+        for _ in range(2):
+            for start in range(0, len(pending), _LOOKUP_BATCH):
+                batch = pending[start : start + _LOOKUP_BATCH]
+                placeholders = ", ".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT id, {column} FROM {table} WHERE {column} IN ({placeholders})",
+                    batch,
+                )
+                ids.update((row[column], int(row["id"])) for row in rows)
+            pending = [value for value in pending if value not in ids]
+            if not pending:
+                break
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)",
+                [(value,) for value in pending],
+            )
+        return ids
+
+    def _signal_ids(self, signals: set[tuple[str, str, str]]) -> dict[tuple[str, str, str], int]:
+        ids: dict[tuple[str, str, str], int] = {}
+        for signal in signals:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO signals (signal_code, category, severity) VALUES (?, ?, ?)",
+                signal,
+            )
+            row = self.conn.execute(
+                "SELECT id FROM signals WHERE signal_code = ? AND category = ? AND severity = ?",
+                signal,
+            ).fetchone()
+            ids[signal] = int(row["id"])
+        return ids
+
+    def _pack_evidence(self, evidence: str) -> str | bytes:
+        if not self.compress_evidence or len(evidence) < _MIN_COMPRESSED_EVIDENCE:
+            return evidence
+        raw = evidence.encode("utf-8")
+        packed = zlib.compress(raw)
+        return packed if len(packed) < len(raw) else evidence
 
     def query(self, sql: str, params: tuple | None = None) -> list[sqlite3.Row]:
         cursor = self.conn.execute(sql, params or ())
         return list(cursor.fetchall())
+
+
+def _evidence_text(value: str | bytes | None) -> str | None:
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode("utf-8")
+    return value
+
+
+def _fingerprints(findings: list[Finding]) -> list[bytes]:
+    """Stable identity of each finding within its repo, independent of line numbers.
+
+    Repeats of the same evidence in a file are told apart by their order of appearance.
+    """
+    fingerprints: list[bytes] = [b""] * len(findings)
+    occurrences: dict[str, int] = {}
+    order = sorted(range(len(findings)), key=lambda index: findings[index].line_number or 0)
+    for index in order:
+        finding = findings[index]
+        key = "\x1f".join(
+            (
+                finding.file_path,
+                finding.signal_code,
+                finding.category,
+                finding.severity,
+                finding.detector,
+                " ".join(finding.evidence.split()),
+            )
+        )
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        fingerprints[index] = hashlib.blake2b(f"{key}\x1f{occurrence}".encode("utf-8"), digest_size=16).digest()
+    return fingerprints
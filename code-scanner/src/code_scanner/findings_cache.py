@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterable
+
+from code_scanner.models import Finding
+
+
+class FindingsCache:
+    """Persistent map of (blob SHA, detector, detector version) to the findings for that blob.
+
+    Findings are stored without their file path, so any copy of the same content in any
+    repo can reuse them. The version is a hash of the detector's ruleset or signal tables,
+    so editing rules or detector tables simply stops matching old entries.
+    """
+
+    def __init__(self, cache_path: str | Path):
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.cache_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blob_findings (
+                blob_sha TEXT NOT NULL,
+                detector TEXT NOT NULL,
+                detector_version TEXT NOT NULL,
+                findings_json TEXT NOT NULL,
+                PRIMARY KEY (blob_sha, detector, detector_version)
+            ) WITHOUT ROWID
+            """
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get_many(
+        self,
+        detector: str,
+        detector_version: str,
+        blob_shas: Iterable[str],
+    ) -> dict[str, list[tuple]]:
+        """Return cached finding tuples keyed by blob SHA for every blob that is cached."""
+        pending = list(dict.fromkeys(blob_shas))
+        results: dict[str, list[tuple]] = {}
+        for start in range(0, len(pending), 500):
+            chunk = pending[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self.conn.execute(
+                f"""
+                SELECT blob_sha, findings_json
+                FROM blob_findings
+                WHERE detector = ? AND detector_version = ? AND blob_sha IN ({placeholders})
+                """,
+                (detector, detector_version, *chunk),
+            ).fetchall()
+            for blob_sha, findings_json in rows:
+                results[blob_sha] = [tuple(item) for item in json.loads(findings_json)]
+        return results
+
+    def put_many(
+        self,
+        detector: str,
+        detector_version: str,
+        entries: dict[str, list[Finding]],
+    ) -> None:
+        if not entries:
+            return
+        self.conn.executemany(
+            """
+            INSERT OR REPLACE INTO blob_findings (blob_sha, detector, detector_version, findings_json)
+            VALUES (?, ?, ?, ?)
+            """,
+            [
+                (blob_sha, detector, detector_version, json.dumps([_to_row(item) for item in findings]))
+                for blob_sha, findings in entries.items()
+            ],
+        )
+        self.conn.commit()
+
+
+def from_cached_row(file_path: str, row: tuple) -> Finding:
+    line_number, signal_code, category, severity, detector, confidence, evidence = row
+    return Finding(
+        file_path=file_path,
+        line_number=line_number,
+        signal_code=signal_code,
+        category=category,
+        severity=severity,
+        detector=detector,
+        confidence=confidence,
+        evidence=evidence,
+    )
+
+
+def _to_row(finding: Finding) -> list:
+    return [
+        finding.line_number,
+        finding.signal_code,
+        finding.category,
+        finding.severity,
+        finding.detector,
+        finding.confidence,
+        finding.evidence,
+    ]
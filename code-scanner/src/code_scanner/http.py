@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import base64
+import gzip
+import http.client
 import json
 import os
 import ssl
+import threading
+import zlib
 from dataclasses import dataclass
 from typing import Any
-from urllib import error, request
+from urllib.parse import unquote, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+from code_scanner.http_cache import ResponseCache
+from code_scanner.rate_limit import RateLimiter
 
 try:
     import certifi
@@ -13,6 +22,12 @@ except ImportError:  # pragma: no cover - optional dependency
     certifi = None
 
 
+_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+_MAX_REDIRECTS = 5
+# Idle keep-alive connections kept per host; more than this are closed on return.
+_MAX_IDLE_PER_HOST = 8
+
+
 @dataclass(frozen=True)
 class HttpResponse:
     status: int
@@ -20,24 +35,211 @@ class HttpResponse:
     data: Any
 
 
+class HttpClient:
+    """JSON-over-HTTP client that keeps one TLS context and reuses connections per host.
+
+    Idle connections are pooled per (scheme, host, port). A request checks one out and
+    returns it once the response has been read, so a client can be shared by provider
+    thread pools and short-lived worker threads still reuse warm connections.
+    With a ``cache``, responses are stored on disk and revalidated with conditional
+    requests; a 304 reuses the stored body. With a ``rate_limiter``, requests wait for
+    the host's rate-limit budget and throttled responses are retried.
+    """
+
+    def __init__(
+        self,
+        timeout: int = 30,
+        cache: ResponseCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self._ssl_context: ssl.SSLContext | None = None
+        self._lock = threading.Lock()
+        self._idle: dict[tuple, list[tuple[http.client.HTTPConnection, dict[str, str] | None]]] = {}
+
+    def get_json(self, url: str, headers: dict[str, str] | None = None, timeout: int | None = None) -> HttpResponse:
+        request_headers = {"Accept-Encoding": "gzip", **(headers or {})}
+        cached = self.cache.lookup(url, headers or {}) if self.cache is not None else None
+        if cached is not None:
+            if self.cache.is_fresh(cached):
+                return HttpResponse(status=cached.status, headers=cached.headers, data=cached.data)
+            request_headers.update(cached.validators)
+
+        host = urlsplit(url).hostname or ""
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(host)
+            status, response_headers, body = self._follow(url, request_headers, timeout or self.timeout)
+            if self.rate_limiter is None:
+                break
+            if self.rate_limiter.retry_delay(host, status, response_headers, attempt) is None:
+                break
+            attempt += 1
+
+        if status == 304 and cached is not None:
+            merged_headers = {**cached.headers, **response_headers}
+            self.cache.store(url, headers or {}, cached.status, merged_headers, cached.data)
+            return HttpResponse(status=cached.status, headers=merged_headers, data=cached.data)
+
+        if status >= 400:
+            detail = body.decode("utf-8", errors="replace")
+            raise RuntimeError(f"HTTP {status} for {url}: {detail[:400]}")
+
+        payload = json.loads(body.decode("utf-8"))
+        if self.cache is not None:
+            self.cache.store(url, headers or {}, status, response_headers, payload)
+        return HttpResponse(status=status, headers=response_headers, data=payload)
+
+    def _follow(self, url: str, headers: dict[str, str], timeout: int) -> tuple[int, dict[str, str], bytes]:
+        current_url = url
+        for _ in range(_MAX_REDIRECTS):
+            status, response_headers, body = self._request(current_url, headers, timeout)
+            if status not in _REDIRECT_STATUSES or "location" not in response_headers:
+                return status, response_headers, body
+            current_url = urljoin(current_url, response_headers["location"])
+        return self._request(current_url, headers, timeout)
+
+    def close(self) -> None:
+        """Close every idle connection; the client stays usable and reconnects on demand."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for pooled in idle.values():
+            for connection, _ in pooled:
+                connection.close()
+
+    def _request(self, url: str, headers: dict[str, str], timeout: int) -> tuple[int, dict[str, str], bytes]:
+        parts = urlsplit(url)
+        if parts.scheme not in {"http", "https"} or not parts.hostname:
+            raise RuntimeError(f"Failed request to {url}: unsupported URL")
+        target = parts.path or "/"
+        if parts.query:
+            target = f"{target}?{parts.query}"
+
+        key = (parts.scheme, parts.hostname, parts.port)
+        # One retry, on a new connection, covers a keep-alive connection the server closed while idle.
+        for attempt in range(2):
+            connection, reused, forward_headers = self._checkout(key, timeout, reuse=attempt == 0)
+            try:
+                if forward_headers is None:
+                    connection.request("GET", target, headers=headers)
+                else:
+                    connection.request("GET", url, headers={**headers, **forward_headers})
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException) as exc:
+                connection.close()
+                if reused and attempt == 0:
+                    continue
+                raise RuntimeError(f"Failed request to {url}: {exc}") from exc
+
+            response_headers = {key.lower(): value for key, value in response.getheaders()}
+            if response.will_close:
+                connection.close()
+            else:
+                self._checkin(key, connection, forward_headers)
+            return response.status, response_headers, _decode_body(body, response_headers)
+
+        raise RuntimeError(f"Failed request to {url}")  # pragma: no cover - loop always returns or raises
+
+    def _checkout(
+        self,
+        key: tuple[str, str, int | None],
+        timeout: int,
+        *,
+        reuse: bool = True,
+    ) -> tuple[http.client.HTTPConnection, bool, dict[str, str] | None]:
+        """Take (connection, reused, forward_proxy_headers) for a host out of the pool.
+
+        ``forward_proxy_headers`` is set for plain HTTP through a proxy, where requests
+        carry the absolute URL; HTTPS goes through a CONNECT tunnel instead.
+        """
+        if reuse:
+            with self._lock:
+                pooled = self._idle.get(key)
+                cached = pooled.pop() if pooled else None
+            if cached is not None:
+                connection, forward_headers = cached
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection, True, forward_headers
+
+        scheme, host, port = key
+        proxy = None if proxy_bypass(host) else getproxies().get(scheme)
+        forward_headers = None
+        if proxy:
+            proxy_parts = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+            proxy_headers: dict[str, str] = {}
+            if proxy_parts.username:
+                credentials = f"{unquote(proxy_parts.username)}:{unquote(proxy_parts.password or '')}"
+                proxy_headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode()
+            if scheme == "https":
+                connection = http.client.HTTPSConnection(
+                    proxy_parts.hostname,
+                    proxy_parts.port,
+                    timeout=timeout,
+                    context=self._context(),
+                )
+                connection.set_tunnel(host, port, headers=proxy_headers)
+            else:
+                connection = http.client.HTTPConnection(proxy_parts.hostname, proxy_parts.port, timeout=timeout)
+                forward_headers = proxy_headers
+        elif scheme == "https":
+            connection = http.client.HTTPSConnection(host, port, timeout=timeout, context=self._context())
+        else:
+            connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        return connection, False, forward_headers
+
+    def _checkin(
+        self,
+        key: tuple[str, str, int | None],
+        connection: http.client.HTTPConnection,
+        forward_headers: dict[str, str] | None,
+    ) -> None:
+        with self._lock:
+            pooled = self._idle.setdefault(key, [])
+            if len(pooled) < _MAX_IDLE_PER_HOST:
+                pooled.append((connection, forward_headers))
+                return
+        connection.close()
+
+    def _context(self) -> ssl.SSLContext:
+        # Loading the CA bundle is the expensive part of a TLS handshake setup; do it once.
+        if self._ssl_context is None:
+            with self._lock:
+                if self._ssl_context is None:
+                    self._ssl_context = _build_ssl_context()
+        return self._ssl_context
+
+
+_default_client: HttpClient | None = None
+_default_client_lock = threading.Lock()
+
+
+def default_client() -> HttpClient:
+    """The process-wide client shared by every provider."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = HttpClient(rate_limiter=RateLimiter())
+    return _default_client
+
+
 def get_json(url: str, headers: dict[str, str] | None = None, timeout: int = 30) -> HttpResponse:
-    req = request.Request(url=url, headers=headers or {}, method="GET")
-    context = _build_ssl_context()
-    try:
-        with request.urlopen(req, timeout=timeout, context=context) as response:
-            body = response.read().decode("utf-8")
-            payload = json.loads(body)
-            normalized_headers = {k.lower(): v for k, v in response.headers.items()}
-            return HttpResponse(
-                status=response.status,
-                headers=normalized_headers,
-                data=payload,
-            )
-    except error.HTTPError as exc:
-        detail = exc.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"HTTP {exc.code} for {url}: {detail[:400]}") from exc
-    except error.URLError as exc:
-        raise RuntimeError(f"Failed request to {url}: {exc.reason}") from exc
+    return default_client().get_json(url, headers=headers, timeout=timeout)
+
+
+def _decode_body(body: bytes, headers: dict[str, str]) -> bytes:
+    encoding = headers.get("content-encoding", "").strip().lower()
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        return zlib.decompress(body)
+    return body
 
 
 def _build_ssl_context() -> ssl.SSLContext:
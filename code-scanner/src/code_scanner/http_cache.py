@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    status: int
+    headers: dict[str, str]
+    data: Any
+    stored_at: float
+
+    @property
+    def validators(self) -> dict[str, str]:
+        """Conditional request headers that let the server answer 304 Not Modified."""
+        conditional: dict[str, str] = {}
+        if self.headers.get("etag"):
+            conditional["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            conditional["If-Modified-Since"] = self.headers["last-modified"]
+        return conditional
+
+
+class ResponseCache:
+    """On-disk cache of JSON GET responses, one file per URL and credential.
+
+    Entries younger than ``ttl_seconds`` are served without a request; older ones are
+    revalidated with their ETag/Last-Modified. ``refresh`` ignores stored entries (but
+    still records new responses).
+    """
+
+    def __init__(self, cache_dir: str | Path, ttl_seconds: int, *, refresh: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.refresh = refresh
+
+    def lookup(self, url: str, headers: dict[str, str]) -> CachedResponse | None:
+        if self.refresh:
+            return None
+        path = self._path(url, headers)
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            return CachedResponse(
+                status=int(raw["status"]),
+                headers=dict(raw["headers"]),
+                data=raw["data"],
+                stored_at=float(raw["stored_at"]),
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return time.time() - entry.stored_at < self.ttl_seconds
+
+    def store(
+        self,
+        url: str,
+        headers: dict[str, str],
+        status: int,
+        response_headers: dict[str, str],
+        data: Any,
+    ) -> None:
+        payload = {
+            "url": url,
+            "status": status,
+            "headers": response_headers,
+            "data": data,
+            "stored_at": time.time(),
+        }
+        path = self._path(url, headers)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handle, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(handle, "w", encoding="utf-8") as tmp_file:
+                json.dump(payload, tmp_file)
+            os.replace(tmp_name, path)
+        except OSError:
+            # The cache is an optimisation; never fail discovery because it cannot be written.
+            return
+
+    def _path(self, url: str, headers: dict[str, str]) -> Path:
+        # Different credentials can see different repos, so they get separate entries.
+        authorization = next((value for key, value in headers.items() if key.lower() == "authorization"), "")
+        digest = hashlib.sha256(f"{url}\n{authorization}".encode("utf-8")).hexdigest()
+        return self.cache_dir / digest[:2] / f"{digest}.json"
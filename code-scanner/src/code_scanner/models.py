@@ -17,6 +17,27 @@ class ProviderSettings:
     root_dir: str | None = None
     recursive: bool = False
     use_token_for_clone: bool = False
+    discovery_workers: int = 8
+    default_branch_source: str = "api"
+    default_branch_cache_ttl_seconds: int = 24 * 60 * 60
+
+
+DEFAULT_EXCLUDE_DIR_NAMES = (
+    ".git",
+    ".hg",
+    ".svn",
+    ".venv",
+    "venv",
+    "node_modules",
+    "__pycache__",
+    "build",
+    "dist",
+)
+
+
+SYNC_MODES = ("worktree", "object_store")
+JOURNAL_MODES = ("wal", "delete", "truncate", "persist")
+DEFAULT_BRANCH_SOURCES = ("api", "remote_head")
 
 
 @dataclass(frozen=True)
@@ -25,6 +46,10 @@ class ScanSettings:
     exclude_repo_patterns: tuple[str, ...] = ()
     max_file_size_bytes: int = 500_000
     max_files_per_repo: int = 40_000
+    exclude_dir_names: tuple[str, ...] = DEFAULT_EXCLUDE_DIR_NAMES
+    content_cache_max_bytes: int = 64 * 1024 * 1024
+    max_matches_per_rule: int = 10_000
+    file_workers: int = 1
 
 
 @dataclass(frozen=True)
@@ -34,6 +59,13 @@ class AppConfig:
     rules_path: str
     providers: tuple[ProviderSettings, ...]
     scan: ScanSettings
+    findings_cache_path: str | None = None
+    sync_mode: str = "worktree"
+    discovery_cache_ttl_seconds: int = 15 * 60
+    repo_list_ttl_seconds: int = 60 * 60
+    db_journal_mode: str = "wal"
+    db_commit_interval_seconds: float = 2.0
+    db_compress_evidence: bool = False
 
 
 @dataclass(frozen=True)
@@ -79,6 +111,13 @@ class Finding:
 class SyncedRepo:
     repo_path: Path
     commit_sha: str | None
+    object_store: bool = False
+
+
+@dataclass(frozen=True)
+class RepoChanges:
+    changed_paths: frozenset[str]
+    deleted_paths: frozenset[str]
 
 
 @dataclass(frozen=True)
@@ -92,6 +131,7 @@ class ScanSummary:
     findings_count: int
     error_count: int
     output_dir: str | None = None
+    throttled_seconds: float = 0.0
 
     def to_dict(self) -> dict[str, Any]:
         return asdict(self)
@@ -1,14 +1,44 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 import re
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, replace
+from itertools import islice
+from multiprocessing import get_context
 from pathlib import Path
+from typing import Iterable, Iterator
 
 from code_scanner.config import load_rules
-from code_scanner.db import Database
-from code_scanner.models import AppConfig, RepoDescriptor, ScanSummary
+from code_scanner.db import Database, GroupCommitError, utc_now
+from code_scanner.findings_cache import FindingsCache
+from code_scanner.http import default_client
+from code_scanner.http_cache import ResponseCache
+from code_scanner.models import (
+    AppConfig,
+    Finding,
+    ProviderSettings,
+    RepoDescriptor,
+    ScanSettings,
+    ScanSummary,
+    SignalRule,
+    SyncedRepo,
+)
 from code_scanner.providers import build_provider
-from code_scanner.repo_sync import RepoSyncError, sync_repo
-from code_scanner.scanners import scan_repository
+from code_scanner.repo_sync import RepoSyncError, diff_commits, read_remote_head, sync_repo
+from code_scanner.scanners import (
+    can_carry_forward,
+    merge_carried_findings,
+    scan_fingerprint,
+    scan_repository,
+)
+
+
+HTTP_CACHE_DIRNAME = "http_cache"
+# Longer than any single compaction transaction, so `compact` can run beside a scan.
+DB_BUSY_TIMEOUT_SECONDS = 30.0
 
 
 def run_scan(
@@ -17,74 +47,155 @@ def run_scan(
     mode: str,
     limit: int | None,
     repo_regex: str | None,
+    sync_workers: int = 1,
+    scan_workers: int = 1,
+    refresh_discovery: bool = False,
 ) -> ScanSummary:
+    """Sync, scan and record every selected repo.
+
+    Repos flow through three stages: ``sync_workers`` threads clone or fetch, scans run
+    in a pool of ``scan_workers`` processes (inline when it is 1), and this thread is the
+    only one that touches the database. At most ``sync_workers + scan_workers`` repos are
+    being synced or waiting to be scanned at any time, so clones never run far ahead of
+    the scanners.
+    """
     mode_normalized = mode.strip().lower()
     if mode_normalized not in {"full", "incremental"}:
         raise ValueError("mode must be one of: full, incremental")
+    sync_workers = max(1, sync_workers)
+    scan_workers = max(1, scan_workers)
 
     rules = load_rules(config.rules_path)
-    all_repos = discover_repos(config)
-    selected_repos = _filter_repos(
-        all_repos,
-        include_patterns=config.scan.include_repo_patterns,
-        exclude_patterns=config.scan.exclude_repo_patterns,
-        repo_regex=repo_regex,
-    )
+    fingerprint = scan_fingerprint(rules, config.scan)
 
-    if limit is not None and limit > 0:
-        selected_repos = selected_repos[:limit]
-
-    db = Database(config.db_path)
+    db = Database(
+        config.db_path,
+        journal_mode=config.db_journal_mode,
+        commit_interval_seconds=config.db_commit_interval_seconds,
+        compress_evidence=config.db_compress_evidence,
+        busy_timeout_seconds=DB_BUSY_TIMEOUT_SECONDS,
+    )
     db.init_schema()
 
     scanned_repos = 0
     skipped_repos = 0
     findings_count = 0
     error_count = 0
+    total_repos = 0
 
-    run_id = db.start_run(mode=mode_normalized, total_repos=len(selected_repos))
+    # Repos are listed lazily, so the total is only known once discovery is exhausted.
+    run_id = db.start_run(mode=mode_normalized, total_repos=0)
+
+    client = default_client()
+    # Listing continues while repos are scanned, so the response cache stays attached for the run.
+    client.cache = _response_cache(config, refresh=refresh_discovery)
+    rate_limiter = client.rate_limiter
+    throttled_before = rate_limiter.throttled_seconds if rate_limiter is not None else 0.0
+    selected_repos = _filter_repos(
+        iter_discovered_repos(config, db, refresh=refresh_discovery),
+        include_patterns=config.scan.include_repo_patterns,
+        exclude_patterns=config.scan.exclude_repo_patterns,
+        repo_regex=repo_regex,
+    )
+    if limit is not None and limit > 0:
+        selected_repos = islice(selected_repos, limit)
 
     provider_settings = {item.name: item for item in config.providers}
+    in_flight: dict[Future, tuple] = {}
+    max_in_flight = sync_workers + scan_workers
+    discovering = True
 
+    sync_pool = ThreadPoolExecutor(max_workers=sync_workers, thread_name_prefix="repo-sync")
+    scan_pool = None
+    if scan_workers > 1:
+        # Spawned rather than forked: the sync threads are already running by then.
+        scan_pool = ProcessPoolExecutor(max_workers=scan_workers, mp_context=get_context("spawn"))
     try:
-        for repo in selected_repos:
-            repo_id = db.upsert_repo(repo)
-
-            try:
-                settings = provider_settings[repo.provider_name]
-                synced = sync_repo(
+        while discovering or in_flight:
+            # Pull the next repos from discovery only when a pipeline slot is free.
+            while discovering and len(in_flight) < max_in_flight:
+                repo = next(selected_repos, None)
+                if repo is None:
+                    discovering = False
+                    break
+                total_repos += 1
+                repo_id = db.upsert_repo(repo)
+                previous_sha = None
+                if mode_normalized == "incremental" and db.get_last_scan_fingerprint(repo_id) == fingerprint:
+                    previous_sha = db.get_last_commit_sha(repo_id)
+                future = sync_pool.submit(
+                    _sync_if_changed,
                     repo,
-                    cache_root=config.repo_cache_dir,
-                    use_token_for_clone=settings.use_token_for_clone,
+                    config,
+                    provider_settings[repo.provider_name],
+                    previous_sha,
                 )
-            except RepoSyncError:
-                error_count += 1
+                in_flight[future] = ("sync", repo_id)
+            if not in_flight:
                 continue
 
-            previous_sha = db.get_last_commit_sha(repo_id)
-            if (
-                mode_normalized == "incremental"
-                and previous_sha
-                and synced.commit_sha
-                and previous_sha == synced.commit_sha
-            ):
-                skipped_repos += 1
-                continue
+            done, _ = wait(in_flight, timeout=0, return_when=FIRST_COMPLETED)
+            if not done:
+                # Nothing to record yet: commit rather than hold the write lock while idle.
+                db.commit()
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, repo_id, *scan_state = in_flight.pop(future)
 
-            try:
-                findings = scan_repository(synced.repo_path, rules, config.scan)
-                inserted = db.insert_findings(run_id, repo_id, synced.commit_sha, findings)
-                findings_count += inserted
-                scanned_repos += 1
-                db.update_repo_scan_state(repo_id, synced.commit_sha, run_id)
-            except Exception:
-                error_count += 1
-                continue
+                if stage == "sync":
+                    try:
+                        synced = future.result()
+                    except RepoSyncError:
+                        error_count += 1
+                        continue
+                    if synced is None:
+                        skipped_repos += 1
+                        continue
+
+                    try:
+                        planned = _plan_scan(
+                            db,
+                            synced,
+                            rules,
+                            config,
+                            repo_id=repo_id,
+                            mode=mode_normalized,
+                            fingerprint=fingerprint,
+                        )
+                        if planned is None:
+                            skipped_repos += 1
+                            continue
+                        job, carried = planned
+                        if scan_pool is not None:
+                            in_flight[scan_pool.submit(_run_scan_job, job)] = ("scan", repo_id, synced, carried)
+                            continue
+                        findings = merge_carried_findings(carried, _run_scan_job(job), config.scan)
+                    except Exception:
+                        error_count += 1
+                        continue
+                else:
+                    synced, carried = scan_state
+                    try:
+                        findings = merge_carried_findings(carried, future.result(), config.scan)
+                    except Exception:
+                        error_count += 1
+                        continue
+
+                try:
+                    findings_count += db.record_repo_scan(run_id, repo_id, synced.commit_sha, findings, fingerprint)
+                    scanned_repos += 1
+                except GroupCommitError:
+                    # Repos already counted were rolled back with it; fail the run instead.
+                    raise
+                except Exception:
+                    error_count += 1
 
         status = "SUCCESS" if error_count == 0 else "PARTIAL_SUCCESS"
+        throttled_seconds = rate_limiter.throttled_seconds - throttled_before if rate_limiter is not None else 0.0
         db.finish_run(
             run_id,
             status=status,
+            total_repos=total_repos,
             scanned_repos=scanned_repos,
             skipped_repos=skipped_repos,
             findings_count=findings_count,
@@ -95,16 +206,18 @@ def run_scan(
             run_id=run_id,
             mode=mode_normalized,
             status=status,
-            total_repos=len(selected_repos),
+            total_repos=total_repos,
             scanned_repos=scanned_repos,
             skipped_repos=skipped_repos,
             findings_count=findings_count,
             error_count=error_count,
+            throttled_seconds=round(throttled_seconds, 3),
         )
     except Exception as exc:
         db.finish_run(
             run_id,
             status="FAILED",
+            total_repos=total_repos,
             scanned_repos=scanned_repos,
             skipped_repos=skipped_repos,
             findings_count=findings_count,
@@ -113,30 +226,183 @@ def run_scan(
         )
         raise
     finally:
+        sync_pool.shutdown(wait=True, cancel_futures=True)
+        if scan_pool is not None:
+            scan_pool.shutdown(wait=True, cancel_futures=True)
+        client.cache = None
+        client.close()
         db.close()
 
 
-def discover_repos(config: AppConfig) -> list[RepoDescriptor]:
-    repos: list[RepoDescriptor] = []
-    for provider_settings in config.providers:
-        provider = build_provider(provider_settings)
-        repos.extend(provider.list_repos())
+def _sync_if_changed(
+    repo: RepoDescriptor,
+    config: AppConfig,
+    settings: ProviderSettings,
+    previous_sha: str | None,
+) -> SyncedRepo | None:
+    """Sync a repo, or return None when its remote head is still the last scanned commit."""
+    if previous_sha and read_remote_head(repo, settings.use_token_for_clone) == previous_sha:
+        return None
+    return sync_repo(
+        repo,
+        cache_root=config.repo_cache_dir,
+        use_token_for_clone=settings.use_token_for_clone,
+        mode=config.sync_mode,
+        blob_size_limit=config.scan.max_file_size_bytes,
+    )
+
+
+@dataclass(frozen=True)
+class _ScanJob:
+    repo_path: Path
+    rules: list[SignalRule]
+    scan_settings: ScanSettings
+    only_paths: frozenset[str] | None
+    findings_cache_path: str | None
+    object_store: bool
+
+
+def _plan_scan(
+    db: Database,
+    synced: SyncedRepo,
+    rules: list[SignalRule],
+    config: AppConfig,
+    *,
+    repo_id: int,
+    mode: str,
+    fingerprint: str,
+) -> tuple[_ScanJob, list[Finding]] | None:
+    """Decide what to scan for a synced repo; None means it is unchanged and can be skipped.
+
+    Also returns the previous run's findings to carry forward when only changed files are
+    rescanned. Nothing is reused when the last scan ran with other rules or detectors.
+    """
+    incremental = mode == "incremental" and db.get_last_scan_fingerprint(repo_id) == fingerprint
+    previous_sha = db.get_last_commit_sha(repo_id)
+    if incremental and previous_sha and synced.commit_sha and previous_sha == synced.commit_sha:
+        return None
+
+    changes = None
+    previous_run_id = db.get_last_scanned_run_id(repo_id)
+    if incremental and previous_sha and synced.commit_sha and previous_run_id is not None:
+        changes = diff_commits(synced.repo_path, previous_sha, synced.commit_sha)
+
+    job = _ScanJob(
+        repo_path=synced.repo_path,
+        rules=rules,
+        scan_settings=config.scan,
+        only_paths=None,
+        findings_cache_path=config.findings_cache_path,
+        object_store=synced.object_store,
+    )
+    if changes is None:
+        return job, []
+
+    # Rescan only files touched since the last scanned commit and carry the rest forward.
+    touched = changes.changed_paths | changes.deleted_paths
+    previous = db.get_findings(previous_run_id, repo_id)
+    if not can_carry_forward(previous, rules, config.scan, synced.repo_path, object_store=synced.object_store):
+        return job, []
+    carried = [item for item in previous if item.file_path not in touched]
+    return replace(job, only_paths=changes.changed_paths), carried
+
+
+def _run_scan_job(job: _ScanJob) -> list[Finding]:
+    # Runs in a worker process, so it opens its own connection to the findings cache.
+    if job.only_paths is not None and not job.only_paths:
+        return []
+    findings_cache = FindingsCache(job.findings_cache_path) if job.findings_cache_path else None
+    try:
+        return scan_repository(
+            job.repo_path,
+            job.rules,
+            job.scan_settings,
+            only_paths=job.only_paths,
+            findings_cache=findings_cache,
+            object_store=job.object_store,
+        )
+    finally:
+        if findings_cache is not None:
+            findings_cache.close()
+
+
+def discover_repos(config: AppConfig, *, refresh: bool = False) -> list[RepoDescriptor]:
+    db = Database(config.db_path)
+    db.init_schema()
+    client = default_client()
+    client.cache = _response_cache(config, refresh=refresh)
+    try:
+        repos = list(iter_discovered_repos(config, db, refresh=refresh))
+    finally:
+        client.cache = None
+        client.close()
+        db.close()
     repos.sort(key=lambda item: (item.provider_name, item.full_name))
     return repos
 
 
+def iter_discovered_repos(config: AppConfig, db: Database, *, refresh: bool = False) -> Iterator[RepoDescriptor]:
+    """Yield repos provider by provider, page by page, as the listings arrive.
+
+    A provider's complete listing is stored in the ``repos`` table; within
+    ``repo_list_ttl_seconds`` it is served from there without calling the provider.
+    """
+    for provider_settings in config.providers:
+        settings_key = _listing_key(provider_settings)
+        # Walking a local directory is as cheap as reading it back, and picks up new checkouts.
+        if not refresh and provider_settings.type != "local" and config.repo_list_ttl_seconds > 0:
+            listed = db.get_listed_repos(provider_settings.name, settings_key, config.repo_list_ttl_seconds)
+            if listed is not None:
+                token = _token_from_env(provider_settings.token_env)
+                for repo in listed:
+                    yield replace(repo, auth_token=token)
+                continue
+
+        listed_at = utc_now()
+        # Discovery caches live next to the database.
+        provider = build_provider(provider_settings, cache_dir=Path(config.db_path).parent)
+        listed: list[RepoDescriptor] = []
+        for repo in provider.iter_repos():
+            listed.append(repo)
+            yield repo
+        # One transaction for the whole listing rather than a commit per repo.
+        db.record_provider_listing(provider_settings.name, settings_key, listed_at, listed)
+
+
+def _listing_key(settings: ProviderSettings) -> str:
+    # Editing a provider's config (org, project, base URL...) invalidates its stored listing.
+    raw = json.dumps(asdict(settings), sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _token_from_env(token_env: str | None) -> str | None:
+    if not token_env:
+        return None
+    token = os.getenv(token_env)
+    if token:
+        return token.strip()
+    return None
+
+
+def _response_cache(config: AppConfig, *, refresh: bool) -> ResponseCache:
+    return ResponseCache(
+        Path(config.db_path).parent / HTTP_CACHE_DIRNAME,
+        ttl_seconds=config.discovery_cache_ttl_seconds,
+        refresh=refresh,
+    )
+
+
 def _filter_repos(
-    repos: list[RepoDescriptor],
+    repos: Iterable[RepoDescriptor],
     *,
     include_patterns: tuple[str, ...],
     exclude_patterns: tuple[str, ...],
     repo_regex: str | None,
-) -> list[RepoDescriptor]:
+) -> Iterator[RepoDescriptor]:
     include_compiled = [re.compile(pat) for pat in include_patterns if pat]
     exclude_compiled = [re.compile(pat) for pat in exclude_patterns if pat]
     one_off_regex = re.compile(repo_regex) if repo_regex else None
 
-    filtered: list[RepoDescriptor] = []
     for repo in repos:
         text = repo.full_name
 
@@ -147,6 +413,4 @@ def _filter_repos(
         if one_off_regex and not one_off_regex.search(text):
             continue
 
-        filtered.append(repo)
-
-    return filtered
+        yield repo
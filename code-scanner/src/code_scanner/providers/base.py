@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 from code_scanner.models import RepoDescriptor
 
 
 class RepoProvider(ABC):
     @abstractmethod
-    def list_repos(self) -> list[RepoDescriptor]:
+    def iter_repos(self) -> Iterator[RepoDescriptor]:
+        """Yield repos as each page of the listing arrives."""
         raise NotImplementedError
+
+    def list_repos(self) -> list[RepoDescriptor]:
+        return list(self.iter_repos())
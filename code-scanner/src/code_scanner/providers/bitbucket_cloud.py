@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+from typing import Iterator
 from urllib.parse import urlencode
 
 from code_scanner.http import get_json
@@ -8,6 +9,19 @@ from code_scanner.models import ProviderSettings, RepoDescriptor
 from code_scanner.providers.base import RepoProvider
 
 
+# Partial response: only the fields list_repos reads, which shrinks each page considerably.
+REPO_FIELDS = ",".join(
+    [
+        "next",
+        "values.uuid",
+        "values.full_name",
+        "values.links.clone",
+        "values.links.html.href",
+        "values.mainbranch.name",
+    ]
+)
+
+
 class BitbucketCloudProvider(RepoProvider):
     def __init__(self, settings: ProviderSettings):
         self.settings = settings
@@ -15,7 +29,7 @@ class BitbucketCloudProvider(RepoProvider):
             raise ValueError("Bitbucket cloud provider requires 'workspace'")
         self.base_url = (settings.base_url or "https://api.bitbucket.org/2.0").rstrip("/")
 
-    def list_repos(self) -> list[RepoDescriptor]:
+    def iter_repos(self) -> Iterator[RepoDescriptor]:
         token = _token_from_env(self.settings.token_env)
         headers = {
             "User-Agent": "code-scanner/0.1",
@@ -24,8 +38,8 @@ class BitbucketCloudProvider(RepoProvider):
         if token:
             headers["Authorization"] = f"Bearer {token}"
 
-        repos: list[RepoDescriptor] = []
-        url = f"{self.base_url}/repositories/{self.settings.workspace}?{urlencode({'pagelen': 100})}"
+        query = urlencode({"pagelen": 100, "fields": REPO_FIELDS})
+        url = f"{self.base_url}/repositories/{self.settings.workspace}?{query}"
 
         while url:
             response = get_json(url, headers=headers)
@@ -55,18 +69,16 @@ class BitbucketCloudProvider(RepoProvider):
                 if isinstance(mainbranch, dict):
                     default_branch = str(mainbranch.get("name") or "") or None
 
-                repos.append(
-                    RepoDescriptor(
-                        provider_name=self.settings.name,
-                        provider_type=self.settings.type,
-                        external_id=uuid,
-                        full_name=full_name,
-                        clone_url=clone_url,
-                        default_branch=default_branch or "main",
-                        web_url=web_url,
-                        auth_token=token,
-                        clone_auth_user="x-token-auth",
-                    )
+                yield RepoDescriptor(
+                    provider_name=self.settings.name,
+                    provider_type=self.settings.type,
+                    external_id=uuid,
+                    full_name=full_name,
+                    clone_url=clone_url,
+                    default_branch=default_branch or "main",
+                    web_url=web_url,
+                    auth_token=token,
+                    clone_auth_user="x-token-auth",
                 )
 
             if not isinstance(data, dict):
@@ -74,8 +86,6 @@ class BitbucketCloudProvider(RepoProvider):
             next_url = data.get("next")
             url = str(next_url) if next_url else ""
 
-        return repos
-
 
 def _token_from_env(token_env: str | None) -> str | None:
     if not token_env:
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
 from urllib.parse import urlencode
 
 from code_scanner.http import get_json
@@ -8,16 +13,20 @@ from code_scanner.models import ProviderSettings, RepoDescriptor
 from code_scanner.providers.base import RepoProvider
 
 
+DEFAULT_BRANCH_CACHE_FILENAME = "bitbucket_server_default_branches.json"
+
+
 class BitbucketServerProvider(RepoProvider):
-    def __init__(self, settings: ProviderSettings):
+    def __init__(self, settings: ProviderSettings, cache_dir: str | Path | None = None):
         self.settings = settings
+        self.cache_dir = Path(cache_dir) if cache_dir else None
         if not settings.project_key:
             raise ValueError("Bitbucket server provider requires 'project_key'")
         if not settings.base_url:
             raise ValueError("Bitbucket server provider requires 'base_url'")
         self.base_url = settings.base_url.rstrip("/")
 
-    def list_repos(self) -> list[RepoDescriptor]:
+    def iter_repos(self) -> Iterator[RepoDescriptor]:
         token = _token_from_env(self.settings.token_env)
         headers = {
             "User-Agent": "code-scanner/0.1",
@@ -26,7 +35,10 @@ class BitbucketServerProvider(RepoProvider):
         if token:
             headers["Authorization"] = f"Bearer {token}"
 
-        repos: list[RepoDescriptor] = []
+        cache = _BranchCache(
+            self.cache_dir / DEFAULT_BRANCH_CACHE_FILENAME if self.cache_dir else None,
+            ttl_seconds=self.settings.default_branch_cache_ttl_seconds,
+        )
         start = 0
         limit = 100
 
@@ -41,6 +53,7 @@ class BitbucketServerProvider(RepoProvider):
             if not isinstance(data, dict):
                 raise RuntimeError("Bitbucket server API returned invalid payload")
 
+            pending: list[dict] = []
             values = data.get("values", [])
             for item in values:
                 repo_id = str(item.get("id") or "").strip()
@@ -66,32 +79,69 @@ class BitbucketServerProvider(RepoProvider):
                 if isinstance(self_links, list) and self_links:
                     web_url = str(self_links[0].get("href") or "") or None
 
-                default_branch = _read_default_branch(
-                    base_url=self.base_url,
-                    project_key=project_key,
-                    slug=slug,
-                    headers=headers,
+                pending.append(
+                    {
+                        "external_id": repo_id,
+                        "full_name": full_name,
+                        "project_key": project_key,
+                        "slug": slug,
+                        "clone_url": clone_url,
+                        "web_url": web_url,
+                    }
                 )
 
-                repos.append(
-                    RepoDescriptor(
-                        provider_name=self.settings.name,
-                        provider_type=self.settings.type,
-                        external_id=repo_id,
-                        full_name=full_name,
-                        clone_url=clone_url,
-                        default_branch=default_branch or "main",
-                        web_url=web_url,
-                        auth_token=token,
-                        clone_auth_user="x-token-auth",
-                    )
+            if self.settings.default_branch_source == "remote_head":
+                # Let the clone follow the remote HEAD symref instead of asking the API per repo.
+                branches: list[str | None] = [None] * len(pending)
+            else:
+                branches = self._default_branches(pending, headers, cache)
+
+            for item, branch in zip(pending, branches):
+                yield RepoDescriptor(
+                    provider_name=self.settings.name,
+                    provider_type=self.settings.type,
+                    external_id=item["external_id"],
+                    full_name=item["full_name"],
+                    clone_url=item["clone_url"],
+                    default_branch=branch,
+                    web_url=item["web_url"],
+                    auth_token=token,
+                    clone_auth_user="x-token-auth",
                 )
 
             if bool(data.get("isLastPage", True)):
                 break
             start = int(data.get("nextPageStart", start + limit))
 
-        return repos
+    def _default_branches(
+        self,
+        pending: list[dict],
+        headers: dict[str, str],
+        cache: _BranchCache,
+    ) -> list[str]:
+        keys = [f"{self.base_url}|{item['project_key']}/{item['slug']}" for item in pending]
+        branches = [cache.get(key) for key in keys]
+        misses = [index for index, branch in enumerate(branches) if branch is None]
+
+        if misses:
+            def lookup(index: int) -> str | None:
+                item = pending[index]
+                return _read_default_branch(
+                    base_url=self.base_url,
+                    project_key=item["project_key"],
+                    slug=item["slug"],
+                    headers=headers,
+                )
+
+            workers = min(max(1, self.settings.discovery_workers), len(misses))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bitbucket-branches") as pool:
+                for index, branch in zip(misses, pool.map(lookup, misses)):
+                    if branch:
+                        cache.put(keys[index], branch)
+                    branches[index] = branch
+            cache.save()
+
+        return [branch or "main" for branch in branches]
 
 
 def _read_default_branch(
@@ -118,6 +168,41 @@ def _read_default_branch(
     return str(data.get("displayId") or "") or None
 
 
+class _BranchCache:
+    """Default branches from earlier runs, keyed by repo, each valid for ``ttl_seconds``."""
+
+    def __init__(self, path: Path | None, ttl_seconds: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.entries: dict[str, dict] = {}
+        if path is not None and path.exists():
+            try:
+                loaded = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                loaded = {}
+            if isinstance(loaded, dict):
+                self.entries = loaded
+
+    def get(self, key: str) -> str | None:
+        entry = self.entries.get(key)
+        if not isinstance(entry, dict):
+            return None
+        if time.time() - float(entry.get("fetched_at", 0)) > self.ttl_seconds:
+            return None
+        return str(entry.get("branch") or "") or None
+
+    def put(self, key: str, branch: str) -> None:
+        self.entries[key] = {"branch": branch, "fetched_at": time.time()}
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.entries, sort_keys=True), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+
 def _token_from_env(token_env: str | None) -> str | None:
     if not token_env:
         return None
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
 import os
-from urllib.parse import urlencode
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+from urllib.parse import parse_qs, urlencode, urlsplit
 
-from code_scanner.http import get_json
+from code_scanner.http import HttpResponse, get_json
 from code_scanner.models import ProviderSettings, RepoDescriptor
 from code_scanner.providers.base import RepoProvider
 
 
+_LINK_LAST = re.compile(r'<([^>]+)>\s*;\s*rel="last"')
+
+
 class GitHubProvider(RepoProvider):
     def __init__(self, settings: ProviderSettings):
         self.settings = settings
@@ -15,7 +21,7 @@ class GitHubProvider(RepoProvider):
             raise ValueError("GitHub provider requires 'org'")
         self.base_url = (settings.base_url or "https://api.github.com").rstrip("/")
 
-    def list_repos(self) -> list[RepoDescriptor]:
+    def iter_repos(self) -> Iterator[RepoDescriptor]:
         token = _token_from_env(self.settings.token_env)
         headers = {
             "Accept": "application/vnd.github+json",
@@ -24,18 +30,24 @@ class GitHubProvider(RepoProvider):
         if token:
             headers["Authorization"] = f"Bearer {token}"
 
-        repos: list[RepoDescriptor] = []
         per_page = 100
         owner = str(self.settings.org)
-        owner_scope, page_data = _resolve_owner_scope(
+        owner_scope, first_page = _resolve_owner_scope(
             base_url=self.base_url,
             owner=owner,
             headers=headers,
             per_page=per_page,
         )
 
-        page = 1
-        while True:
+        def fetch_page(page: int) -> list[dict]:
+            query = urlencode({"per_page": per_page, "page": page, "type": "all"})
+            url = f"{self.base_url}/{owner_scope}/{owner}/repos?{query}"
+            page_data = get_json(url, headers=headers).data
+            if not isinstance(page_data, list):
+                raise RuntimeError("GitHub API returned invalid repos payload")
+            return page_data
+
+        def descriptors(page_data: list[dict]) -> Iterator[RepoDescriptor]:
             for item in page_data:
                 descriptor = _to_repo_descriptor(
                     item=item,
@@ -44,20 +56,26 @@ class GitHubProvider(RepoProvider):
                     auth_token=token,
                 )
                 if descriptor:
-                    repos.append(descriptor)
-
-            if len(page_data) < per_page:
-                break
+                    yield descriptor
 
+        yield from descriptors(first_page.data)
+        page_data = first_page.data
+        page = 1
+        last_page = _last_page(first_page)
+        if last_page is not None and last_page > 1:
+            # The first response names the last page, so the rest can be fetched at once;
+            # map() yields them in page order as they complete.
+            workers = min(max(1, self.settings.discovery_workers), last_page - 1)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="github-pages") as pool:
+                for page_data in pool.map(fetch_page, range(2, last_page + 1)):
+                    yield from descriptors(page_data)
+            page = last_page
+
+        # Without a Link header, or if repos were added while listing, keep walking page by page.
+        while len(page_data) >= per_page:
             page += 1
-            query = urlencode({"per_page": per_page, "page": page, "type": "all"})
-            url = f"{self.base_url}/{owner_scope}/{owner}/repos?{query}"
-            response = get_json(url, headers=headers)
-            page_data = response.data
-            if not isinstance(page_data, list):
-                raise RuntimeError("GitHub API returned invalid repos payload")
-
-        return repos
+            page_data = fetch_page(page)
+            yield from descriptors(page_data)
 
 
 def _resolve_owner_scope(
@@ -66,7 +84,7 @@ def _resolve_owner_scope(
     owner: str,
     headers: dict[str, str],
     per_page: int,
-) -> tuple[str, list[dict]]:
+) -> tuple[str, HttpResponse]:
     query = urlencode({"per_page": per_page, "page": 1, "type": "all"})
     org_url = f"{base_url}/orgs/{owner}/repos?{query}"
     try:
@@ -79,11 +97,21 @@ def _resolve_owner_scope(
         response = get_json(user_url, headers=headers)
         if not isinstance(response.data, list):
             raise RuntimeError("GitHub API returned invalid repos payload")
-        return "users", response.data
+        return "users", response
 
     if not isinstance(response.data, list):
         raise RuntimeError("GitHub API returned invalid repos payload")
-    return "orgs", response.data
+    return "orgs", response
+
+
+def _last_page(response: HttpResponse) -> int | None:
+    match = _LINK_LAST.search(response.headers.get("link", ""))
+    if not match:
+        return None
+    values = parse_qs(urlsplit(match.group(1)).query).get("page")
+    if not values or not values[0].isdigit():
+        return None
+    return int(values[0])
 
 
 def _to_repo_descriptor(
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Iterator
 
 from code_scanner.models import ProviderSettings, RepoDescriptor
 from code_scanner.providers.base import RepoProvider
@@ -12,32 +13,27 @@ class LocalProvider(RepoProvider):
         if not settings.root_dir:
             raise ValueError("Local provider requires 'root_dir'")
 
-    def list_repos(self) -> list[RepoDescriptor]:
+    def iter_repos(self) -> Iterator[RepoDescriptor]:
         root = Path(self.settings.root_dir).resolve()
         if not root.exists():
             raise RuntimeError(f"Local provider root_dir does not exist: {root}")
 
         repo_paths = _find_git_repos(root, recursive=self.settings.recursive)
-        repos: list[RepoDescriptor] = []
         for path in repo_paths:
             relative_name = str(path.relative_to(root)) if path != root else path.name
             external_id = relative_name or path.name
             full_name = f"local/{external_id}"
-            repos.append(
-                RepoDescriptor(
-                    provider_name=self.settings.name,
-                    provider_type=self.settings.type,
-                    external_id=external_id,
-                    full_name=full_name,
-                    clone_url=None,
-                    default_branch=None,
-                    web_url=None,
-                    local_path=str(path),
-                )
+            yield RepoDescriptor(
+                provider_name=self.settings.name,
+                provider_type=self.settings.type,
+                external_id=external_id,
+                full_name=full_name,
+                clone_url=None,
+                default_branch=None,
+                web_url=None,
+                local_path=str(path),
             )
 
-        return repos
-
 
 def _find_git_repos(root: Path, recursive: bool) -> list[Path]:
     repos: list[Path] = []
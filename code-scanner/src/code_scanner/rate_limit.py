@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable
+
+
+class RateLimiter:
+    """Per-host request scheduler driven by the provider's rate-limit headers.
+
+    ``X-RateLimit-Remaining``/``X-RateLimit-Reset`` set a budget per host: when few
+    requests remain, the rest are spread evenly until the reset, and when none remain,
+    callers wait for the reset. Throttled responses (429, or 403 carrying rate-limit
+    headers) are retried after ``Retry-After`` or an exponential backoff with jitter.
+    All waiting is added to ``throttled_seconds``.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 120.0,
+        pace_below: int = 50,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.pace_below = pace_below
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._hosts: dict[str, _HostBudget] = {}
+        self._throttled_seconds = 0.0
+
+    @property
+    def throttled_seconds(self) -> float:
+        with self._lock:
+            return self._throttled_seconds
+
+    def acquire(self, host: str) -> None:
+        """Block until a request to ``host`` fits the current budget."""
+        with self._lock:
+            budget = self._hosts.setdefault(host, _HostBudget())
+            now = self._clock()
+            start = max(now, budget.blocked_until, budget.next_slot)
+            if budget.remaining is not None and budget.reset_at > now:
+                if budget.remaining <= 0:
+                    start = max(start, budget.reset_at)
+                elif budget.remaining < self.pace_below:
+                    # Spread what is left of the window instead of spending it in one burst.
+                    budget.next_slot = start + max(0.0, budget.reset_at - start) / budget.remaining
+                budget.remaining -= 1
+            delay = start - now
+        if delay > 0:
+            self._wait(delay)
+
+    def retry_delay(
+        self,
+        host: str,
+        status: int,
+        headers: dict[str, str],
+        attempt: int,
+    ) -> float | None:
+        """Record the response's rate-limit headers; return seconds to wait before a retry, if any.
+
+        The wait itself happens in the next ``acquire`` for the host.
+        """
+        now = self._clock()
+        remaining = _int_header(headers, "x-ratelimit-remaining")
+        reset = _int_header(headers, "x-ratelimit-reset")
+        retry_after = _retry_after(headers, now)
+
+        with self._lock:
+            budget = self._hosts.setdefault(host, _HostBudget())
+            if remaining is not None:
+                budget.remaining = remaining
+            if reset is not None:
+                budget.reset_at = float(reset)
+
+        throttled = status == 429 or (status == 403 and (retry_after is not None or remaining == 0))
+        if not throttled or attempt >= self.max_retries:
+            return None
+
+        if retry_after is not None:
+            delay = retry_after
+        elif remaining == 0 and reset is not None and reset > now:
+            delay = reset - now
+        else:
+            delay = min(self.max_delay, self.base_delay * (2**attempt))
+        # Jitter keeps parallel workers from retrying in lockstep.
+        delay = min(self.max_delay, delay) + random.uniform(0, self.base_delay)
+
+        with self._lock:
+            budget = self._hosts[host]
+            budget.blocked_until = max(budget.blocked_until, now + delay)
+        return delay
+
+    def _wait(self, delay: float) -> None:
+        with self._lock:
+            self._throttled_seconds += delay
+        self._sleep(delay)
+
+
+class _HostBudget:
+    __slots__ = ("remaining", "reset_at", "blocked_until", "next_slot")
+
+    def __init__(self):
+        self.remaining: int | None = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.next_slot = 0.0
+
+
+def _int_header(headers: dict[str, str], name: str) -> int | None:
+    value = headers.get(name, "").strip()
+    return int(value) if value.isdigit() else None
+
+
+def _retry_after(headers: dict[str, str], now: float) -> float | None:
+    value = headers.get("retry-after", "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
+import os
 import subprocess
 from pathlib import Path
 from urllib.parse import quote, urlsplit, urlunsplit
 
-from code_scanner.models import RepoDescriptor, SyncedRepo
+from code_scanner.models import RepoChanges, RepoDescriptor, SyncedRepo
 
 
 class RepoSyncError(RuntimeError):
     pass
 
 
-def sync_repo(repo: RepoDescriptor, cache_root: str | Path, use_token_for_clone: bool) -> SyncedRepo:
+def sync_repo(
+    repo: RepoDescriptor,
+    cache_root: str | Path,
+    use_token_for_clone: bool,
+    *,
+    mode: str = "worktree",
+    blob_size_limit: int | None = None,
+) -> SyncedRepo:
     if repo.local_path:
         local = Path(repo.local_path).resolve()
         if not local.exists():
@@ -30,18 +38,20 @@ def sync_repo(repo: RepoDescriptor, cache_root: str | Path, use_token_for_clone:
     if use_token_for_clone and repo.auth_token:
         tokenized_clone_url = _inject_token(clone_url, repo.auth_token, repo.clone_auth_user)
 
-    if not repo_dir.exists():
-        branch = repo.default_branch or "main"
-        cmd = [
-            "git",
-            "clone",
-            "--depth",
-            "1",
-            "--branch",
-            branch,
+    if mode == "object_store":
+        return _sync_object_store(
+            repo_dir.with_name(f"{repo_dir.name}.git"),
             tokenized_clone_url,
-            str(repo_dir),
-        ]
+            repo.default_branch,
+            blob_size_limit,
+        )
+
+    if not repo_dir.exists():
+        cmd = ["git", "clone", "--depth", "1"]
+        if repo.default_branch:
+            cmd.extend(["--branch", repo.default_branch])
+        # Without a known default branch, the clone checks out the remote HEAD.
+        cmd.extend([tokenized_clone_url, str(repo_dir)])
         _run_git(cmd)
     else:
         _run_git(["git", "-C", str(repo_dir), "remote", "set-url", "origin", tokenized_clone_url])
@@ -56,13 +66,114 @@ def sync_repo(repo: RepoDescriptor, cache_root: str | Path, use_token_for_clone:
             )
             if checkout.returncode != 0:
                 _run_git(["git", "-C", str(repo_dir), "checkout", "-B", branch, f"origin/{branch}"])
-            _run_git(["git", "-C", str(repo_dir), "pull", "--ff-only", "origin", branch])
+            # A depth-1 fetch cannot fast-forward once the remote moves on, so move the
+            # scanner-owned checkout straight to the fetched tip.
+            _run_git(["git", "-C", str(repo_dir), "reset", "--hard", f"origin/{branch}"])
         else:
-            _run_git(["git", "-C", str(repo_dir), "pull", "--ff-only"])
+            _run_git(["git", "-C", str(repo_dir), "reset", "--hard", "@{upstream}"])
 
     return SyncedRepo(repo_path=repo_dir, commit_sha=_read_head_sha(repo_dir))
 
 
+def _sync_object_store(
+    repo_dir: Path,
+    clone_url: str,
+    branch: str | None,
+    blob_size_limit: int | None,
+) -> SyncedRepo:
+    """Keep a bare, shallow clone whose HEAD is the branch tip; no working tree is checked out."""
+    filter_args: list[str] = []
+    if blob_size_limit is not None and blob_size_limit >= 0:
+        # blob:limit=n omits blobs of n bytes or more, so files at the size limit are kept.
+        filter_args = [f"--filter=blob:limit={blob_size_limit + 1}"]
+
+    if not repo_dir.exists():
+        cmd = ["git", "clone", "--bare", "--depth", "1", *filter_args]
+        if branch:
+            cmd.extend(["--branch", branch])
+        cmd.extend([clone_url, str(repo_dir)])
+        _run_git(cmd)
+    else:
+        _run_git(["git", "-C", str(repo_dir), "remote", "set-url", "origin", clone_url])
+        if branch:
+            _run_git(
+                [
+                    "git",
+                    "-C",
+                    str(repo_dir),
+                    "fetch",
+                    "origin",
+                    "--depth",
+                    "1",
+                    *filter_args,
+                    f"+refs/heads/{branch}:refs/heads/{branch}",
+                ]
+            )
+            _run_git(["git", "-C", str(repo_dir), "symbolic-ref", "HEAD", f"refs/heads/{branch}"])
+        else:
+            _run_git(["git", "-C", str(repo_dir), "fetch", "origin", "--depth", "1", *filter_args, "HEAD"])
+            _run_git(["git", "-C", str(repo_dir), "update-ref", "HEAD", "FETCH_HEAD"])
+
+    return SyncedRepo(repo_path=repo_dir, commit_sha=_read_head_sha(repo_dir), object_store=True)
+
+
+def read_remote_head(repo: RepoDescriptor, use_token_for_clone: bool) -> str | None:
+    """Resolve the remote SHA of the branch sync_repo would check out, without fetching.
+
+    Returns None for local repos or when the remote cannot be queried.
+    """
+    if repo.local_path or not repo.clone_url:
+        return None
+
+    clone_url = repo.clone_url
+    if use_token_for_clone and repo.auth_token:
+        clone_url = _inject_token(clone_url, repo.auth_token, repo.clone_auth_user)
+    ref = f"refs/heads/{repo.default_branch}" if repo.default_branch else "HEAD"
+
+    try:
+        process = subprocess.run(
+            ["git", "ls-remote", clone_url, ref],
+            text=True,
+            capture_output=True,
+            timeout=120,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+        )
+    except subprocess.TimeoutExpired:
+        return None
+    if process.returncode != 0:
+        return None
+
+    for line in process.stdout.splitlines():
+        sha, _, name = line.partition("\t")
+        if name == ref:
+            return sha.strip() or None
+    return None
+
+
+def diff_commits(repo_path: Path, base_sha: str, head_sha: str) -> RepoChanges | None:
+    """List files added/modified and deleted between two commits, or None if git cannot diff them."""
+    process = subprocess.run(
+        ["git", "-C", str(repo_path), "diff", "--name-status", "--no-renames", "-z", base_sha, head_sha],
+        text=True,
+        capture_output=True,
+    )
+    if process.returncode != 0:
+        return None
+
+    changed: set[str] = set()
+    deleted: set[str] = set()
+    fields = process.stdout.split("\0")
+    for status, path in zip(fields[0::2], fields[1::2]):
+        if not status or not path:
+            continue
+        if status.startswith("D"):
+            deleted.add(path)
+        else:
+            changed.add(path)
+
+    return RepoChanges(changed_paths=frozenset(changed), deleted_paths=frozenset(deleted))
+
+
 def _safe_repo_dirname(provider_name: str, full_name: str) -> str:
     safe = full_name.replace("/", "__").replace(" ", "_")
     return f"{provider_name}__{safe}"
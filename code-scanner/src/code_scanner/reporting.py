@@ -5,7 +5,7 @@ import json
 from datetime import datetime, timezone
 from pathlib import Path
 
-from code_scanner.db import Database
+from code_scanner.db import NEW_SPAN_CONDITION, RESOLVED_SPAN_CONDITION, TOP_FINDINGS_LIMIT, Database
 
 
 def generate_reports(
@@ -13,7 +13,10 @@ def generate_reports(
     db_path: str,
     output_dir: str,
     run_id: int | None = None,
+    include_new_findings: bool = False,
 ) -> dict:
+    """Write the run's summary and aggregate CSVs; ``new_findings.csv`` is opt-in because
+    it is the only file that is not served from stored rollups."""
     out_dir = Path(output_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
@@ -32,6 +35,113 @@ def generate_reports(
 
     run_row = dict(run_rows[0])
 
+    if run_row.get("rollups_ready"):
+        by_repo, by_signal, top_findings = _stored_aggregates(db, int(target_run))
+    else:
+        by_repo, by_signal, top_findings = _live_aggregates(db, int(target_run))
+
+    if run_row.get("rollups_ready") and run_row.get("new_findings") is not None:
+        new_count, resolved_count = int(run_row["new_findings"]), int(run_row["resolved_findings"])
+    else:
+        new_count, resolved_count = _live_change_counts(db, int(target_run))
+
+    summary = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "db_path": str(Path(db_path).resolve()),
+        "run": run_row,
+        "counts": {
+            "repos_with_findings": len(by_repo),
+            "signals_triggered": len(by_signal),
+            "top_findings_rows": len(top_findings),
+            "new_findings": new_count,
+            "resolved_findings": resolved_count,
+        },
+        "files": {},
+    }
+
+    run_json = out_dir / "run_summary.json"
+    repo_csv = out_dir / "findings_by_repo.csv"
+    signal_csv = out_dir / "findings_by_signal.csv"
+    top_csv = out_dir / "top_findings.csv"
+
+    _write_json(run_json, summary)
+    _write_csv(repo_csv, by_repo)
+    _write_csv(signal_csv, by_signal)
+    _write_csv(top_csv, top_findings)
+
+    summary["files"] = {
+        "run_summary": str(run_json.resolve()),
+        "findings_by_repo": str(repo_csv.resolve()),
+        "findings_by_signal": str(signal_csv.resolve()),
+        "top_findings": str(top_csv.resolve()),
+    }
+    if include_new_findings:
+        new_csv = out_dir / "new_findings.csv"
+        _write_csv(new_csv, _new_findings(db, int(target_run)))
+        summary["files"]["new_findings"] = str(new_csv.resolve())
+
+    _write_json(run_json, summary)
+    db.close()
+    return summary
+
+
+def _stored_aggregates(db: Database, target_run: int) -> tuple[list[dict], list[dict], list[dict]]:
+    """Read the rollups written while the run was recorded and finished."""
+    by_repo = [
+        dict(row)
+        for row in db.query(
+            """
+            SELECT
+                r.full_name AS repo,
+                SUM(x.finding_count) AS finding_count,
+                SUM(x.high_count) AS high_count,
+                SUM(x.medium_count) AS medium_count,
+                SUM(x.low_count) AS low_count
+            FROM run_repo_rollup x
+            JOIN repos r ON r.id = x.repo_id
+            WHERE x.run_id = ? AND x.finding_count > 0
+            GROUP BY r.full_name
+            ORDER BY finding_count DESC, repo ASC
+            """,
+            (target_run,),
+        )
+    ]
+
+    by_signal = [
+        dict(row)
+        for row in db.query(
+            """
+            SELECT
+                s.signal_code,
+                s.category,
+                s.severity,
+                x.finding_count
+            FROM run_signal_rollup x
+            JOIN signals s ON s.id = x.signal_id
+            WHERE x.run_id = ? AND x.finding_count > 0
+            ORDER BY x.finding_count DESC, s.signal_code ASC, s.category ASC, s.severity ASC
+            """,
+            (target_run,),
+        )
+    ]
+
+    top_findings = [
+        dict(row)
+        for row in db.query(
+            """
+            SELECT repo, file_path, line_number, signal_code, category, severity, detector, confidence, evidence
+            FROM run_top_findings
+            WHERE run_id = ?
+            ORDER BY position
+            """,
+            (target_run,),
+        )
+    ]
+    return by_repo, by_signal, top_findings
+
+
+def _live_aggregates(db: Database, target_run: int) -> tuple[list[dict], list[dict], list[dict]]:
+    """Aggregate straight from the findings view, for runs without stored rollups."""
     by_repo = [
         dict(row)
         for row in db.query(
@@ -64,7 +174,7 @@ def generate_reports(
             FROM findings
             WHERE run_id = ?
             GROUP BY signal_code, category, severity
-            ORDER BY finding_count DESC, signal_code ASC
+            ORDER BY finding_count DESC, signal_code ASC, category ASC, severity ASC
             """,
             (int(target_run),),
         )
@@ -92,44 +202,52 @@ def generate_reports(
                 r.full_name ASC,
                 f.file_path ASC,
                 f.line_number ASC
-            LIMIT 2000
+            LIMIT ?
             """,
-            (int(target_run),),
+            (int(target_run), TOP_FINDINGS_LIMIT),
         )
     ]
 
-    summary = {
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "db_path": str(Path(db_path).resolve()),
-        "run": run_row,
-        "counts": {
-            "repos_with_findings": len(by_repo),
-            "signals_triggered": len(by_signal),
-            "top_findings_rows": len(top_findings),
-        },
-        "files": {},
-    }
+    return by_repo, by_signal, top_findings
 
-    run_json = out_dir / "run_summary.json"
-    repo_csv = out_dir / "findings_by_repo.csv"
-    signal_csv = out_dir / "findings_by_signal.csv"
-    top_csv = out_dir / "top_findings.csv"
 
-    _write_json(run_json, summary)
-    _write_csv(repo_csv, by_repo)
-    _write_csv(signal_csv, by_signal)
-    _write_csv(top_csv, top_findings)
+def _live_change_counts(db: Database, target_run: int) -> tuple[int, int]:
+    """Count new and resolved findings from the spans, for runs without stored counts."""
+    new_rows = db.query(f"SELECT COUNT(*) FROM finding_spans f WHERE {NEW_SPAN_CONDITION}", (target_run,))
+    resolved_rows = db.query(f"SELECT COUNT(*) FROM finding_spans f WHERE {RESOLVED_SPAN_CONDITION}", (target_run,))
+    return int(new_rows[0][0]), int(resolved_rows[0][0])
 
-    summary["files"] = {
-        "run_summary": str(run_json.resolve()),
-        "findings_by_repo": str(repo_csv.resolve()),
-        "findings_by_signal": str(signal_csv.resolve()),
-        "top_findings": str(top_csv.resolve()),
-    }
 
-    _write_json(run_json, summary)
-    db.close()
-    return summary
+def _new_findings(db: Database, target_run: int) -> list[dict]:
+    return [
+        dict(row)
+        for row in db.query(
+            f"""
+            SELECT
+                r.full_name AS repo,
+                p.path AS file_path,
+                f.line_number,
+                s.signal_code,
+                s.category,
+                s.severity,
+                d.name AS detector,
+                f.confidence,
+                evidence_text(f.evidence) AS evidence
+            FROM finding_spans f
+            JOIN repos r ON r.id = f.repo_id
+            JOIN file_paths p ON p.id = f.path_id
+            JOIN signals s ON s.id = f.signal_id
+            JOIN detectors d ON d.id = f.detector_id
+            WHERE {NEW_SPAN_CONDITION}
+            ORDER BY
+                CASE s.severity WHEN 'high' THEN 1 WHEN 'medium' THEN 2 ELSE 3 END,
+                r.full_name ASC,
+                p.path ASC,
+                f.line_number ASC
+            """,
+            (target_run,),
+        )
+    ]
 
 
 def _latest_run_id(db: Database) -> int | None:
@@ -1,3 +1,8 @@
-from code_scanner.scanners.engine import scan_repository
+from code_scanner.scanners.engine import (
+    can_carry_forward,
+    merge_carried_findings,
+    scan_fingerprint,
+    scan_repository,
+)
 
-__all__ = ["scan_repository"]
+__all__ = ["can_carry_forward", "merge_carried_findings", "scan_fingerprint", "scan_repository"]
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Callable, Mapping
+
+from code_scanner.scanners.file_index import FileEntry
+
+
+class FileContentCache:
+    """Reads and decodes each file once and serves the same copy to every detector.
+
+    ``consumers`` maps a file's relative path to the number of detectors that will
+    read it. An entry is dropped as soon as the last of them calls ``release``, and
+    the cache never holds more than ``max_bytes`` of decoded text: the least recently
+    used entries are evicted first. Files without a consumer count are read through
+    without being retained.
+
+    ``reader`` supplies raw bytes for an entry (for example from the git object store);
+    by default files are read from ``entry.path``.
+    """
+
+    def __init__(
+        self,
+        consumers: Mapping[str, int] | None = None,
+        *,
+        max_bytes: int = 64 * 1024 * 1024,
+        reader: Callable[[FileEntry], bytes | None] | None = None,
+    ):
+        self.max_bytes = max(0, int(max_bytes))
+        self._remaining = dict(consumers or {})
+        self._reader = reader
+        self._entries: OrderedDict[str, _CachedContent] = OrderedDict()
+        self._cached_bytes = 0
+
+    @property
+    def cached_bytes(self) -> int:
+        return self._cached_bytes
+
+    def read_text(self, entry: FileEntry) -> str | None:
+        cached = self._lookup(entry)
+        return cached.text
+
+    def read_lines(self, entry: FileEntry) -> list[str] | None:
+        cached = self._lookup(entry)
+        if cached.text is None:
+            return None
+        if cached.lines is None:
+            cached.lines = cached.text.splitlines()
+            if entry.relative in self._entries:
+                self._cached_bytes += cached.text_bytes
+                cached.weight += cached.text_bytes
+                self._shrink()
+        return cached.lines
+
+    def release(self, entry: FileEntry) -> None:
+        remaining = self._remaining.get(entry.relative)
+        if remaining is None:
+            return
+        if remaining > 1:
+            self._remaining[entry.relative] = remaining - 1
+            return
+        del self._remaining[entry.relative]
+        self._evict(entry.relative)
+
+    def _lookup(self, entry: FileEntry) -> _CachedContent:
+        cached = self._entries.get(entry.relative)
+        if cached is not None:
+            self._entries.move_to_end(entry.relative)
+            return cached
+
+        text = self._read(entry)
+
+        cached = _CachedContent(text)
+        if self._remaining.get(entry.relative, 0) > 1 and cached.weight <= self.max_bytes:
+            self._entries[entry.relative] = cached
+            self._cached_bytes += cached.weight
+            self._shrink()
+        return cached
+
+    def _read(self, entry: FileEntry) -> str | None:
+        try:
+            if self._reader is None:
+                return entry.path.read_text(encoding="utf-8")
+            data = self._reader(entry)
+            if data is None:
+                return None
+            text = data.decode("utf-8")
+        except (UnicodeDecodeError, OSError):
+            return None
+        # Match the universal-newline translation of Path.read_text().
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
+
+    def _shrink(self) -> None:
+        while self._cached_bytes > self.max_bytes and self._entries:
+            relative = next(iter(self._entries))
+            self._evict(relative)
+
+    def _evict(self, relative: str) -> None:
+        cached = self._entries.pop(relative, None)
+        if cached is not None:
+            self._cached_bytes -= cached.weight
+
+
+class _CachedContent:
+    __slots__ = ("text", "lines", "text_bytes", "weight")
+
+    def __init__(self, text: str | None):
+        self.text = text
+        self.lines: list[str] | None = None
+        self.text_bytes = len(text) if text is not None else 0
+        self.weight = self.text_bytes
@@ -1,61 +1,223 @@
 from __future__ import annotations
 
+import hashlib
+import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from multiprocessing import get_context
 from pathlib import Path
+from typing import Callable, Collection
 
+from code_scanner.findings_cache import FindingsCache, from_cached_row
 from code_scanner.models import Finding, ScanSettings, SignalRule
-from code_scanner.scanners.java_structured import run_java_structured_scan
-from code_scanner.scanners.js_ts_structured import run_js_ts_structured_scan
-from code_scanner.scanners.notebooks import run_notebook_scan
-from code_scanner.scanners.polyglot_patterns import run_polyglot_pattern_scan
-from code_scanner.scanners.python_ast import run_python_ast_scan
-from code_scanner.scanners.rules import run_rules_scan
+from code_scanner.scanners import java_structured, js_ts_structured, notebooks, polyglot_patterns, python_ast
+from code_scanner.scanners.content import FileContentCache
+from code_scanner.scanners.file_index import (
+    FileEntry,
+    attach_blob_ids,
+    build_file_index,
+    limit_files,
+    select_files,
+)
+from code_scanner.scanners.git_objects import GitBlobReader, build_tree_index
+from code_scanner.scanners.rules import (
+    RULE_DETECTORS,
+    merge_rule_chunks,
+    ripgrep_available,
+    rules_mergeable,
+    run_rules_scan,
+)
 
 
-def scan_repository(repo_path: Path, rules: list[SignalRule], scan_settings: ScanSettings) -> list[Finding]:
-    findings: list[Finding] = []
-    findings.extend(
-        run_rules_scan(
-            repo_path,
-            rules,
-            max_file_size_bytes=scan_settings.max_file_size_bytes,
-            max_files_per_repo=scan_settings.max_files_per_repo,
-        )
-    )
-    findings.extend(
-        run_python_ast_scan(
-            repo_path,
-            max_file_size_bytes=scan_settings.max_file_size_bytes,
-            max_files_per_repo=scan_settings.max_files_per_repo,
-        )
-    )
-    findings.extend(
-        run_notebook_scan(
-            repo_path,
-            max_file_size_bytes=scan_settings.max_file_size_bytes,
-            max_files_per_repo=scan_settings.max_files_per_repo,
-        )
-    )
-    findings.extend(
-        run_js_ts_structured_scan(
-            repo_path,
-            max_file_size_bytes=scan_settings.max_file_size_bytes,
-            max_files_per_repo=scan_settings.max_files_per_repo,
-        )
+# Bump when detector logic changes in a way the signal tables do not capture, so cached
+# per-blob findings are recomputed.
+DETECTOR_LOGIC_VERSION = "1"
+
+# Smallest slice of a repo worth shipping to another process when file_workers > 1.
+MIN_FILES_PER_CHUNK = 200
+
+
+@dataclass(frozen=True)
+class _ScanContext:
+    repo_path: Path
+    rules: list[SignalRule]
+    scan_settings: ScanSettings
+    content: FileContentCache
+    use_ripgrep: bool
+
+
+@dataclass(frozen=True)
+class _Detector:
+    name: str
+    suffixes: Collection[str] | None
+    case_sensitive: bool
+    reads_content: bool
+    version: str
+    run: Callable[[_ScanContext, list[FileEntry]], list[Finding]]
+
+
+def scan_repository(
+    repo_path: Path,
+    rules: list[SignalRule],
+    scan_settings: ScanSettings,
+    *,
+    only_paths: Collection[str] | None = None,
+    findings_cache: FindingsCache | None = None,
+    object_store: bool = False,
+) -> list[Finding]:
+    """Scan a checkout, or with ``object_store`` the HEAD tree of a (bare) repository."""
+    if not object_store:
+        return _scan_files(repo_path, rules, scan_settings, only_paths, findings_cache, reader=None)
+    with GitBlobReader(repo_path) as reader:
+        return _scan_files(repo_path, rules, scan_settings, only_paths, findings_cache, reader=reader)
+
+
+def scan_fingerprint(rules: list[SignalRule], scan_settings: ScanSettings) -> str:
+    """Identify everything besides file contents that decides a repo's findings.
+
+    Findings recorded under a different fingerprint must not be carried forward.
+    """
+    detectors = _build_detectors(rules, use_ripgrep=False)
+    return _fingerprint(
+        [detector.version for detector in detectors],
+        scan_settings.max_file_size_bytes,
+        scan_settings.max_files_per_repo,
+        sorted(scan_settings.exclude_dir_names),
+        scan_settings.max_matches_per_rule,
     )
-    findings.extend(
-        run_java_structured_scan(
-            repo_path,
-            max_file_size_bytes=scan_settings.max_file_size_bytes,
-            max_files_per_repo=scan_settings.max_files_per_repo,
-        )
+
+
+def can_carry_forward(
+    previous: list[Finding],
+    rules: list[SignalRule],
+    scan_settings: ScanSettings,
+    repo_path: Path,
+    *,
+    object_store: bool = False,
+) -> bool:
+    """True when rescanning only changed files and keeping ``previous`` for the rest gives
+    exactly what a full scan would.
+
+    A limit applied in the previous scan may have dropped findings from unchanged files
+    that a full scan would now keep: a rule at ``max_matches_per_rule``, or a repo with more
+    files than ``max_files_per_repo``.
+    """
+    cap = scan_settings.max_matches_per_rule
+    if cap is not None:
+        if not rules_mergeable(rules):
+            return False
+        counts = Counter(_rule_key_of(item) for item in previous if item.detector in RULE_DETECTORS)
+        if any(count >= cap for count in counts.values()):
+            return False
+    if object_store:
+        files = build_tree_index(repo_path, scan_settings.exclude_dir_names)
+    else:
+        files = build_file_index(repo_path, scan_settings.exclude_dir_names)
+    return len(files) <= scan_settings.max_files_per_repo
+
+
+def merge_carried_findings(
+    carried: list[Finding],
+    fresh: list[Finding],
+    scan_settings: ScanSettings,
+) -> list[Finding]:
+    """Combine carried findings with those of rescanned files and re-apply the per-rule cap.
+
+    Both halves were capped on their own; in file order the cap keeps what a full scan keeps.
+    """
+    merged = carried + fresh
+    rule_findings = sorted(
+        (item for item in merged if item.detector in RULE_DETECTORS),
+        key=lambda item: (item.file_path, item.line_number or 0),
     )
-    findings.extend(
-        run_polyglot_pattern_scan(
-            repo_path,
-            max_file_size_bytes=scan_settings.max_file_size_bytes,
-            max_files_per_repo=scan_settings.max_files_per_repo,
+    others = [item for item in merged if item.detector not in RULE_DETECTORS]
+    return others + merge_rule_chunks([rule_findings], scan_settings.max_matches_per_rule)
+
+
+def _rule_key_of(item: Finding) -> tuple[str, str, str]:
+    return item.signal_code, item.category, item.severity
+
+
+def _scan_files(
+    repo_path: Path,
+    rules: list[SignalRule],
+    scan_settings: ScanSettings,
+    only_paths: Collection[str] | None,
+    findings_cache: FindingsCache | None,
+    reader: GitBlobReader | None,
+) -> list[Finding]:
+    # List the repo once and hand the same index to every detector.
+    if reader is None:
+        files = build_file_index(repo_path, scan_settings.exclude_dir_names)
+    else:
+        files = build_tree_index(repo_path, scan_settings.exclude_dir_names)
+    if only_paths is not None:
+        wanted = {Path(item).as_posix() for item in only_paths}
+        files = [entry for entry in files if Path(entry.relative).as_posix() in wanted]
+    if findings_cache is not None and reader is None:
+        files = attach_blob_ids(repo_path, files)
+
+    use_ripgrep = reader is None and ripgrep_available()
+    detectors = _build_detectors(rules, use_ripgrep)
+    selections = {
+        detector.name: list(
+            limit_files(
+                select_files(files, detector.suffixes, case_sensitive=detector.case_sensitive),
+                max_files_per_repo=scan_settings.max_files_per_repo,
+                max_file_size_bytes=scan_settings.max_file_size_bytes,
+            )
         )
-    )
+        for detector in detectors
+    }
+
+    # The per-rule cap is repo-wide, so cached rule hits can only be merged with fresh
+    # results when every finding maps back to one rule and the cap can be re-applied.
+    rule_cap = scan_settings.max_matches_per_rule
+    cache_rules = rule_cap is None or rules_mergeable(rules)
+
+    cached: dict[str, dict[str, list[tuple]]] = {}
+    pending: dict[str, list[FileEntry]] = {}
+    for detector in detectors:
+        selected = selections[detector.name]
+        hits: dict[str, list[tuple]] = {}
+        if findings_cache is not None and (detector.name != "rules" or cache_rules):
+            hits = findings_cache.get_many(
+                detector.name,
+                detector.version,
+                [entry.blob_sha for entry in selected if entry.blob_sha],
+            )
+        cached[detector.name] = hits
+        pending[detector.name] = [entry for entry in selected if entry.blob_sha not in hits]
+
+    results = _run_pending(repo_path, rules, scan_settings, detectors, pending, files, reader, use_ripgrep)
+
+    findings: list[Finding] = []
+    for detector in detectors:
+        to_scan = pending[detector.name]
+        fresh: dict[str, list[Finding]] = {}
+        for item in results[detector.name]:
+            fresh.setdefault(item.file_path, []).append(item)
+
+        # A capped rule run is truncated for this repo, not a complete result per blob.
+        if findings_cache is not None and not (detector.name == "rules" and _cap_reached(results["rules"], rule_cap)):
+            findings_cache.put_many(
+                detector.name,
+                detector.version,
+                {entry.blob_sha: fresh.get(entry.relative, []) for entry in to_scan if entry.blob_sha},
+            )
+
+        # Emit in index order so cached and freshly scanned files interleave deterministically.
+        hits = cached[detector.name]
+        emitted: list[Finding] = []
+        for entry in selections[detector.name]:
+            if entry.blob_sha in hits:
+                emitted.extend(from_cached_row(entry.relative, row) for row in hits[entry.blob_sha])
+            else:
+                emitted.extend(fresh.get(entry.relative, []))
+        if detector.name == "rules" and hits:
+            emitted = merge_rule_chunks([emitted], rule_cap)
+        findings.extend(emitted)
 
     # Deduplicate exact duplicates from different scanners or repeated matches.
     deduped: dict[tuple, Finding] = {}
@@ -70,3 +232,343 @@ def scan_repository(repo_path: Path, rules: list[SignalRule], scan_settings: Sca
         deduped[key] = item
 
     return list(deduped.values())
+
+
+def _cap_reached(findings: list[Finding], max_matches_per_rule: int | None) -> bool:
+    if max_matches_per_rule is None:
+        return False
+    counts = Counter((item.signal_code, item.category, item.severity) for item in findings)
+    return any(count >= max_matches_per_rule for count in counts.values())
+
+
+def _run_pending(
+    repo_path: Path,
+    rules: list[SignalRule],
+    scan_settings: ScanSettings,
+    detectors: list[_Detector],
+    pending: dict[str, list[FileEntry]],
+    files: list[FileEntry],
+    reader: GitBlobReader | None,
+    use_ripgrep: bool,
+) -> dict[str, list[Finding]]:
+    """Run every detector on its pending files, in-process or split into file chunks."""
+    chunks = _chunk_files(files, pending, scan_settings.file_workers)
+    if len(chunks) <= 1:
+        return _run_in_batches(repo_path, rules, scan_settings, detectors, pending, files, reader, use_ripgrep)
+
+    # ripgrep runs single-threaded with sorted output, so it is chunked like the rest. A
+    # per-rule cap only merges exactly when every rule is identifiable from its findings;
+    # otherwise rules stay in this process.
+    rules_in_chunks = rules_mergeable(rules)
+    chunked = [detector for detector in detectors if detector.name != "rules" or rules_in_chunks]
+    jobs = [
+        _ChunkJob(
+            repo_path=repo_path,
+            rules=rules,
+            scan_settings=scan_settings,
+            use_ripgrep=use_ripgrep,
+            object_store=reader is not None,
+            pending={
+                detector.name: [entry for entry in pending[detector.name] if entry.relative in chunk]
+                for detector in chunked
+            },
+            files=[entry for entry in files if entry.relative in chunk],
+        )
+        for chunk in chunks
+    ]
+
+    results: dict[str, list[Finding]] = {}
+    with ProcessPoolExecutor(max_workers=scan_settings.file_workers, mp_context=get_context("spawn")) as pool:
+        chunk_results = pool.map(_scan_chunk, jobs)
+        local = [detector for detector in detectors if detector not in chunked]
+        if local:
+            context = _make_context(repo_path, rules, scan_settings, local, pending, reader, use_ripgrep)
+            for detector in local:
+                results[detector.name] = _run_detector(detector, context, pending[detector.name])
+        merged: dict[str, list[list[Finding]]] = {detector.name: [] for detector in chunked}
+        for chunk_result in chunk_results:
+            for name, items in chunk_result.items():
+                merged[name].append(items)
+
+    results.update(_merge_parts(merged, scan_settings.max_matches_per_rule))
+    return results
+
+
+def _run_in_batches(
+    repo_path: Path,
+    rules: list[SignalRule],
+    scan_settings: ScanSettings,
+    detectors: list[_Detector],
+    pending: dict[str, list[FileEntry]],
+    files: list[FileEntry],
+    reader: GitBlobReader | None,
+    use_ripgrep: bool,
+) -> dict[str, list[Finding]]:
+    """Run every detector over one contiguous batch of files before moving to the next.
+
+    Batches are sized to fit the content cache, so each file is read once however large
+    the repo is. ripgrep, and a per-rule cap that cannot be re-applied across batches,
+    still need a single call over all files.
+    """
+    whole = [
+        detector
+        for detector in detectors
+        if not detector.reads_content or (detector.name == "rules" and not rules_mergeable(rules))
+    ]
+    batched = [detector for detector in detectors if detector not in whole]
+
+    results: dict[str, list[Finding]] = {}
+    if whole:
+        context = _make_context(repo_path, rules, scan_settings, whole, pending, reader, use_ripgrep)
+        for detector in whole:
+            results[detector.name] = _run_detector(detector, context, pending[detector.name])
+
+    batches = _batch_files(files, {detector.name: pending[detector.name] for detector in batched}, scan_settings)
+    batch_of = {relative: index for index, batch in enumerate(batches) for relative in batch}
+    batch_pending: list[dict[str, list[FileEntry]]] = [{detector.name: [] for detector in batched} for _ in batches]
+    for detector in batched:
+        for entry in pending[detector.name]:
+            batch_pending[batch_of[entry.relative]][detector.name].append(entry)
+
+    parts: dict[str, list[list[Finding]]] = {detector.name: [] for detector in batched}
+    for current in batch_pending:
+        context = _make_context(repo_path, rules, scan_settings, batched, current, reader, use_ripgrep)
+        for detector in batched:
+            parts[detector.name].append(_run_detector(detector, context, current[detector.name]))
+    results.update(_merge_parts(parts, scan_settings.max_matches_per_rule))
+    return {detector.name: results[detector.name] for detector in detectors}
+
+
+def _merge_parts(parts: dict[str, list[list[Finding]]], max_matches_per_rule: int | None) -> dict[str, list[Finding]]:
+    # Parts come from contiguous slices of the index, so concatenating them in order
+    # reproduces a single pass; only the repo-wide rule cap has to be applied again.
+    merged: dict[str, list[Finding]] = {}
+    for name, items in parts.items():
+        if name == "rules":
+            merged[name] = merge_rule_chunks(items, max_matches_per_rule)
+        else:
+            merged[name] = [item for part in items for item in part]
+    return merged
+
+
+@dataclass(frozen=True)
+class _ChunkJob:
+    repo_path: Path
+    rules: list[SignalRule]
+    scan_settings: ScanSettings
+    use_ripgrep: bool
+    object_store: bool
+    pending: dict[str, list[FileEntry]]
+    files: list[FileEntry]
+
+
+def _scan_chunk(job: _ChunkJob) -> dict[str, list[Finding]]:
+    detectors = [item for item in _build_detectors(job.rules, job.use_ripgrep) if item.name in job.pending]
+    reader = GitBlobReader(job.repo_path) if job.object_store else None
+    try:
+        return _run_in_batches(
+            job.repo_path,
+            job.rules,
+            job.scan_settings,
+            detectors,
+            job.pending,
+            job.files,
+            reader,
+            job.use_ripgrep,
+        )
+    finally:
+        if reader is not None:
+            reader.close()
+
+
+def _chunk_files(
+    files: list[FileEntry],
+    pending: dict[str, list[FileEntry]],
+    file_workers: int,
+) -> list[frozenset[str]]:
+    """Split the pending files into contiguous, roughly equal-sized slices of the index."""
+    wanted = set()
+    for entries in pending.values():
+        wanted.update(entry.relative for entry in entries)
+    ordered = [entry for entry in files if entry.relative in wanted]
+    if file_workers <= 1 or len(ordered) < 2 * MIN_FILES_PER_CHUNK:
+        return [frozenset(wanted)]
+
+    total_bytes = sum(entry.size for entry in ordered) or 1
+    chunk_count = min(file_workers * 4, len(ordered) // MIN_FILES_PER_CHUNK)
+    target = total_bytes / chunk_count
+    chunks: list[frozenset[str]] = []
+    current: list[str] = []
+    current_bytes = 0
+    for entry in ordered:
+        current.append(entry.relative)
+        current_bytes += entry.size
+        if current_bytes >= target and len(current) >= MIN_FILES_PER_CHUNK:
+            chunks.append(frozenset(current))
+            current = []
+            current_bytes = 0
+    if current:
+        chunks.append(frozenset(current))
+    return chunks
+
+
+def _batch_files(
+    files: list[FileEntry],
+    pending: dict[str, list[FileEntry]],
+    scan_settings: ScanSettings,
+) -> list[frozenset[str]]:
+    """Split the pending files into contiguous slices of the index that fit the content cache."""
+    wanted = set()
+    for entries in pending.values():
+        wanted.update(entry.relative for entry in entries)
+    # A file's text and its split lines are both cached, so it weighs about twice its size.
+    budget = max(1, scan_settings.content_cache_max_bytes // 2)
+    batches: list[frozenset[str]] = []
+    current: list[str] = []
+    current_bytes = 0
+    for entry in files:
+        if entry.relative not in wanted:
+            continue
+        if current and current_bytes + entry.size > budget:
+            batches.append(frozenset(current))
+            current = []
+            current_bytes = 0
+        current.append(entry.relative)
+        current_bytes += entry.size
+    if current or not batches:
+        batches.append(frozenset(current))
+    return batches
+
+
+def _make_context(
+    repo_path: Path,
+    rules: list[SignalRule],
+    scan_settings: ScanSettings,
+    detectors: list[_Detector],
+    pending: dict[str, list[FileEntry]],
+    reader: GitBlobReader | None,
+    use_ripgrep: bool,
+) -> _ScanContext:
+    consumers: Counter[str] = Counter()
+    for detector in detectors:
+        if detector.reads_content:
+            consumers.update(entry.relative for entry in pending[detector.name])
+    return _ScanContext(
+        repo_path=repo_path,
+        rules=rules,
+        scan_settings=scan_settings,
+        content=FileContentCache(
+            consumers,
+            max_bytes=scan_settings.content_cache_max_bytes,
+            reader=reader.read if reader is not None else None,
+        ),
+        use_ripgrep=use_ripgrep,
+    )
+
+
+def _run_detector(detector: _Detector, context: _ScanContext, files: list[FileEntry]) -> list[Finding]:
+    if not files:
+        return []
+    return detector.run(context, files)
+
+
+def _build_detectors(rules: list[SignalRule], use_ripgrep: bool) -> list[_Detector]:
+    return [
+        _Detector(
+            name="rules",
+            suffixes=None,
+            case_sensitive=False,
+            reads_content=bool(rules) and not use_ripgrep,
+            version=_fingerprint("rg" if use_ripgrep else "py", [asdict(rule) for rule in rules]),
+            run=_run_rules,
+        ),
+        _Detector(
+            name="python_ast",
+            suffixes=python_ast.PYTHON_EXTENSIONS,
+            case_sensitive=True,
+            reads_content=True,
+            version=_fingerprint(python_ast.IMPORT_SIGNAL_MAP, python_ast.CALL_SIGNAL_MAP),
+            run=_run_python_ast,
+        ),
+        _Detector(
+            name="notebook_ast",
+            suffixes=notebooks.NOTEBOOK_EXTENSIONS,
+            case_sensitive=True,
+            reads_content=True,
+            version=_fingerprint(notebooks.IMPORT_SIGNAL_MAP, notebooks.CALL_SIGNAL_MAP),
+            run=_run_notebooks,
+        ),
+        _Detector(
+            name="js_ts_structured",
+            suffixes=js_ts_structured.JS_TS_EXTENSIONS,
+            case_sensitive=False,
+            reads_content=True,
+            version=_fingerprint(js_ts_structured.JS_TS_IMPORT_PATTERNS, js_ts_structured.JS_TS_CALL_PATTERNS),
+            run=_run_js_ts,
+        ),
+        _Detector(
+            name="java_structured",
+            suffixes=java_structured.JAVA_EXTENSIONS,
+            case_sensitive=False,
+            reads_content=True,
+            version=_fingerprint(java_structured.JAVA_IMPORT_PATTERNS, java_structured.JAVA_CALL_PATTERNS),
+            run=_run_java,
+        ),
+        _Detector(
+            name="polyglot_patterns",
+            suffixes=polyglot_patterns.EXTENSION_PATTERN_MAP,
+            case_sensitive=True,
+            reads_content=True,
+            version=_fingerprint(polyglot_patterns.EXTENSION_PATTERN_MAP),
+            run=_run_polyglot,
+        ),
+    ]
+
+
+def _fingerprint(*tables: object) -> str:
+    payload = json.dumps([DETECTOR_LOGIC_VERSION, *tables], default=repr, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _run_rules(context: _ScanContext, files: list[FileEntry]) -> list[Finding]:
+    settings = context.scan_settings
+    return run_rules_scan(
+        context.repo_path,
+        context.rules,
+        max_file_size_bytes=settings.max_file_size_bytes,
+        max_files_per_repo=settings.max_files_per_repo,
+        files=files,
+        exclude_dir_names=settings.exclude_dir_names,
+        content=context.content,
+        max_matches_per_rule=settings.max_matches_per_rule,
+        allow_ripgrep=context.use_ripgrep,
+    )
+
+
+def _run_python_ast(context: _ScanContext, files: list[FileEntry]) -> list[Finding]:
+    return python_ast.run_python_ast_scan(context.repo_path, **_detector_kwargs(context, files))
+
+
+def _run_notebooks(context: _ScanContext, files: list[FileEntry]) -> list[Finding]:
+    return notebooks.run_notebook_scan(context.repo_path, **_detector_kwargs(context, files))
+
+
+def _run_js_ts(context: _ScanContext, files: list[FileEntry]) -> list[Finding]:
+    return js_ts_structured.run_js_ts_structured_scan(context.repo_path, **_detector_kwargs(context, files))
+
+
+def _run_java(context: _ScanContext, files: list[FileEntry]) -> list[Finding]:
+    return java_structured.run_java_structured_scan(context.repo_path, **_detector_kwargs(context, files))
+
+
+def _run_polyglot(context: _ScanContext, files: list[FileEntry]) -> list[Finding]:
+    return polyglot_patterns.run_polyglot_pattern_scan(context.repo_path, **_detector_kwargs(context, files))
+
+
+def _detector_kwargs(context: _ScanContext, files: list[FileEntry]) -> dict:
+    return {
+        "max_file_size_bytes": context.scan_settings.max_file_size_bytes,
+        "max_files_per_repo": context.scan_settings.max_files_per_repo,
+        "files": files,
+        "content": context.content,
+    }
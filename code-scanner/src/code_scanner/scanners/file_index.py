@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import os
+import stat
+import subprocess
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from code_scanner.models import DEFAULT_EXCLUDE_DIR_NAMES
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    path: Path
+    relative: str
+    size: int
+    suffix: str
+    blob_sha: str | None = None
+
+
+def build_file_index(
+    repo_path: Path,
+    exclude_dir_names: Iterable[str] = DEFAULT_EXCLUDE_DIR_NAMES,
+) -> list[FileEntry]:
+    """Walk the repository once and record every regular file with its size and suffix."""
+    entries = list(walk_files(repo_path, exclude_dir_names))
+    entries.sort(key=lambda item: item.relative)
+    return entries
+
+
+def walk_files(repo_path: Path, exclude_dir_names: Iterable[str]) -> Iterator[FileEntry]:
+    """Yield regular files below repo_path, pruning excluded directories before entering them."""
+    excluded = frozenset(exclude_dir_names)
+    root = str(repo_path)
+    pending: list[tuple[str, str]] = [(root, "")]
+
+    while pending:
+        directory, prefix = pending.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                children = list(iterator)
+        except OSError:
+            continue
+
+        for child in children:
+            relative = f"{prefix}{child.name}"
+            try:
+                if child.is_dir(follow_symlinks=False):
+                    if child.name not in excluded:
+                        pending.append((child.path, f"{relative}{os.sep}"))
+                    continue
+                file_stat = child.stat()
+            except OSError:
+                continue
+            if not stat.S_ISREG(file_stat.st_mode):
+                continue
+
+            path = Path(child.path)
+            yield FileEntry(
+                path=path,
+                relative=relative,
+                size=file_stat.st_size,
+                suffix=path.suffix,
+            )
+
+
+def select_files(
+    files: Iterable[FileEntry],
+    suffixes: Iterable[str] | None = None,
+    *,
+    case_sensitive: bool = False,
+) -> Iterator[FileEntry]:
+    if suffixes is None:
+        yield from files
+        return
+
+    wanted = set(suffixes) if case_sensitive else {item.lower() for item in suffixes}
+    for entry in files:
+        suffix = entry.suffix if case_sensitive else entry.suffix.lower()
+        if suffix in wanted:
+            yield entry
+
+
+def limit_files(
+    files: Iterable[FileEntry],
+    *,
+    max_files_per_repo: int,
+    max_file_size_bytes: int,
+) -> Iterator[FileEntry]:
+    """Apply the per-detector file budget, then drop files that are too large to read."""
+    for scanned, entry in enumerate(files):
+        if scanned >= max_files_per_repo:
+            break
+        if entry.size > max_file_size_bytes:
+            continue
+        yield entry
+
+
+def attach_blob_ids(repo_path: Path, files: list[FileEntry]) -> list[FileEntry]:
+    """Annotate files whose working-tree content equals the git index blob with that blob's SHA."""
+    blob_ids = read_blob_ids(repo_path)
+    if not blob_ids:
+        return files
+    return [
+        replace(entry, blob_sha=blob_ids[entry.relative]) if entry.relative in blob_ids else entry
+        for entry in files
+    ]
+
+
+def read_blob_ids(repo_path: Path) -> dict[str, str]:
+    """Map relative paths of clean, tracked regular files to their git blob SHA."""
+    prefix = _git_output(repo_path, ["rev-parse", "--show-prefix"])
+    if prefix is None or prefix.strip():
+        # Not a git checkout, or repo_path is a subdirectory of one.
+        return {}
+
+    staged = _git_output(repo_path, ["ls-files", "--stage", "-z"])
+    dirty = _git_output(repo_path, ["diff-files", "--name-only", "-z"])
+    if staged is None or dirty is None:
+        return {}
+
+    modified = set(dirty.split("\0"))
+    blob_ids: dict[str, str] = {}
+    for record in staged.split("\0"):
+        if not record:
+            continue
+        meta, _, path = record.partition("\t")
+        parts = meta.split()
+        if len(parts) != 3 or parts[0] not in {"100644", "100755"} or parts[2] != "0":
+            continue
+        if path in modified:
+            continue
+        blob_ids[path.replace("/", os.sep)] = parts[1]
+    return blob_ids
+
+
+def _git_output(repo_path: Path, args: list[str]) -> str | None:
+    try:
+        process = subprocess.run(
+            ["git", "-C", str(repo_path), *args],
+            text=True,
+            capture_output=True,
+        )
+    except OSError:
+        return None
+    if process.returncode != 0:
+        return None
+    return process.stdout
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path, PurePosixPath
+from typing import Iterable
+
+from code_scanner.scanners.file_index import FileEntry
+
+
+# Regular (non-executable and executable) file modes; symlinks and submodules are skipped.
+_BLOB_MODES = {"100644", "100755"}
+
+
+class GitObjectError(RuntimeError):
+    pass
+
+
+def build_tree_index(
+    repo_path: Path,
+    exclude_dir_names: Iterable[str],
+    revision: str = "HEAD",
+) -> list[FileEntry]:
+    """List the files of a commit with their blob SHA and size, without a working tree.
+
+    Blobs left out of a partial clone (``--filter=blob:limit=...``) are recorded with an
+    unbounded size: they only go missing for being over the limit, so the usual
+    ``max_file_size_bytes`` check skips them without ever fetching them.
+    """
+    excluded = frozenset(exclude_dir_names)
+    listing = _git_bytes(repo_path, ["ls-tree", "-r", "-z", "--full-tree", revision])
+    sizes = _local_blob_sizes(repo_path)
+
+    entries: list[FileEntry] = []
+    for record in listing.split(b"\0"):
+        if not record:
+            continue
+        meta, _, raw_path = record.partition(b"\t")
+        parts = meta.decode().split()
+        if len(parts) != 3 or parts[1] != "blob" or parts[0] not in _BLOB_MODES:
+            continue
+
+        relative = PurePosixPath(os.fsdecode(raw_path))
+        if excluded.intersection(relative.parts[:-1]):
+            continue
+        entries.append(
+            FileEntry(
+                path=repo_path / relative,
+                relative=str(relative).replace("/", os.sep),
+                size=sizes.get(parts[2], sys.maxsize),
+                suffix=relative.suffix,
+                blob_sha=parts[2],
+            )
+        )
+
+    entries.sort(key=lambda item: item.relative)
+    return entries
+
+
+def _local_blob_sizes(repo_path: Path) -> dict[str, int]:
+    # --batch-all-objects only reports objects present locally, so a partial clone never
+    # lazily fetches the blobs its filter omitted (which `ls-tree -l` would do).
+    output = _git_bytes(
+        repo_path,
+        [
+            "cat-file",
+            "--batch-all-objects",
+            "--unordered",
+            "--batch-check=%(objectname) %(objecttype) %(objectsize)",
+        ],
+    )
+    sizes: dict[str, int] = {}
+    for line in output.decode().splitlines():
+        object_name, object_type, object_size = line.split()
+        if object_type == "blob":
+            sizes[object_name] = int(object_size)
+    return sizes
+
+
+def _git_env() -> dict[str, str]:
+    # Never fetch from the promisor remote while scanning.
+    return {**os.environ, "GIT_NO_LAZY_FETCH": "1"}
+
+
+def _git_bytes(repo_path: Path, args: list[str]) -> bytes:
+    process = subprocess.run(
+        ["git", "-C", str(repo_path), *args],
+        capture_output=True,
+        env=_git_env(),
+    )
+    if process.returncode != 0:
+        message = process.stderr.decode("utf-8", errors="replace").strip()
+        raise GitObjectError(f"git {args[0]} failed for {repo_path}: {message[:500]}")
+    return process.stdout
+
+
+class GitBlobReader:
+    """Streams blob contents from one long-lived ``git cat-file --batch`` process."""
+
+    def __init__(self, repo_path: Path):
+        self._process = subprocess.Popen(
+            ["git", "-C", str(repo_path), "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=_git_env(),
+        )
+
+    def read(self, entry: FileEntry) -> bytes | None:
+        if not entry.blob_sha:
+            return None
+        stdin = self._process.stdin
+        stdout = self._process.stdout
+        stdin.write(f"{entry.blob_sha}\n".encode())
+        stdin.flush()
+
+        header = stdout.readline().split()
+        if len(header) != 3:
+            # "<sha> missing" (or an unexpected reply): nothing follows the header.
+            return None
+        size = int(header[2])
+        data = stdout.read(size)
+        stdout.read(1)
+        return data
+
+    def close(self) -> None:
+        if self._process.poll() is None:
+            self._process.stdin.close()
+            self._process.wait()
+        self._process.stdout.close()
+
+    def __enter__(self) -> GitBlobReader:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
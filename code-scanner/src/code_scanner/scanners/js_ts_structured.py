@@ -4,6 +4,9 @@ import re
 from pathlib import Path
 
 from code_scanner.models import Finding
+from code_scanner.scanners.content import FileContentCache
+from code_scanner.scanners.file_index import FileEntry, build_file_index, limit_files, select_files
+from code_scanner.scanners.matching import find_matching_lines
 
 
 JS_TS_IMPORT_PATTERNS = [
@@ -20,6 +23,9 @@ JS_TS_CALL_PATTERNS = [
     (re.compile(r"\b(train|fit)\s*\("), ("JS_TRAIN_CALL", "model_lifecycle", "high")),
 ]
 
+_PATTERNS = [pattern for pattern, _ in JS_TS_IMPORT_PATTERNS + JS_TS_CALL_PATTERNS]
+_SIGNALS = [signal for _, signal in JS_TS_IMPORT_PATTERNS + JS_TS_CALL_PATTERNS]
+
 JS_TS_EXTENSIONS = {".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs"}
 
 
@@ -28,37 +34,29 @@ def run_js_ts_structured_scan(
     *,
     max_file_size_bytes: int,
     max_files_per_repo: int,
+    files: list[FileEntry] | None = None,
+    content: FileContentCache | None = None,
 ) -> list[Finding]:
     findings: list[Finding] = []
-    scanned = 0
-
-    for file_path in repo_path.rglob("*"):
-        if scanned >= max_files_per_repo:
-            break
-        if not file_path.is_file() or file_path.suffix.lower() not in JS_TS_EXTENSIONS:
-            continue
-        if "/.git/" in file_path.as_posix():
-            continue
-
-        scanned += 1
 
-        try:
-            if file_path.stat().st_size > max_file_size_bytes:
-                continue
-            text = file_path.read_text(encoding="utf-8")
-        except (UnicodeDecodeError, OSError):
+    if files is None:
+        files = build_file_index(repo_path)
+    if content is None:
+        content = FileContentCache()
+
+    for entry in limit_files(
+        select_files(files, JS_TS_EXTENSIONS),
+        max_files_per_repo=max_files_per_repo,
+        max_file_size_bytes=max_file_size_bytes,
+    ):
+        text = content.read_text(entry)
+        content.release(entry)
+        if text is None:
             continue
 
-        relative = str(file_path.relative_to(repo_path))
-        lines = text.splitlines()
-        for idx, line in enumerate(lines, start=1):
-            for pattern, signal in JS_TS_IMPORT_PATTERNS:
-                if pattern.search(line):
-                    findings.append(_to_finding(relative, idx, signal, line.strip()))
-
-            for pattern, signal in JS_TS_CALL_PATTERNS:
-                if pattern.search(line):
-                    findings.append(_to_finding(relative, idx, signal, line.strip()))
+        relative = entry.relative
+        for idx, pattern_index, line in find_matching_lines(text, _PATTERNS):
+            findings.append(_to_finding(relative, idx, _SIGNALS[pattern_index], line.strip()))
 
     return findings
 
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Sequence
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover - private modules, renamed before
+    sre_constants = sre_parse = None
+
+
+# Line boundaries recognised by str.splitlines() other than a plain "\n".
+_OTHER_LINE_BREAKS = re.compile("[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+_NEWLINE = re.compile("\n")
+
+
+class LineIndex:
+    """Maps offsets in a text buffer to 1-based line numbers compatible with str.splitlines()."""
+
+    def __init__(self, text: str):
+        if _OTHER_LINE_BREAKS.search(text):
+            # Rare (CRLF, form feeds, ...): rebuild the buffer with "\n" so offsets and
+            # re.MULTILINE anchors agree with splitlines() numbering.
+            lines = text.splitlines()
+            self.text = "\n".join(lines)
+            self.line_count = len(lines)
+        else:
+            self.text = text
+            self.line_count = text.count("\n") + (0 if not text or text.endswith("\n") else 1)
+        self._starts: list[int] | None = None
+
+    def line_number(self, offset: int) -> int:
+        return bisect_right(self._line_starts(), offset)
+
+    def line_text(self, line_number: int) -> str:
+        starts = self._line_starts()
+        start = starts[line_number - 1]
+        end = starts[line_number] - 1 if line_number < len(starts) else len(self.text)
+        return self.text[start:end]
+
+    def _line_starts(self) -> list[int]:
+        # Built on first lookup only, so files without matches never pay for it.
+        if self._starts is None:
+            self._starts = [0]
+            self._starts.extend(match.end() for match in _NEWLINE.finditer(self.text))
+        return self._starts
+
+
+def find_matching_lines(
+    text: str,
+    patterns: Sequence[re.Pattern[str]],
+) -> list[tuple[int, int, str]]:
+    """Return (line_number, pattern_index, line_text) for every line each pattern matches.
+
+    Results equal a per-line ``pattern.search(line)`` loop over ``text.splitlines()``, in
+    line-then-pattern order, but each pattern runs once over the whole buffer so the
+    Python-level work scales with the number of matches rather than the number of lines.
+    """
+    index = LineIndex(text)
+    hits: dict[tuple[int, int], str] = {}
+
+    for pattern_index, pattern in enumerate(patterns):
+        if _needs_line_loop(pattern):
+            for line_number, line in enumerate(index.text.splitlines(), start=1):
+                if pattern.search(line):
+                    hits[(line_number, pattern_index)] = line
+            continue
+
+        buffer_pattern = _multiline(pattern.pattern, pattern.flags)
+        for match in buffer_pattern.finditer(index.text):
+            start, end = match.span()
+            first = index.line_number(start)
+            last = index.line_number(end - 1) if end > start else first
+            for line_number in range(first, min(last, index.line_count) + 1):
+                key = (line_number, pattern_index)
+                if key in hits:
+                    continue
+                # A buffer match may cross a newline or see past the line end, so confirm it on the line itself.
+                line = index.line_text(line_number)
+                if pattern.search(line):
+                    hits[key] = line
+
+    return [(line_number, pattern_index, hits[(line_number, pattern_index)]) for line_number, pattern_index in sorted(hits)]
+
+
+@lru_cache(maxsize=1024)
+def _multiline(pattern: str, flags: int) -> re.Pattern[str]:
+    return re.compile(pattern, flags | re.MULTILINE)
+
+
+# Spelling of the constructs below, for when the pattern cannot be parsed.
+_LINE_SENSITIVE_SYNTAX = ("\\A", "\\Z", "(?=", "(?!", "(?<")
+
+
+@lru_cache(maxsize=1024)
+def _needs_line_loop(pattern: re.Pattern[str]) -> bool:
+    # \A and \Z anchor to each line in the per-line loop but only to the buffer ends here,
+    # and a lookaround next to a line boundary sees the newline instead of the string end.
+    if sre_parse is None:
+        return any(token in pattern.pattern for token in _LINE_SENSITIVE_SYNTAX)
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except (re.error, RecursionError):
+        return True
+    return _has_line_sensitive_node(parsed)
+
+
+def _has_line_sensitive_node(items) -> bool:
+    for op, av in items:
+        if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            return True
+        if op is sre_constants.AT and av in (sre_constants.AT_BEGINNING_STRING, sre_constants.AT_END_STRING):
+            return True
+        for child in _children(av):
+            if _has_line_sensitive_node(child):
+                return True
+    return False
+
+
+def _children(av) -> list:
+    if isinstance(av, sre_parse.SubPattern):
+        return [av]
+    if isinstance(av, (list, tuple)):
+        return [child for item in av for child in _children(item)]
+    return []
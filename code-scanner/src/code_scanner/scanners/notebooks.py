@@ -5,6 +5,8 @@ import json
 from pathlib import Path
 
 from code_scanner.models import Finding
+from code_scanner.scanners.content import FileContentCache
+from code_scanner.scanners.file_index import FileEntry, build_file_index, limit_files, select_files
 
 
 IMPORT_SIGNAL_MAP = {
@@ -31,36 +33,44 @@ CALL_SIGNAL_MAP = {
     "load": ("NB_AST_LOAD_CALL", "model_lifecycle", "medium"),
 }
 
+NOTEBOOK_EXTENSIONS = {".ipynb"}
+
 
 def run_notebook_scan(
     repo_path: Path,
     *,
     max_file_size_bytes: int,
     max_files_per_repo: int,
+    files: list[FileEntry] | None = None,
+    content: FileContentCache | None = None,
 ) -> list[Finding]:
     findings: list[Finding] = []
-    scanned = 0
-
-    for file_path in repo_path.rglob("*.ipynb"):
-        if scanned >= max_files_per_repo:
-            break
-        scanned += 1
 
-        if "/.git/" in file_path.as_posix():
+    if files is None:
+        files = build_file_index(repo_path)
+    if content is None:
+        content = FileContentCache()
+
+    for entry in limit_files(
+        select_files(files, NOTEBOOK_EXTENSIONS, case_sensitive=True),
+        max_files_per_repo=max_files_per_repo,
+        max_file_size_bytes=max_file_size_bytes,
+    ):
+        source = content.read_text(entry)
+        content.release(entry)
+        if source is None:
             continue
 
         try:
-            if file_path.stat().st_size > max_file_size_bytes:
-                continue
-            notebook = json.loads(file_path.read_text(encoding="utf-8"))
-        except (OSError, UnicodeDecodeError, json.JSONDecodeError):
+            notebook = json.loads(source)
+        except json.JSONDecodeError:
             continue
 
         cells = notebook.get("cells", []) if isinstance(notebook, dict) else []
         if not isinstance(cells, list):
             continue
 
-        rel_path = str(file_path.relative_to(repo_path))
+        rel_path = entry.relative
         for cell_index, cell in enumerate(cells, start=1):
             if not isinstance(cell, dict):
                 continue
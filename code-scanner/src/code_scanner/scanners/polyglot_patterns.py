@@ -4,6 +4,9 @@ import re
 from pathlib import Path
 
 from code_scanner.models import Finding
+from code_scanner.scanners.content import FileContentCache
+from code_scanner.scanners.file_index import FileEntry, build_file_index, limit_files, select_files
+from code_scanner.scanners.matching import find_matching_lines
 
 
 R_PATTERNS = [
@@ -33,33 +36,31 @@ def run_polyglot_pattern_scan(
     *,
     max_file_size_bytes: int,
     max_files_per_repo: int,
+    files: list[FileEntry] | None = None,
+    content: FileContentCache | None = None,
 ) -> list[Finding]:
     findings: list[Finding] = []
-    scanned = 0
 
-    for file_path in repo_path.rglob("*"):
-        if scanned >= max_files_per_repo:
-            break
-        if not file_path.is_file() or file_path.suffix not in EXTENSION_PATTERN_MAP:
-            continue
-        if "/.git/" in file_path.as_posix():
-            continue
-
-        scanned += 1
-
-        try:
-            if file_path.stat().st_size > max_file_size_bytes:
-                continue
-            text = file_path.read_text(encoding="utf-8")
-        except (UnicodeDecodeError, OSError):
+    if files is None:
+        files = build_file_index(repo_path)
+    if content is None:
+        content = FileContentCache()
+
+    for entry in limit_files(
+        select_files(files, EXTENSION_PATTERN_MAP, case_sensitive=True),
+        max_files_per_repo=max_files_per_repo,
+        max_file_size_bytes=max_file_size_bytes,
+    ):
+        text = content.read_text(entry)
+        content.release(entry)
+        if text is None:
             continue
 
-        relative = str(file_path.relative_to(repo_path))
-        patterns = EXTENSION_PATTERN_MAP[file_path.suffix]
-        for idx, line in enumerate(text.splitlines(), start=1):
-            for regex, signal in patterns:
-                if regex.search(line):
-                    findings.append(_to_finding(relative, idx, signal, line.strip()))
+        relative = entry.relative
+        patterns = EXTENSION_PATTERN_MAP[entry.suffix]
+        regexes = [regex for regex, _ in patterns]
+        for idx, pattern_index, line in find_matching_lines(text, regexes):
+            findings.append(_to_finding(relative, idx, patterns[pattern_index][1], line.strip()))
 
     return findings
 
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import re
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover - private modules, renamed before
+    sre_constants = sre_parse = None
+
+
+# Literals shorter than this match almost every file and would only slow the prefilter down.
+MIN_LITERAL_LENGTH = 3
+
+if sre_constants is not None:
+    _ZERO_WIDTH_OPS = {sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT}
+    _REPEAT_OPS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, sre_constants.POSSESSIVE_REPEAT}
+
+
+class LiteralPrefilter:
+    """Selects which patterns can possibly match a text with a single multi-literal search.
+
+    Each pattern is reduced to a set of literals of which at least one must occur in any
+    match. All literals are searched together in one case-insensitive alternation, using
+    the same ``re.IGNORECASE`` equivalences as the patterns; only patterns whose literals
+    were seen are reported as candidates. Patterns without a usable literal, or every
+    pattern when the regex parser is unavailable, are always candidates.
+    """
+
+    def __init__(self, patterns: list[str], flags: list[int] | None = None):
+        self._always: list[int] = []
+        self._owners: dict[str, set[int]] = {}
+        for index, pattern in enumerate(patterns):
+            literals = required_literals(pattern, flags[index] if flags else 0)
+            if not literals:
+                self._always.append(index)
+                continue
+            for literal in literals:
+                self._owners.setdefault(literal, set()).add(index)
+
+        self._filterable = len(patterns) - len(self._always)
+        self._search = None
+        self._literal_match = {}
+        if self._owners:
+            ordered = sorted(self._owners, key=lambda item: (-len(item), item))
+            self._search = re.compile("|".join(re.escape(item) for item in ordered), re.IGNORECASE).search
+            self._literal_match = {item: re.compile(re.escape(item), re.IGNORECASE).match for item in ordered}
+        self._found_owners: dict[str, set[int]] = {}
+
+    def candidates(self, text: str) -> list[int]:
+        selected = set(self._always)
+        if self._search is None:
+            return sorted(selected)
+
+        matched: set[int] = set()
+        search = self._search
+        position = 0
+        while True:
+            hit = search(text, position)
+            if hit is None:
+                break
+            matched |= self._owners_of(hit.group())
+            if len(matched) == self._filterable:
+                break
+            # Restart one character later so literals overlapping this hit are still seen.
+            position = hit.start() + 1
+
+        selected |= matched
+        return sorted(selected)
+
+    def _owners_of(self, found: str) -> set[int]:
+        # The alternation prefers the longest literal at a position, so every shorter literal
+        # that matches a prefix of the hit occurs there as well.
+        owners = self._found_owners.get(found)
+        if owners is None:
+            owners = set()
+            for literal, indexes in self._owners.items():
+                if self._literal_match[literal](found):
+                    owners |= indexes
+            self._found_owners[found] = owners
+        return owners
+
+
+def required_literals(pattern: str, flags: int = 0) -> frozenset[str] | None:
+    """Return case-folded literals of which at least one occurs in every match, if known."""
+    if sre_parse is None:
+        return None
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except (re.error, RecursionError):
+        return None
+
+    literals = _sequence_literals(list(parsed))
+    if not literals or min(len(item) for item in literals) < MIN_LITERAL_LENGTH:
+        return None
+    return frozenset(item.casefold() for item in literals)
+
+
+def _sequence_literals(items: list) -> frozenset[str] | None:
+    best: frozenset[str] | None = None
+    run: list[str] = []
+
+    def consider(candidate: frozenset[str] | None) -> None:
+        nonlocal best
+        if candidate and (best is None or _score(candidate) > _score(best)):
+            best = candidate
+
+    for op, av in items:
+        if op is sre_constants.LITERAL and av < 128:
+            run.append(chr(av))
+            continue
+        if op in _ZERO_WIDTH_OPS:
+            # Zero-width items do not consume text, so the surrounding literal run stays contiguous.
+            continue
+
+        if run:
+            consider(frozenset(["".join(run)]))
+            run = []
+
+        if op is sre_constants.SUBPATTERN:
+            consider(_sequence_literals(list(av[-1])))
+        elif op is sre_constants.ATOMIC_GROUP:
+            consider(_sequence_literals(list(av)))
+        elif op is sre_constants.BRANCH:
+            alternatives = [_sequence_literals(list(branch)) for branch in av[1]]
+            if all(alternatives):
+                consider(frozenset().union(*alternatives))
+        elif op in _REPEAT_OPS and av[0] >= 1:
+            consider(_sequence_literals(list(av[2])))
+
+    if run:
+        consider(frozenset(["".join(run)]))
+    return best
+
+
+def _score(literals: frozenset[str]) -> tuple[int, int]:
+    return min(len(item) for item in literals), -len(literals)
@@ -4,6 +4,8 @@ import ast
 from pathlib import Path
 
 from code_scanner.models import Finding
+from code_scanner.scanners.content import FileContentCache
+from code_scanner.scanners.file_index import FileEntry, build_file_index, limit_files, select_files
 
 
 IMPORT_SIGNAL_MAP = {
@@ -31,33 +33,32 @@ CALL_SIGNAL_MAP = {
     "load": ("AST_LOAD_CALL", "model_lifecycle", "medium"),
 }
 
+PYTHON_EXTENSIONS = {".py"}
+
 
 def run_python_ast_scan(
     repo_path: Path,
     *,
     max_file_size_bytes: int,
     max_files_per_repo: int,
+    files: list[FileEntry] | None = None,
+    content: FileContentCache | None = None,
 ) -> list[Finding]:
     findings: list[Finding] = []
-    scanned = 0
-
-    for file_path in repo_path.rglob("*.py"):
-        if scanned >= max_files_per_repo:
-            break
-        scanned += 1
-
-        if "/.git/" in file_path.as_posix():
-            continue
 
-        try:
-            if file_path.stat().st_size > max_file_size_bytes:
-                continue
-        except OSError:
-            continue
-
-        try:
-            source = file_path.read_text(encoding="utf-8")
-        except (UnicodeDecodeError, OSError):
+    if files is None:
+        files = build_file_index(repo_path)
+    if content is None:
+        content = FileContentCache()
+
+    for entry in limit_files(
+        select_files(files, PYTHON_EXTENSIONS, case_sensitive=True),
+        max_files_per_repo=max_files_per_repo,
+        max_file_size_bytes=max_file_size_bytes,
+    ):
+        source = content.read_text(entry)
+        content.release(entry)
+        if source is None:
             continue
 
         try:
@@ -65,8 +66,7 @@ def run_python_ast_scan(
         except SyntaxError:
             continue
 
-        rel_path = str(file_path.relative_to(repo_path))
-        findings.extend(_scan_tree(tree, rel_path))
+        findings.extend(_scan_tree(tree, entry.relative))
 
     return findings
 
@@ -3,10 +3,31 @@ from __future__ import annotations
 import json
 import re
 import subprocess
+from collections import Counter
 from pathlib import Path
 from shutil import which
 
-from code_scanner.models import Finding, SignalRule
+from code_scanner.models import DEFAULT_EXCLUDE_DIR_NAMES, Finding, SignalRule
+from code_scanner.scanners.content import FileContentCache
+from code_scanner.scanners.file_index import FileEntry, build_file_index, limit_files
+from code_scanner.scanners.matching import find_matching_lines
+from code_scanner.scanners.prefilter import LiteralPrefilter
+
+
+# Upper bounds for a single rg invocation: every rule in one run unless the ruleset is
+# very large, and as many explicit paths as comfortably fit on one command line.
+RG_MAX_PATTERNS_PER_RUN = 256
+RG_MAX_PATH_CHARS_PER_RUN = 200_000
+
+# Finding.detector values of rule matches from either engine.
+RULE_DETECTORS = ("rules_rg", "rules_py")
+
+# Patterns rg has refused to compile in this process.
+_RG_REJECTED_PATTERNS: set[str] = set()
+
+
+class RipgrepError(RuntimeError):
+    """rg exited with an error instead of reporting matches or no matches."""
 
 
 def run_rules_scan(
@@ -15,24 +36,218 @@ def run_rules_scan(
     *,
     max_file_size_bytes: int,
     max_files_per_repo: int,
+    files: list[FileEntry] | None = None,
+    exclude_dir_names: tuple[str, ...] = DEFAULT_EXCLUDE_DIR_NAMES,
+    content: FileContentCache | None = None,
+    max_matches_per_rule: int | None = None,
+    allow_ripgrep: bool = True,
 ) -> list[Finding]:
-    if which("rg"):
-        return _run_with_ripgrep(repo_path, rules)
-    return _run_with_python(repo_path, rules, max_file_size_bytes, max_files_per_repo)
+    if files is None:
+        files = build_file_index(repo_path, exclude_dir_names)
+    if content is None:
+        content = FileContentCache()
+    # ripgrep reads from disk, so files served from the git object store need the Python path.
+    if not (allow_ripgrep and ripgrep_available()):
+        return _run_with_python(
+            files, rules, max_file_size_bytes, max_files_per_repo, content, max_matches_per_rule
+        )
 
+    # rg's default engine rejects some Python regex syntax (lookarounds, backreferences).
+    # One such pattern fails the whole rg run, so those rules use the Python matcher.
+    for attempt in range(2):
+        rg_rules = [rule for rule in rules if _ripgrep_pattern(rule) not in _RG_REJECTED_PATTERNS]
+        try:
+            rg_findings = _run_with_ripgrep(
+                repo_path,
+                rg_rules,
+                files,
+                max_file_size_bytes,
+                max_files_per_repo,
+                max_matches_per_rule,
+            )
+            break
+        except RipgrepError:
+            rejected = {pattern for pattern in map(_ripgrep_pattern, rg_rules) if not _ripgrep_accepts(pattern)}
+            if not rejected or attempt == 1:
+                # rg failed for another reason (an unreadable file, ...): scan it all in Python.
+                return _run_with_python(
+                    files, rules, max_file_size_bytes, max_files_per_repo, content, max_matches_per_rule
+                )
+            _RG_REJECTED_PATTERNS.update(rejected)
 
-def _run_with_ripgrep(repo_path: Path, rules: list[SignalRule]) -> list[Finding]:
-    findings: list[Finding] = []
-    for rule in rules:
-        cmd = ["rg", "--json", "--line-number", "--color", "never", "-e", rule.pattern, "."]
-        if rule.ignore_case:
-            cmd.insert(1, "-i")
+    py_rules = [rule for rule in rules if _ripgrep_pattern(rule) in _RG_REJECTED_PATTERNS]
+    if not py_rules:
+        return rg_findings
+    py_findings = _run_with_python(
+        files, py_rules, max_file_size_bytes, max_files_per_repo, content, max_matches_per_rule
+    )
+    file_order = {entry.relative: index for index, entry in enumerate(files)}
+    # Stable, so rg findings keep their rule order ahead of Python ones on the same line.
+    return sorted(
+        rg_findings + py_findings,
+        key=lambda item: (file_order.get(item.file_path, len(file_order)), item.line_number),
+    )
+
+
+def rules_mergeable(rules: list[SignalRule]) -> bool:
+    """True when every finding can be traced back to exactly one rule."""
+    keys = [_rule_key(rule) for rule in rules]
+    return len(set(keys)) == len(keys)
+
+
+def merge_rule_chunks(chunks: list[list[Finding]], max_matches_per_rule: int | None) -> list[Finding]:
+    """Concatenate results of contiguous file chunks and re-apply the repo-wide per-rule cap.
 
-        process = subprocess.run(cmd, cwd=repo_path, text=True, capture_output=True)
-        if process.returncode not in {0, 1}:
+    Each chunk is capped on its own, so the first ``max_matches_per_rule`` findings per
+    rule across the ordered chunks are exactly what a single sequential pass keeps.
+    """
+    merged = [item for chunk in chunks for item in chunk]
+    if max_matches_per_rule is None:
+        return merged
+
+    counts: Counter[tuple[str, str, str]] = Counter()
+    capped: list[Finding] = []
+    for item in merged:
+        key = (item.signal_code, item.category, item.severity)
+        if counts[key] >= max_matches_per_rule:
             continue
+        counts[key] += 1
+        capped.append(item)
+    return capped
+
+
+def _rule_key(rule: SignalRule) -> tuple[str, str, str]:
+    return rule.signal_code, rule.category, rule.severity
+
+
+def ripgrep_available() -> bool:
+    return which("rg") is not None
+
+
+def _run_with_ripgrep(
+    repo_path: Path,
+    rules: list[SignalRule],
+    files: list[FileEntry],
+    max_file_size_bytes: int,
+    max_files_per_repo: int,
+    max_matches_per_rule: int | None,
+) -> list[Finding]:
+    compiled = _compile_rules(rules)
+    eligible = [
+        entry.relative
+        for entry in limit_files(
+            files,
+            max_files_per_repo=max_files_per_repo,
+            max_file_size_bytes=max_file_size_bytes,
+        )
+    ]
+    if not compiled or not eligible:
+        return []
+
+    file_order = {relative: index for index, relative in enumerate(eligible)}
+    match_counts = [0] * len(compiled)
+    matches: list[tuple[int, int, int, Finding]] = []
+
+    for rule_start in range(0, len(compiled), RG_MAX_PATTERNS_PER_RUN):
+        batch = compiled[rule_start : rule_start + RG_MAX_PATTERNS_PER_RUN]
+        patterns = [_ripgrep_pattern(rule) for rule, _ in batch]
+
+        for paths in _batch_paths(eligible):
+            if _all_capped(match_counts, rule_start, len(batch), max_matches_per_rule):
+                break
+            stream = _iter_ripgrep_matches(repo_path, patterns, paths)
+            for path, line_number, text in stream:
+                line = text.rstrip("\r\n")
+                # rg only reports that some pattern matched; attribute the line to every rule it satisfies.
+                for offset, (rule, pattern) in enumerate(batch):
+                    rule_index = rule_start + offset
+                    if max_matches_per_rule is not None and match_counts[rule_index] >= max_matches_per_rule:
+                        continue
+                    if not pattern.search(line):
+                        continue
+                    match_counts[rule_index] += 1
+                    matches.append(
+                        (
+                            file_order.get(path, len(file_order)),
+                            line_number,
+                            rule_index,
+                            Finding(
+                                file_path=path,
+                                line_number=line_number,
+                                signal_code=rule.signal_code,
+                                category=rule.category,
+                                severity=rule.severity,
+                                detector="rules_rg",
+                                confidence=0.85,
+                                evidence=line.strip()[:500],
+                            ),
+                        )
+                    )
+
+                if _all_capped(match_counts, rule_start, len(batch), max_matches_per_rule):
+                    # Every rule in this batch is saturated; closing the stream stops rg early.
+                    stream.close()
+                    break
+
+    # Lines of one file can arrive from several rule batches; restore index order.
+    matches.sort(key=lambda item: item[:3])
+    return [item[3] for item in matches]
+
+
+def _all_capped(
+    match_counts: list[int],
+    start: int,
+    count: int,
+    max_matches_per_rule: int | None,
+) -> bool:
+    if max_matches_per_rule is None:
+        return False
+    return all(value >= max_matches_per_rule for value in match_counts[start : start + count])
+
+
+def _ripgrep_pattern(rule: SignalRule) -> str:
+    if rule.ignore_case:
+        return f"(?i:{rule.pattern})"
+    return rule.pattern
+
 
-        for line in process.stdout.splitlines():
+def _batch_paths(paths: list[str]):
+    batch: list[str] = []
+    batch_chars = 0
+    for path in paths:
+        if batch and batch_chars + len(path) + 1 > RG_MAX_PATH_CHARS_PER_RUN:
+            yield batch
+            batch = []
+            batch_chars = 0
+        batch.append(path)
+        batch_chars += len(path) + 1
+    if batch:
+        yield batch
+
+
+def _iter_ripgrep_matches(repo_path: Path, patterns: list[str], paths: list[str]):
+    """Yield (path, line_number, line_text) for each rg match as it is read from the pipe."""
+    # Sorted output keeps the per-rule cap on the same first matches every run; the
+    # paths are already in (sorted) index order.
+    cmd = ["rg", "--no-config", "--json", "--line-number", "--color", "never", "--sort", "path"]
+    for pattern in patterns:
+        cmd.extend(["-e", pattern])
+    cmd.append("--")
+    cmd.extend(paths)
+
+    process = subprocess.Popen(
+        cmd,
+        cwd=repo_path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    finished = False
+    returncode = None
+    try:
+        for line in process.stdout:
             try:
                 payload = json.loads(line)
             except json.JSONDecodeError:
@@ -43,33 +258,33 @@ def _run_with_ripgrep(repo_path: Path, rules: list[SignalRule]) -> list[Finding]
             data = payload.get("data", {})
             path = data.get("path", {}).get("text")
             line_number = data.get("line_number")
-            evidence = data.get("lines", {}).get("text", "").strip()
-            if not path:
+            text = data.get("lines", {}).get("text")
+            if not path or not isinstance(line_number, int) or text is None:
                 continue
+            yield str(path), line_number, text
+        finished = True
+    finally:
+        if not finished:
+            process.kill()
+        process.stdout.close()
+        returncode = process.wait()
+    # 1 only means no match; 2 means an error, possibly before anything was searched.
+    if returncode not in (0, 1):
+        raise RipgrepError(f"rg exited with status {returncode}")
 
-            findings.append(
-                Finding(
-                    file_path=str(path),
-                    line_number=int(line_number) if isinstance(line_number, int) else None,
-                    signal_code=rule.signal_code,
-                    category=rule.category,
-                    severity=rule.severity,
-                    detector="rules_rg",
-                    confidence=0.85,
-                    evidence=evidence[:500],
-                )
-            )
 
-    return findings
+def _ripgrep_accepts(pattern: str) -> bool:
+    result = subprocess.run(
+        ["rg", "--no-config", "--quiet", "-e", pattern, "--", "-"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode in (0, 1)
 
 
-def _run_with_python(
-    repo_path: Path,
-    rules: list[SignalRule],
-    max_file_size_bytes: int,
-    max_files_per_repo: int,
-) -> list[Finding]:
-    compiled = [
+def _compile_rules(rules: list[SignalRule]) -> list[tuple[SignalRule, re.Pattern[str]]]:
+    return [
         (
             rule,
             re.compile(rule.pattern, flags=re.IGNORECASE if rule.ignore_case else 0),
@@ -77,48 +292,65 @@ def _run_with_python(
         for rule in rules
     ]
 
-    findings: list[Finding] = []
-    scanned_files = 0
 
-    for path in _iter_files(repo_path):
-        if scanned_files >= max_files_per_repo:
-            break
-        scanned_files += 1
+def _run_with_python(
+    files: list[FileEntry],
+    rules: list[SignalRule],
+    max_file_size_bytes: int,
+    max_files_per_repo: int,
+    content: FileContentCache,
+    max_matches_per_rule: int | None,
+) -> list[Finding]:
+    compiled = _compile_rules(rules)
+    match_counts = [0] * len(compiled)
+    if not compiled:
+        return []
 
-        if path.stat().st_size > max_file_size_bytes:
-            continue
+    prefilter = LiteralPrefilter(
+        [rule.pattern for rule in rules],
+        [pattern.flags for _, pattern in compiled],
+    )
+    findings: list[Finding] = []
 
-        try:
-            text = path.read_text(encoding="utf-8")
-        except UnicodeDecodeError:
+    for entry in limit_files(
+        files,
+        max_files_per_repo=max_files_per_repo,
+        max_file_size_bytes=max_file_size_bytes,
+    ):
+        text = content.read_text(entry)
+        content.release(entry)
+        if text is None:
             continue
-        except OSError:
+
+        # One literal pass rejects most files before any rule regex runs.
+        candidates = [
+            rule_index
+            for rule_index in prefilter.candidates(text)
+            if max_matches_per_rule is None or match_counts[rule_index] < max_matches_per_rule
+        ]
+        if not candidates:
             continue
 
-        relative = str(path.relative_to(repo_path))
-        for line_index, line in enumerate(text.splitlines(), start=1):
-            for rule, pattern in compiled:
-                if pattern.search(line):
-                    findings.append(
-                        Finding(
-                            file_path=relative,
-                            line_number=line_index,
-                            signal_code=rule.signal_code,
-                            category=rule.category,
-                            severity=rule.severity,
-                            detector="rules_py",
-                            confidence=0.75,
-                            evidence=line.strip()[:500],
-                        )
-                    )
+        relative = entry.relative
+        patterns = [compiled[rule_index][1] for rule_index in candidates]
+        for line_index, position, line in find_matching_lines(text, patterns):
+            rule_index = candidates[position]
+            rule = compiled[rule_index][0]
+            if max_matches_per_rule is not None and match_counts[rule_index] >= max_matches_per_rule:
+                continue
+            match_counts[rule_index] += 1
+            findings.append(
+                Finding(
+                    file_path=relative,
+                    line_number=line_index,
+                    signal_code=rule.signal_code,
+                    category=rule.category,
+                    severity=rule.severity,
+                    detector="rules_py",
+                    confidence=0.75,
+                    evidence=line.strip()[:500],
+                )
+            )
 
     return findings
 
-
-def _iter_files(root: Path):
-    for path in root.rglob("*"):
-        if not path.is_file():
-            continue
-        if "/.git/" in path.as_posix():
-            continue
-        yield path
@@ -0,0 +1,64 @@
+from code_scanner.http import HttpResponse
+from code_scanner.models import ProviderSettings
+from code_scanner.providers.bitbucket_server import BitbucketServerProvider
+
+
+def _fake_bitbucket(calls: list[str]):
+    def fake_get_json(url, headers=None, timeout=30):
+        calls.append(url)
+        if url.endswith("/branches/default"):
+            slug = url.split("/repos/")[1].split("/")[0]
+            return HttpResponse(status=200, headers={}, data={"displayId": f"{slug}-main"})
+        data = {
+            "isLastPage": True,
+            "values": [
+                {
+                    "id": index,
+                    "slug": f"repo{index}",
+                    "project": {"key": "RISK"},
+                    "links": {"clone": [{"href": f"https://bb.example.com/scm/risk/repo{index}.git", "name": "http"}]},
+                }
+                for index in range(1, 4)
+            ],
+        }
+        return HttpResponse(status=200, headers={}, data=data)
+
+    return fake_get_json
+
+
+def test_bitbucket_server_default_branches_are_cached(monkeypatch, tmp_path):
+    calls: list[str] = []
+    monkeypatch.setattr("code_scanner.providers.bitbucket_server.get_json", _fake_bitbucket(calls))
+    settings = ProviderSettings(
+        type="bitbucket_server",
+        name="bb",
+        base_url="https://bb.example.com",
+        project_key="RISK",
+    )
+
+    first = BitbucketServerProvider(settings, cache_dir=tmp_path).list_repos()
+    lookups = [url for url in calls if url.endswith("/branches/default")]
+    calls.clear()
+    second = BitbucketServerProvider(settings, cache_dir=tmp_path).list_repos()
+
+    assert [repo.default_branch for repo in first] == ["repo1-main", "repo2-main", "repo3-main"]
+    assert len(lookups) == 3
+    assert second == first
+    assert not any(url.endswith("/branches/default") for url in calls)
+
+
+def test_bitbucket_server_remote_head_skips_branch_lookups(monkeypatch, tmp_path):
+    calls: list[str] = []
+    monkeypatch.setattr("code_scanner.providers.bitbucket_server.get_json", _fake_bitbucket(calls))
+    settings = ProviderSettings(
+        type="bitbucket_server",
+        name="bb",
+        base_url="https://bb.example.com",
+        project_key="RISK",
+        default_branch_source="remote_head",
+    )
+
+    repos = BitbucketServerProvider(settings, cache_dir=tmp_path).list_repos()
+
+    assert [repo.default_branch for repo in repos] == [None, None, None]
+    assert len(calls) == 1
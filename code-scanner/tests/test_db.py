@@ -1,7 +1,13 @@
+import sqlite3
+from dataclasses import replace
 from pathlib import Path
 
+import pytest
+
+from code_scanner.compaction import compact_database
 from code_scanner.db import Database
 from code_scanner.models import Finding, RepoDescriptor
+from code_scanner.reporting import generate_reports
 
 
 def test_db_run_and_findings(tmp_path: Path):
@@ -57,3 +63,393 @@ def test_db_run_and_findings(tmp_path: Path):
     assert last_commit == "abc123"
 
     db.close()
+
+
+def test_init_schema_adds_missing_repo_columns(tmp_path: Path):
+    db_path = tmp_path / "scanner.db"
+    db = Database(db_path)
+    db.conn.execute(
+        """
+        CREATE TABLE repos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            provider_name TEXT NOT NULL,
+            provider_type TEXT NOT NULL,
+            external_id TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            clone_url TEXT,
+            default_branch TEXT,
+            web_url TEXT,
+            local_path TEXT,
+            last_seen_at TEXT NOT NULL,
+            UNIQUE(provider_name, external_id)
+        )
+        """
+    )
+    db.init_schema()
+
+    columns = {row["name"] for row in db.query("PRAGMA table_info(repos)")}
+    assert "clone_auth_user" in columns
+    db.close()
+
+
+def test_grouped_writes_commit_atomically(tmp_path: Path):
+    db_path = tmp_path / "scanner.db"
+    db = Database(db_path, journal_mode="wal", commit_interval_seconds=3600)
+    db.init_schema()
+    run_id = db.start_run(mode="full", total_repos=2)
+    repo = RepoDescriptor(
+        provider_name="local-test",
+        provider_type="local",
+        external_id="repo-1",
+        full_name="local/repo-1",
+        clone_url=None,
+        default_branch=None,
+        web_url=None,
+    )
+    repo_id = db.upsert_repo(repo)
+    assert db.upsert_repo(repo) == repo_id
+
+    finding = Finding(
+        file_path="main.py",
+        line_number=1,
+        signal_code="ML_TEST",
+        category="test",
+        severity="high",
+        detector="unit",
+        confidence=0.9,
+        evidence="model.fit(X, y)",
+    )
+    assert db.record_repo_scan(run_id, repo_id, "abc123", [finding]) == 1
+
+    reader = Database(db_path)
+    assert reader.query("PRAGMA journal_mode")[0][0] == "wal"
+    assert reader.query("SELECT COUNT(*) FROM findings")[0][0] == 0
+
+    with pytest.raises(sqlite3.IntegrityError):
+        db.record_repo_scan(run_id, 999, "def456", [finding])
+    # A failed write undoes only itself; the rest of the group is committed at once.
+    assert reader.query("SELECT COUNT(*) FROM findings")[0][0] == 1
+    assert db.upsert_repo(repo) == repo_id
+
+    db.finish_run(run_id, status="SUCCESS", scanned_repos=1, skipped_repos=0, findings_count=1, error_count=0)
+    assert reader.query("SELECT COUNT(*) FROM findings")[0][0] == 1
+    assert reader.query("SELECT last_commit_sha FROM repo_scan_state")[0][0] == "abc123"
+    reader.close()
+    db.close()
+
+
+def test_legacy_findings_table_is_migrated(tmp_path: Path):
+    db_path = tmp_path / "scanner.db"
+    legacy = sqlite3.connect(db_path)
+    legacy.executescript(
+        """
+        CREATE TABLE scan_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT NOT NULL,
+            finished_at TEXT,
+            mode TEXT NOT NULL,
+            status TEXT NOT NULL,
+            total_repos INTEGER NOT NULL DEFAULT 0,
+            scanned_repos INTEGER NOT NULL DEFAULT 0,
+            skipped_repos INTEGER NOT NULL DEFAULT 0,
+            findings_count INTEGER NOT NULL DEFAULT 0,
+            error_count INTEGER NOT NULL DEFAULT 0,
+            notes TEXT
+        );
+        CREATE TABLE repos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            provider_name TEXT NOT NULL,
+            provider_type TEXT NOT NULL,
+            external_id TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            clone_url TEXT,
+            default_branch TEXT,
+            web_url TEXT,
+            local_path TEXT,
+            last_seen_at TEXT NOT NULL,
+            UNIQUE(provider_name, external_id)
+        );
+        CREATE TABLE findings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL,
+            repo_id INTEGER NOT NULL,
+            commit_sha TEXT,
+            file_path TEXT NOT NULL,
+            line_number INTEGER,
+            signal_code TEXT NOT NULL,
+            category TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            detector TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            evidence TEXT,
+            created_at TEXT NOT NULL
+        );
+        INSERT INTO scan_runs (id, started_at, mode, status) VALUES (1, '2024-01-01T00:00:00+00:00', 'full', 'SUCCESS');
+        INSERT INTO repos (id, provider_name, provider_type, external_id, full_name, last_seen_at)
+        VALUES (1, 'local', 'local', 'r1', 'local/r1', '2024-01-01T00:00:00+00:00');
+        INSERT INTO findings VALUES
+            (7, 1, 1, 'abc', 'a.py', 3, 'ML_TEST', 'test', 'high', 'unit', 0.9, 'fit()', '2024-01-01T00:00:01+00:00'),
+            (8, 1, 1, NULL, 'a.py', 5, 'ML_TEST', 'test', 'high', 'unit', 0.8, NULL, '2024-01-01T00:00:01+00:00');
+        """
+    )
+    legacy.close()
+
+    db = Database(db_path)
+    db.init_schema()
+
+    rows = [tuple(row) for row in db.query("SELECT commit_sha, file_path, line_number, evidence FROM findings")]
+    assert rows == [("abc", "a.py", 3, "fit()"), ("abc", "a.py", 5, "")]
+    assert db.query("SELECT COUNT(*) FROM file_paths")[0][0] == 1
+    assert db.query("SELECT type FROM sqlite_master WHERE name = 'findings'")[0][0] == "view"
+    db.close()
+
+
+def test_compressed_evidence_reads_back_through_view(tmp_path: Path):
+    db = Database(tmp_path / "scanner.db", compress_evidence=True)
+    db.init_schema()
+    run_id = db.start_run(mode="full", total_repos=1)
+    repo_id = db.upsert_repo(
+        RepoDescriptor(
+            provider_name="local-test",
+            provider_type="local",
+            external_id="repo-1",
+            full_name="local/repo-1",
+            clone_url=None,
+            default_branch=None,
+            web_url=None,
+        )
+    )
+    evidence = "model.fit(X_train, y_train) " * 20
+    finding = Finding(
+        file_path="main.py",
+        line_number=1,
+        signal_code="ML_TEST",
+        category="test",
+        severity="high",
+        detector="unit",
+        confidence=0.9,
+        evidence=evidence,
+    )
+    db.record_repo_scan(run_id, repo_id, "abc123", [finding, replace(finding, evidence="fit()")])
+
+    stored = db.query("SELECT typeof(evidence) FROM finding_spans ORDER BY id")
+    assert [row[0] for row in stored] == ["blob", "text"]
+    assert [row.evidence for row in db.get_findings(run_id, repo_id)] == [evidence, "fit()"]
+    db.close()
+
+
+def test_findings_history_is_rebuilt_from_spans(tmp_path: Path):
+    db_path = tmp_path / "scanner.db"
+    db = Database(db_path)
+    db.init_schema()
+    repo_id = db.upsert_repo(
+        RepoDescriptor(
+            provider_name="local-test",
+            provider_type="local",
+            external_id="repo-1",
+            full_name="local/repo-1",
+            clone_url=None,
+            default_branch=None,
+            web_url=None,
+        )
+    )
+    fit = Finding(
+        file_path="train.py",
+        line_number=3,
+        signal_code="ML_TEST",
+        category="test",
+        severity="high",
+        detector="unit",
+        confidence=0.9,
+        evidence="model.fit(X, y)",
+    )
+    sklearn = replace(fit, line_number=1, signal_code="ML_SKLEARN", evidence="import sklearn")
+    torch = replace(fit, file_path="nn.py", line_number=1, signal_code="ML_TORCH", evidence="import torch")
+
+    runs = [db.start_run(mode="full", total_repos=1) for _ in range(4)]
+    db.record_repo_scan(runs[0], repo_id, "c1", [sklearn, fit])
+    db.record_repo_scan(runs[1], repo_id, "c2", [sklearn, replace(fit, line_number=7)])
+    db.record_repo_scan(runs[2], repo_id, "c3", [replace(fit, line_number=7), torch])
+    # runs[3] does not scan the repo.
+
+    def snapshot(run_id: int) -> list[tuple]:
+        rows = db.query(
+            "SELECT commit_sha, file_path, line_number, signal_code FROM findings WHERE run_id = ? ORDER BY 2, 3",
+            (run_id,),
+        )
+        return [tuple(row) for row in rows]
+
+    assert snapshot(runs[0]) == [("c1", "train.py", 1, "ML_SKLEARN"), ("c1", "train.py", 3, "ML_TEST")]
+    assert snapshot(runs[1]) == [("c2", "train.py", 1, "ML_SKLEARN"), ("c2", "train.py", 7, "ML_TEST")]
+    assert snapshot(runs[2]) == [("c3", "nn.py", 1, "ML_TORCH"), ("c3", "train.py", 7, "ML_TEST")]
+    assert snapshot(runs[3]) == []
+    # Unchanged findings are not rewritten: 2 spans, then a moved line, then one new finding.
+    assert db.query("SELECT COUNT(*) FROM finding_spans")[0][0] == 4
+    current = db.query("SELECT signal_code FROM current_findings ORDER BY signal_code")
+    assert [row[0] for row in current] == ["ML_TEST", "ML_TORCH"]
+    db.close()
+
+    summary = generate_reports(
+        db_path=str(db_path),
+        output_dir=str(tmp_path / "report"),
+        run_id=runs[2],
+        include_new_findings=True,
+    )
+    assert summary["counts"]["new_findings"] == 1
+    assert summary["counts"]["resolved_findings"] == 1
+    assert "import torch" in (tmp_path / "report" / "new_findings.csv").read_text(encoding="utf-8")
+
+    # Once the run is finished the counts are stored with it and the detail CSV is opt-in.
+    db = Database(db_path)
+    db.finish_run(runs[2], status="SUCCESS", scanned_repos=1, skipped_repos=0, findings_count=2, error_count=0)
+    stored = db.query("SELECT new_findings, resolved_findings FROM scan_runs WHERE id = ?", (runs[2],))[0]
+    db.close()
+    assert tuple(stored) == (1, 1)
+    summary = generate_reports(db_path=str(db_path), output_dir=str(tmp_path / "finished"), run_id=runs[2])
+    assert summary["counts"]["new_findings"] == 1
+    assert summary["counts"]["resolved_findings"] == 1
+    assert not (tmp_path / "finished" / "new_findings.csv").exists()
+
+
+def test_compact_keeps_history_visible_to_retained_runs(tmp_path: Path):
+    db_path = tmp_path / "scanner.db"
+    db = Database(db_path, journal_mode="wal")
+    db.init_schema()
+
+    def repo(name: str) -> int:
+        return db.upsert_repo(
+            RepoDescriptor(
+                provider_name="local-test",
+                provider_type="local",
+                external_id=name,
+                full_name=f"local/{name}",
+                clone_url=None,
+                default_branch=None,
+                web_url=None,
+            )
+        )
+
+    active, dormant = repo("active"), repo("dormant")
+    base = Finding(
+        file_path="train.py",
+        line_number=1,
+        signal_code="ML_TEST",
+        category="test",
+        severity="high",
+        detector="unit",
+        confidence=0.9,
+        evidence="model.fit(X, y)",
+    )
+    runs = [db.start_run(mode="full", total_repos=1) for _ in range(4)]
+    db.record_repo_scan(runs[0], dormant, "d1", [replace(base, file_path="old.py")])
+    for index, run_id in enumerate(runs):
+        db.record_repo_scan(run_id, active, f"a{index}", [replace(base, file_path=f"v{index}.py")])
+    for run_id in runs:
+        db.finish_run(run_id, status="SUCCESS", scanned_repos=1, skipped_repos=0, findings_count=1, error_count=0)
+    expected = {run_id: db.query("SELECT file_path FROM findings WHERE run_id = ? ORDER BY file_path", (run_id,)) for run_id in runs}
+    db.close()
+
+    # A tiny chunk size forces every delete through several bounded batches.
+    summary = compact_database(db_path=str(db_path), keep_last=1, chunk_size=1)
+
+    # runs[0] is the dormant repo's latest scan, so it survives alongside the newest run.
+    assert summary["deleted_runs"] == 2
+    assert summary["deleted_finding_spans"] == 2
+    assert summary["vacuum"] == "incremental"
+    db = Database(db_path)
+    assert [row["id"] for row in db.query("SELECT id FROM scan_runs ORDER BY id")] == [runs[0], runs[3]]
+    for run_id in (runs[0], runs[3]):
+        rows = db.query("SELECT file_path FROM findings WHERE run_id = ? ORDER BY file_path", (run_id,))
+        assert [tuple(row) for row in rows] == [tuple(row) for row in expected[run_id]]
+    assert {row["path"] for row in db.query("SELECT path FROM file_paths")} == {"old.py", "v0.py", "v3.py"}
+    assert {row["sha"] for row in db.query("SELECT sha FROM commits")} == {"d1", "a0", "a3"}
+    analyzed = {row[0] for row in db.query("SELECT DISTINCT tbl FROM sqlite_stat1")}
+    assert {"finding_spans", "run_repos"} <= analyzed
+    for table in ("run_repos", "run_repo_rollup", "run_signal_rollup", "run_top_findings"):
+        rows = db.query(f"SELECT DISTINCT run_id FROM {table} ORDER BY run_id")
+        assert [row["run_id"] for row in rows] == [runs[0], runs[3]]
+    db.close()
+
+
+def test_stored_rollups_match_live_aggregates(tmp_path: Path):
+    db_path = tmp_path / "scanner.db"
+    db = Database(db_path)
+    db.init_schema()
+    base = Finding(
+        file_path="train.py",
+        line_number=1,
+        signal_code="ML_TEST",
+        category="test",
+        severity="high",
+        detector="unit",
+        confidence=0.9,
+        evidence="model.fit(X, y)",
+    )
+    run_id = db.start_run(mode="full", total_repos=3)
+    for index in range(3):
+        repo_id = db.upsert_repo(
+            RepoDescriptor(
+                provider_name="local-test",
+                provider_type="local",
+                external_id=f"repo-{index}",
+                full_name=f"local/repo-{index}",
+                clone_url=None,
+                default_branch=None,
+                web_url=None,
+            )
+        )
+        findings = [
+            replace(base, line_number=line, severity=severity, signal_code=f"ML_{severity.upper()}")
+            for line, severity in enumerate(["high", "medium", "low", "medium"][: index + 2], start=1)
+        ]
+        db.record_repo_scan(run_id, repo_id, "abc", [base])
+        # A repeated write for the same repo replaces its earlier contribution.
+        db.record_repo_scan(run_id, repo_id, "abc", findings)
+    db.finish_run(run_id, status="SUCCESS", scanned_repos=3, skipped_repos=0, findings_count=9, error_count=0)
+    db.close()
+
+    stored_dir, live_dir = tmp_path / "stored", tmp_path / "live"
+    generate_reports(db_path=str(db_path), output_dir=str(stored_dir), run_id=run_id)
+    db = Database(db_path)
+    db.conn.execute("UPDATE scan_runs SET rollups_ready = 0")
+    db.commit()
+    db.close()
+    generate_reports(db_path=str(db_path), output_dir=str(live_dir), run_id=run_id)
+
+    for name in ("findings_by_repo.csv", "findings_by_signal.csv", "top_findings.csv"):
+        assert (stored_dir / name).read_text(encoding="utf-8") == (live_dir / name).read_text(encoding="utf-8")
+    assert "ML_TEST" not in (stored_dir / "findings_by_signal.csv").read_text(encoding="utf-8")
+
+
+def test_failed_grouped_write_releases_the_write_lock(tmp_path: Path):
+    db_path = tmp_path / "scanner.db"
+    db = Database(db_path, journal_mode="wal", commit_interval_seconds=3600, busy_timeout_seconds=0.1)
+    db.init_schema()
+    run_id = db.start_run(mode="full", total_repos=1)
+    repo = RepoDescriptor(
+        provider_name="local-test",
+        provider_type="local",
+        external_id="repo-1",
+        full_name="local/repo-1",
+        clone_url=None,
+        default_branch=None,
+        web_url=None,
+    )
+    repo_id = db.upsert_repo(repo)
+    with pytest.raises(sqlite3.IntegrityError):
+        db.record_repo_scan(run_id, 999, "abc", [])
+
+    # The failed write committed the rest of its group, so another writer can get in.
+    other = sqlite3.connect(db_path, timeout=0.1)
+    other.execute("BEGIN IMMEDIATE")
+    other.execute("DELETE FROM provider_listings")
+    with pytest.raises(sqlite3.OperationalError):
+        db.upsert_repo(repo)
+    other.commit()
+    other.close()
+
+    assert db.upsert_repo(repo) == repo_id
+    db.record_repo_scan(run_id, repo_id, "abc", [])
+    db.finish_run(run_id, status="SUCCESS", scanned_repos=1, skipped_repos=0, findings_count=0, error_count=0)
+    assert db.query("SELECT status FROM scan_runs")[0][0] == "SUCCESS"
+    db.close()
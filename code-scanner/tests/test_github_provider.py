@@ -1,3 +1,5 @@
+from urllib.parse import parse_qs, urlsplit
+
 from code_scanner.http import HttpResponse
 from code_scanner.models import ProviderSettings
 from code_scanner.providers.github import GitHubProvider
@@ -63,3 +65,38 @@ def test_github_provider_user_scope_fallback(monkeypatch):
     assert repos[0].full_name == "chukwudyre/Penn-CIS545-Project"
     assert any("/orgs/chukwudyre/repos" in url for url in calls)
     assert any("/users/chukwudyre/repos" in url for url in calls)
+
+
+def test_github_provider_fetches_remaining_pages_from_link_header(monkeypatch):
+    calls: list[str] = []
+
+    def fake_get_json(url, headers=None, timeout=30):
+        calls.append(url)
+        page = int(parse_qs(urlsplit(url).query)["page"][0])
+        size = 100 if page < 4 else 7
+        data = [
+            {
+                "id": page * 1000 + index,
+                "full_name": f"psf/repo-{page}-{index}",
+                "clone_url": f"https://github.com/psf/repo-{page}-{index}.git",
+            }
+            for index in range(size)
+        ]
+        link = '<https://api.github.com/organizations/1/repos?per_page=100&page=4&type=all>; rel="last"'
+        return HttpResponse(status=200, headers={"link": link} if page == 1 else {}, data=data)
+
+    monkeypatch.setattr("code_scanner.providers.github.get_json", fake_get_json)
+
+    provider = GitHubProvider(
+        ProviderSettings(type="github", name="gh", org="psf", discovery_workers=3)
+    )
+    repos = provider.list_repos()
+
+    assert len(repos) == 307
+    assert len(calls) == 4
+    assert [repo.full_name for repo in repos[::100]] == [
+        "psf/repo-1-0",
+        "psf/repo-2-0",
+        "psf/repo-3-0",
+        "psf/repo-4-0",
+    ]
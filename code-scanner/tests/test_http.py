@@ -0,0 +1,108 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from code_scanner.http import HttpClient
+from code_scanner.http_cache import ResponseCache
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections: set = set()
+    statuses: list = []
+
+    def do_GET(self):
+        type(self).connections.add(self.client_address)
+        if self.headers.get("If-None-Match") == '"v1"':
+            type(self).statuses.append(304)
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            return
+        if self.path == "/missing":
+            body = b'{"message": "Not Found"}'
+            self.send_response(404)
+        else:
+            body = json.dumps({"path": self.path}).encode()
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body)
+            type(self).statuses.append(200)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    _Handler.connections = set()
+    _Handler.statuses = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_http_client_reuses_connection_and_decodes_gzip(server, monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "*")
+    client = HttpClient()
+    try:
+        first = client.get_json(f"{server}/repos?page=1")
+        second = client.get_json(f"{server}/repos?page=2")
+        with pytest.raises(RuntimeError, match="HTTP 404"):
+            client.get_json(f"{server}/missing")
+    finally:
+        client.close()
+
+    assert first.data == {"path": "/repos?page=1"}
+    assert second.data == {"path": "/repos?page=2"}
+    assert first.headers["content-encoding"] == "gzip"
+    assert len(_Handler.connections) == 1
+
+
+def test_http_client_shares_idle_connections_across_threads(server, monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "*")
+    client = HttpClient()
+    results = []
+    try:
+        # Like a provider listing: every page comes from a new short-lived worker thread.
+        for page in range(3):
+            worker = threading.Thread(target=lambda: results.append(client.get_json(f"{server}/repos?page={page}")))
+            worker.start()
+            worker.join()
+    finally:
+        client.close()
+
+    assert [item.data["path"] for item in results] == ["/repos?page=0", "/repos?page=1", "/repos?page=2"]
+    assert len(_Handler.connections) == 1
+
+
+def test_http_client_revalidates_cached_responses(server, monkeypatch, tmp_path):
+    monkeypatch.setenv("NO_PROXY", "*")
+    url = f"{server}/orgs/psf/repos?page=1"
+
+    def fetch(cache: ResponseCache):
+        client = HttpClient(cache=cache)
+        try:
+            return client.get_json(url, headers={"Authorization": "Bearer t"})
+        finally:
+            client.close()
+
+    first = fetch(ResponseCache(tmp_path, ttl_seconds=0))
+    revalidated = fetch(ResponseCache(tmp_path, ttl_seconds=0))
+    fresh = fetch(ResponseCache(tmp_path, ttl_seconds=3600))
+    refreshed = fetch(ResponseCache(tmp_path, ttl_seconds=3600, refresh=True))
+
+    assert first.data == revalidated.data == fresh.data == refreshed.data == {"path": "/orgs/psf/repos?page=1"}
+    assert _Handler.statuses == [200, 304, 200]
@@ -0,0 +1,389 @@
+import json
+import sqlite3
+import subprocess
+import threading
+from dataclasses import replace
+from pathlib import Path
+
+from code_scanner.db import Database
+from code_scanner.http import HttpResponse
+from code_scanner.models import AppConfig, ProviderSettings, RepoDescriptor, ScanSettings
+from code_scanner import pipeline
+from code_scanner.pipeline import discover_repos, run_scan
+
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+def _make_config(tmp_path: Path, repo: Path) -> AppConfig:
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(
+        json.dumps(
+            [
+                {
+                    "signal_code": "ML_SKLEARN_USAGE",
+                    "category": "classical_ml",
+                    "severity": "medium",
+                    "description": "sklearn usage",
+                    "pattern": "\\bsklearn\\b",
+                    "ignore_case": True,
+                }
+            ]
+        ),
+        encoding="utf-8",
+    )
+    return AppConfig(
+        db_path=str(tmp_path / "data" / "scanner.db"),
+        repo_cache_dir=str(tmp_path / "cache"),
+        rules_path=str(rules_path),
+        providers=(ProviderSettings(type="local", name="local", root_dir=str(repo)),),
+        scan=ScanSettings(max_file_size_bytes=200_000, max_files_per_repo=1000),
+    )
+
+
+def _findings_by_path(db_path: str, run_id: int) -> dict[str, set[str]]:
+    db = Database(db_path)
+    rows = db.query("SELECT file_path, signal_code FROM findings WHERE run_id = ?", (run_id,))
+    db.close()
+    result: dict[str, set[str]] = {}
+    for row in rows:
+        result.setdefault(row["file_path"], set()).add(row["signal_code"])
+    return result
+
+
+def test_incremental_scan_rescans_only_changed_files(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "keep.py").write_text("import sklearn\n", encoding="utf-8")
+    (repo / "edit.py").write_text("import sklearn\n", encoding="utf-8")
+    (repo / "gone.py").write_text("import sklearn\n", encoding="utf-8")
+    _git(repo, "init", "-q")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "initial")
+
+    config = _make_config(tmp_path, repo)
+    first = run_scan(config, mode="full", limit=None, repo_regex=None)
+    assert set(_findings_by_path(config.db_path, first.run_id)) == {"keep.py", "edit.py", "gone.py"}
+
+    (repo / "edit.py").write_text("model.fit(X, y)\n", encoding="utf-8")
+    (repo / "gone.py").unlink()
+    (repo / "new.py").write_text("from transformers import AutoModel\n", encoding="utf-8")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "change")
+
+    second = run_scan(config, mode="incremental", limit=None, repo_regex=None)
+    by_path = _findings_by_path(config.db_path, second.run_id)
+
+    assert second.scanned_repos == 1
+    assert by_path["keep.py"] == {"ML_SKLEARN_USAGE", "AST_SKLEARN_IMPORT"}
+    assert by_path["edit.py"] == {"AST_TRAIN_CALL"}
+    assert by_path["new.py"] == {"AST_TRANSFORMERS_IMPORT"}
+    assert "gone.py" not in by_path
+
+    third = run_scan(config, mode="incremental", limit=None, repo_regex=None)
+    assert third.skipped_repos == 1
+
+
+def test_incremental_scan_rescans_everything_after_a_rule_change(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "keep.py").write_text("import sklearn\n", encoding="utf-8")
+    (repo / "edit.py").write_text("import sklearn\n", encoding="utf-8")
+    _git(repo, "init", "-q")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "initial")
+
+    config = _make_config(tmp_path, repo)
+    run_scan(config, mode="full", limit=None, repo_regex=None)
+
+    rules_path = Path(config.rules_path)
+    rules = json.loads(rules_path.read_text(encoding="utf-8"))
+    rules[0]["signal_code"] = "ML_SCIKIT_LEARN"
+    rules_path.write_text(json.dumps(rules), encoding="utf-8")
+
+    # Same commit, new rules: the repo must not be skipped as unchanged.
+    unchanged = run_scan(config, mode="incremental", limit=None, repo_regex=None)
+    assert unchanged.scanned_repos == 1
+    assert _findings_by_path(config.db_path, unchanged.run_id)["keep.py"] == {
+        "ML_SCIKIT_LEARN",
+        "AST_SKLEARN_IMPORT",
+    }
+
+    rules[0]["signal_code"] = "ML_SKLEARN_IMPORT"
+    rules_path.write_text(json.dumps(rules), encoding="utf-8")
+    (repo / "edit.py").write_text("model.fit(X, y)\n", encoding="utf-8")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "change")
+
+    # New commit, new rules: untouched files are rescanned rather than carried forward.
+    changed = run_scan(config, mode="incremental", limit=None, repo_regex=None)
+    by_path = _findings_by_path(config.db_path, changed.run_id)
+    assert by_path["keep.py"] == {"ML_SKLEARN_IMPORT", "AST_SKLEARN_IMPORT"}
+    assert by_path["edit.py"] == {"AST_TRAIN_CALL"}
+
+
+def test_incremental_scan_respects_limits_like_a_full_scan(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("import sklearn\n", encoding="utf-8")
+    (repo / "c.py").write_text("import sklearn\n", encoding="utf-8")
+    _git(repo, "init", "-q")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "initial")
+
+    base = _make_config(tmp_path, repo)
+    config = replace(base, scan=replace(base.scan, max_matches_per_rule=3))
+
+    def rule_matches(run_id: int) -> list[str]:
+        db = Database(config.db_path)
+        rows = db.query(
+            "SELECT file_path, line_number FROM findings WHERE run_id = ? AND signal_code = 'ML_SKLEARN_USAGE'",
+            (run_id,),
+        )
+        db.close()
+        return sorted(f"{row['file_path']}:{row['line_number']}" for row in rows)
+
+    run_scan(config, mode="full", limit=None, repo_regex=None)
+
+    # The carried a.py/c.py and the rescanned b.py are each under the cap, together over it.
+    (repo / "b.py").write_text("import sklearn\nimport sklearn\n", encoding="utf-8")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "add b")
+    incremental = run_scan(config, mode="incremental", limit=None, repo_regex=None)
+    assert rule_matches(incremental.run_id) == ["a.py:1", "b.py:1", "b.py:2"]
+
+    # The previous run hit the cap, so c.py's dropped match must be found again.
+    (repo / "b.py").unlink()
+    (repo / "d.py").write_text("x = 1\n", encoding="utf-8")
+    (repo / "e.py").write_text("x = 2\n", encoding="utf-8")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "drop b")
+    after_cap = run_scan(config, mode="incremental", limit=None, repo_regex=None)
+    assert rule_matches(after_cap.run_id) == ["a.py:1", "c.py:1"]
+
+
+
+def test_incremental_scan_over_file_limit_rescans_in_full(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("import sklearn\n", encoding="utf-8")
+    (repo / "b.py").write_text("import sklearn\n", encoding="utf-8")
+    _git(repo, "init", "-q")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "initial")
+
+    base = _make_config(tmp_path, repo)
+    config = replace(base, scan=replace(base.scan, max_files_per_repo=2))
+    run_scan(config, mode="full", limit=None, repo_regex=None)
+
+    # 0.py now sorts first, so a full scan stops before b.py.
+    (repo / "0.py").write_text("x = 1\n", encoding="utf-8")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "add 0")
+    incremental = run_scan(config, mode="incremental", limit=None, repo_regex=None)
+    full = run_scan(config, mode="full", limit=None, repo_regex=None)
+
+    assert _findings_by_path(config.db_path, incremental.run_id) == _findings_by_path(config.db_path, full.run_id)
+    assert set(_findings_by_path(config.db_path, full.run_id)) == {"a.py"}
+
+
+def test_failed_write_keeps_other_repos_of_the_group(tmp_path: Path, monkeypatch):
+    root = tmp_path / "repos"
+    for index in range(4):
+        repo = root / f"repo{index}"
+        repo.mkdir(parents=True)
+        (repo / f"train{index}.py").write_text("import sklearn\n", encoding="utf-8")
+        _git(repo, "init", "-q")
+
+    original_record = Database._record_findings
+    original_commit = Database.commit
+    failed = threading.Event()
+
+    def failing_record(self, run_id, repo_id, commit_sha, findings):
+        if any(item.file_path == "train1.py" for item in findings):
+            failed.set()
+            raise sqlite3.OperationalError("disk I/O error")
+        return original_record(self, run_id, repo_id, commit_sha, findings)
+
+    def busy_commit(self):
+        # Never idle before the failure, so upserts and recorded repos share its group.
+        if failed.is_set():
+            original_commit(self)
+
+    monkeypatch.setattr(Database, "_record_findings", failing_record)
+    monkeypatch.setattr(Database, "commit", busy_commit)
+    config = _make_config(tmp_path, root)
+    summary = run_scan(config, mode="full", limit=None, repo_regex=None)
+
+    assert (summary.scanned_repos, summary.error_count) == (3, 1)
+    db = Database(config.db_path)
+    rows = db.query(
+        """
+        SELECT r.full_name, f.file_path FROM findings f JOIN repos r ON r.id = f.repo_id
+        WHERE f.run_id = ? AND f.signal_code = 'ML_SKLEARN_USAGE'
+        """,
+        (summary.run_id,),
+    )
+    run_row = db.query("SELECT scanned_repos, findings_count FROM scan_runs WHERE id = ?", (summary.run_id,))[0]
+    db.close()
+    recorded = sorted((row["full_name"].rsplit("/", 1)[-1], row["file_path"]) for row in rows)
+    assert recorded == [("repo0", "train0.py"), ("repo2", "train2.py"), ("repo3", "train3.py")]
+    assert tuple(run_row) == (3, summary.findings_count)
+
+
+def test_parallel_scan_matches_sequential_scan(tmp_path: Path):
+    root = tmp_path / "repos"
+    for index in range(4):
+        repo = root / f"repo{index}"
+        repo.mkdir(parents=True)
+        (repo / "train.py").write_text(f"import sklearn\nmodel_{index}.fit(X, y)\n", encoding="utf-8")
+        _git(repo, "init", "-q")
+
+    config = _make_config(tmp_path, root)
+    sequential = run_scan(config, mode="full", limit=None, repo_regex=None)
+    parallel = run_scan(config, mode="full", limit=None, repo_regex=None, sync_workers=2, scan_workers=2)
+
+    assert parallel.scanned_repos == sequential.scanned_repos == 4
+    assert parallel.findings_count == sequential.findings_count
+
+    db = Database(config.db_path)
+    rows = {
+        run_id: sorted(
+            tuple(row)
+            for row in db.query(
+                "SELECT repo_id, file_path, line_number, signal_code FROM findings WHERE run_id = ?",
+                (run_id,),
+            )
+        )
+        for run_id in (sequential.run_id, parallel.run_id)
+    }
+    db.close()
+    assert rows[parallel.run_id] == rows[sequential.run_id]
+
+
+def test_incremental_scan_skips_unchanged_remote_without_syncing(tmp_path: Path, monkeypatch):
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    (remote / "train.py").write_text("import sklearn\n", encoding="utf-8")
+    _git(remote, "init", "-q", "-b", "main")
+    _git(remote, "add", "-A")
+    _git(remote, "commit", "-q", "-m", "initial")
+
+    config = _make_config(tmp_path, remote)
+    descriptor = RepoDescriptor(
+        provider_name="local",
+        provider_type="github",
+        external_id="1",
+        full_name="org/remote",
+        clone_url=remote.as_uri(),
+        default_branch="main",
+        web_url=None,
+    )
+    monkeypatch.setattr("code_scanner.pipeline.iter_discovered_repos", lambda config, db, refresh=False: iter([descriptor]))
+
+    first = run_scan(config, mode="incremental", limit=None, repo_regex=None)
+    assert first.scanned_repos == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("unchanged repos must not be fetched")
+
+    with monkeypatch.context() as patch:
+        patch.setattr("code_scanner.pipeline.sync_repo", fail)
+        second = run_scan(config, mode="incremental", limit=None, repo_regex=None)
+    assert second.skipped_repos == 1
+
+    (remote / "train.py").write_text("model.fit(X, y)\n", encoding="utf-8")
+    _git(remote, "commit", "-q", "-am", "change")
+    third = run_scan(config, mode="incremental", limit=None, repo_regex=None)
+    assert third.scanned_repos == 1
+    assert _findings_by_path(config.db_path, third.run_id) == {"train.py": {"AST_TRAIN_CALL"}}
+
+
+def test_scan_starts_before_discovery_finishes(tmp_path: Path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "train.py").write_text("import sklearn\n", encoding="utf-8")
+    _git(repo, "init", "-q")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "initial")
+    config = _make_config(tmp_path, repo)
+    first = RepoDescriptor(
+        provider_name="local",
+        provider_type="local",
+        external_id=str(repo),
+        full_name="local/repo",
+        clone_url=str(repo),
+        default_branch=None,
+        web_url=None,
+    )
+    sync_started = threading.Event()
+
+    def listing(config, db, refresh=False):
+        yield first
+        # The first repo starts syncing while later pages are still being listed.
+        assert sync_started.wait(timeout=10)
+        yield replace(first, external_id="missing", full_name="local/missing", clone_url=str(tmp_path / "missing"))
+
+    original_sync = pipeline.sync_repo
+    monkeypatch.setattr("code_scanner.pipeline.iter_discovered_repos", listing)
+    monkeypatch.setattr(
+        "code_scanner.pipeline.sync_repo",
+        lambda repo, **kwargs: sync_started.set() or original_sync(repo, **kwargs),
+    )
+
+    summary = run_scan(config, mode="full", limit=None, repo_regex=None)
+
+    assert summary.total_repos == 2
+    assert summary.scanned_repos == 1
+    assert summary.error_count == 1
+    db = Database(config.db_path)
+    row = db.conn.execute("SELECT total_repos FROM scan_runs WHERE id = ?", (summary.run_id,)).fetchone()
+    db.close()
+    assert row[0] == 2
+
+
+def test_discover_repos_reuses_stored_listing_within_ttl(tmp_path: Path, monkeypatch):
+    calls: list[str] = []
+
+    def fake_get_json(url, headers=None, timeout=30):
+        calls.append(url)
+        data = [
+            {
+                "id": 1,
+                "full_name": "psf/requests",
+                "clone_url": "https://github.com/psf/requests.git",
+                "default_branch": "main",
+                "html_url": "https://github.com/psf/requests",
+            }
+        ]
+        return HttpResponse(status=200, headers={}, data=data)
+
+    monkeypatch.setattr("code_scanner.providers.github.get_json", fake_get_json)
+    monkeypatch.setenv("GH_TEST_TOKEN", "secret")
+    config = replace(
+        _make_config(tmp_path, tmp_path),
+        providers=(ProviderSettings(type="github", name="gh", org="psf", token_env="GH_TEST_TOKEN"),),
+    )
+
+    first = discover_repos(config)
+    second = discover_repos(config)
+    assert len(calls) == 1
+    assert second == first
+    assert second[0].auth_token == "secret"
+
+    db = Database(config.db_path)
+    stored = db.query("SELECT * FROM repos")
+    db.close()
+    assert "secret" not in [value for row in stored for value in tuple(row)]
+
+    discover_repos(config, refresh=True)
+    assert len(calls) == 2
+
+    other_org = replace(config, providers=(ProviderSettings(type="github", name="gh", org="pallets"),))
+    discover_repos(other_org)
+    assert len(calls) == 3
@@ -0,0 +1,41 @@
+from code_scanner.rate_limit import RateLimiter
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_rate_limiter_waits_for_retry_after_and_reports_throttling():
+    clock = _FakeClock()
+    limiter = RateLimiter(base_delay=0.0, sleep=clock.sleep, clock=clock)
+
+    limiter.acquire("api.github.com")
+    delay = limiter.retry_delay("api.github.com", 403, {"retry-after": "30"}, attempt=0)
+    limiter.acquire("api.github.com")
+
+    assert delay == 30
+    assert clock.now == 1_030.0
+    assert limiter.throttled_seconds == 30
+    assert limiter.retry_delay("api.github.com", 403, {}, attempt=0) is None
+
+
+def test_rate_limiter_spreads_the_remaining_budget_until_reset():
+    clock = _FakeClock()
+    limiter = RateLimiter(sleep=clock.sleep, clock=clock)
+
+    headers = {"x-ratelimit-remaining": "4", "x-ratelimit-reset": str(int(clock.now) + 40)}
+    assert limiter.retry_delay("api.github.com", 200, headers, attempt=0) is None
+    for _ in range(4):
+        limiter.acquire("api.github.com")
+    assert clock.now == 1_030.0
+
+    limiter.acquire("api.github.com")
+    assert clock.now == 1_040.0
+    assert limiter.retry_delay("api.github.com", 429, {}, attempt=5) is None
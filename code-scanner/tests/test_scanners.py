@@ -1,8 +1,20 @@
+import io
 import json
+import re
+import subprocess
+from collections import Counter
 from pathlib import Path
+from typing import Callable
 
-from code_scanner.models import ScanSettings, SignalRule
+from code_scanner.findings_cache import FindingsCache
+from code_scanner.models import RepoDescriptor, ScanSettings, SignalRule
+from code_scanner.repo_sync import sync_repo
+from code_scanner.scanners.content import FileContentCache
 from code_scanner.scanners.engine import scan_repository
+from code_scanner.scanners.file_index import build_file_index
+from code_scanner.scanners.matching import find_matching_lines
+from code_scanner.scanners.prefilter import LiteralPrefilter, required_literals
+from code_scanner.scanners.rules import run_rules_scan
 
 
 def test_scanner_detects_rules_and_ast(tmp_path: Path):
@@ -155,3 +167,421 @@ def test_scanner_detects_notebook_ast_signals(tmp_path: Path):
     assert "NB_AST_SKLEARN_IMPORT" in codes
     assert "NB_AST_TRAIN_CALL" in codes
     assert "NB_AST_INFER_CALL" in codes
+
+
+def test_file_index_skips_git_metadata(tmp_path: Path):
+    repo = tmp_path / "indexed-repo"
+    (repo / ".git" / "objects").mkdir(parents=True)
+    (repo / ".git" / "objects" / "blob").write_text("import sklearn\n", encoding="utf-8")
+    (repo / "pkg").mkdir()
+    (repo / "pkg" / "train.py").write_text("model.fit(X, y)\n", encoding="utf-8")
+    (repo / "README.md").write_text("docs\n", encoding="utf-8")
+
+    files = build_file_index(repo)
+
+    assert [entry.relative for entry in files] == ["README.md", "pkg/train.py"]
+    assert files[1].suffix == ".py"
+    assert files[1].size == len("model.fit(X, y)\n")
+
+
+def test_file_index_prunes_excluded_directories(tmp_path: Path):
+    repo = tmp_path / "js-repo"
+    (repo / "node_modules" / "openai").mkdir(parents=True)
+    (repo / "node_modules" / "openai" / "index.js").write_text("import OpenAI from 'openai';\n", encoding="utf-8")
+    (repo / "src").mkdir()
+    (repo / "src" / "app.js").write_text("predict(x);\n", encoding="utf-8")
+
+    assert [entry.relative for entry in build_file_index(repo)] == ["src/app.js"]
+    assert [entry.relative for entry in build_file_index(repo, exclude_dir_names=())] == [
+        "node_modules/openai/index.js",
+        "src/app.js",
+    ]
+
+
+def test_content_cache_reads_once_and_evicts_after_last_consumer(tmp_path: Path):
+    repo = tmp_path / "cached-repo"
+    repo.mkdir()
+    (repo / "Job.scala").write_text("val model = pipeline.fit(df)\n", encoding="utf-8")
+    entry = build_file_index(repo)[0]
+
+    content = FileContentCache({entry.relative: 2})
+    assert content.read_lines(entry) == ["val model = pipeline.fit(df)"]
+    content.release(entry)
+
+    (repo / "Job.scala").write_text("changed\n", encoding="utf-8")
+    assert content.read_text(entry) == "val model = pipeline.fit(df)\n"
+    content.release(entry)
+    assert content.cached_bytes == 0
+    assert content.read_text(entry) == "changed\n"
+
+
+def test_content_cache_respects_memory_cap(tmp_path: Path):
+    repo = tmp_path / "capped-repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("a" * 64, encoding="utf-8")
+    (repo / "b.py").write_text("b" * 64, encoding="utf-8")
+    first, second = build_file_index(repo)
+
+    content = FileContentCache({first.relative: 2, second.relative: 2}, max_bytes=100)
+    content.read_text(first)
+    content.read_text(second)
+
+    assert content.cached_bytes <= 100
+
+
+def test_scan_reads_each_file_once_when_repo_exceeds_content_cache(tmp_path: Path, monkeypatch):
+    repo = tmp_path / "large-repo"
+    repo.mkdir()
+    for index in range(90):
+        (repo / f"m{index:03d}.py").write_text(f"import sklearn\nmodel_{index}.fit(X, y)\n", encoding="utf-8")
+    total_bytes = sum(entry.size for entry in build_file_index(repo))
+    rules = [SignalRule("ML_SKLEARN_USAGE", "classical_ml", "medium", "sklearn", "\\bsklearn\\b", ignore_case=True)]
+    monkeypatch.setattr("code_scanner.scanners.engine.ripgrep_available", lambda: False)
+    expected = scan_repository(repo, rules, ScanSettings())
+
+    reads: Counter[str] = Counter()
+    original_read = FileContentCache._read
+
+    def counting_read(self, entry):
+        reads[entry.relative] += 1
+        return original_read(self, entry)
+
+    monkeypatch.setattr(FileContentCache, "_read", counting_read)
+    findings = scan_repository(repo, rules, ScanSettings(content_cache_max_bytes=total_bytes // 2))
+
+    assert findings == expected
+    assert len(reads) == 90
+    assert set(reads.values()) == {1}
+
+
+def test_ripgrep_runs_once_for_whole_ruleset(tmp_path: Path, monkeypatch):
+    repo = tmp_path / "rg-repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("import sklearn\nmodel.fit(X, y)\n", encoding="utf-8")
+    (repo / "big.py").write_text("import sklearn\n" * 100, encoding="utf-8")
+
+    calls: list[list[str]] = []
+    events = [
+        {"type": "begin", "data": {"path": {"text": "a.py"}}},
+        {"type": "match", "data": {"path": {"text": "a.py"}, "line_number": 2, "lines": {"text": "model.fit(X, y)\n"}}},
+        {"type": "match", "data": {"path": {"text": "a.py"}, "line_number": 1, "lines": {"text": "import sklearn\n"}}},
+    ]
+    monkeypatch.setattr(
+        "code_scanner.scanners.rules.subprocess.Popen",
+        _fake_ripgrep_popen(calls, events),
+    )
+    monkeypatch.setattr("code_scanner.scanners.rules.which", lambda name: "/usr/bin/rg")
+
+    rules = [
+        SignalRule("ML_SKLEARN_USAGE", "classical_ml", "medium", "sklearn", "\\bsklearn\\b", ignore_case=True),
+        SignalRule("ML_TRAINING_CALL", "model_lifecycle", "high", "fit", "\\.fit\\s*\\(", ignore_case=False),
+    ]
+    findings = run_rules_scan(repo, rules, max_file_size_bytes=100, max_files_per_repo=10)
+
+    assert len(calls) == 1
+    assert "(?i:\\bsklearn\\b)" in calls[0]
+    assert "\\.fit\\s*\\(" in calls[0]
+    assert calls[0][-2:] == ["--", "a.py"]
+    assert [(item.line_number, item.signal_code) for item in findings] == [
+        (1, "ML_SKLEARN_USAGE"),
+        (2, "ML_TRAINING_CALL"),
+    ]
+
+
+def test_ripgrep_caps_matches_per_rule(tmp_path: Path, monkeypatch):
+    repo = tmp_path / "noisy-repo"
+    repo.mkdir()
+    (repo / "predict.py").write_text("model.predict(X)\n" * 50, encoding="utf-8")
+
+    calls: list[list[str]] = []
+    events = [
+        {"type": "match", "data": {"path": {"text": "predict.py"}, "line_number": idx, "lines": {"text": "model.predict(X)\n"}}}
+        for idx in range(1, 51)
+    ]
+    monkeypatch.setattr("code_scanner.scanners.rules.which", lambda name: "/usr/bin/rg")
+    monkeypatch.setattr(
+        "code_scanner.scanners.rules.subprocess.Popen",
+        _fake_ripgrep_popen(calls, events),
+    )
+
+    rules = [SignalRule("ML_INFERENCE_CALL", "model_lifecycle", "medium", "predict", "\\.predict\\s*\\(")]
+    findings = run_rules_scan(
+        repo,
+        rules,
+        max_file_size_bytes=100_000,
+        max_files_per_repo=10,
+        max_matches_per_rule=5,
+    )
+
+    assert [item.line_number for item in findings] == [1, 2, 3, 4, 5]
+    # The cap keeps the first matches rg prints, so its output must come in a fixed order.
+    assert calls[0][calls[0].index("--sort") + 1] == "path"
+
+
+def _fake_ripgrep_popen(calls: list[list[str]], events: list[dict], rejects: Callable[[str], bool] | None = None):
+    class FakePopen:
+        def __init__(self, cmd, **kwargs):
+            calls.append(cmd)
+            patterns = [cmd[index + 1] for index, item in enumerate(cmd) if item == "-e"]
+            # Like rg: one pattern it cannot compile fails the whole run without output.
+            self.returncode = 2 if rejects is not None and any(map(rejects, patterns)) else 0
+            output = "" if self.returncode else "".join(json.dumps(item) + "\n" for item in events)
+            self.stdout = io.StringIO(output)
+
+        def poll(self):
+            return self.returncode
+
+        def kill(self):
+            pass
+
+        def wait(self):
+            return self.returncode
+
+    return FakePopen
+
+
+def test_rules_ripgrep_rejects_run_in_python(tmp_path: Path, monkeypatch):
+    repo = tmp_path / "lookaround-repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("import sklearn\nmodel.fit(X, y)\n", encoding="utf-8")
+
+    def rejects(pattern: str) -> bool:
+        return "(?<" in pattern
+
+    calls: list[list[str]] = []
+    events = [
+        {"type": "match", "data": {"path": {"text": "a.py"}, "line_number": 1, "lines": {"text": "import sklearn\n"}}},
+    ]
+    monkeypatch.setattr("code_scanner.scanners.rules.which", lambda name: "/usr/bin/rg")
+    monkeypatch.setattr("code_scanner.scanners.rules.subprocess.Popen", _fake_ripgrep_popen(calls, events, rejects))
+    monkeypatch.setattr("code_scanner.scanners.rules._ripgrep_accepts", lambda pattern: not rejects(pattern))
+    monkeypatch.setattr("code_scanner.scanners.rules._RG_REJECTED_PATTERNS", set())
+
+    rules = [
+        SignalRule("ML_SKLEARN_USAGE", "classical_ml", "medium", "sklearn", "\\bsklearn\\b", ignore_case=True),
+        SignalRule("ML_TRAINING_CALL", "model_lifecycle", "high", "fit", "(?<=model)\\.fit\\s*\\(", ignore_case=False),
+    ]
+    findings = run_rules_scan(repo, rules, max_file_size_bytes=1000, max_files_per_repo=10)
+    assert [(item.line_number, item.signal_code, item.detector) for item in findings] == [
+        (1, "ML_SKLEARN_USAGE", "rules_rg"),
+        (2, "ML_TRAINING_CALL", "rules_py"),
+    ]
+    # The rejected pattern is remembered, so later repos go straight to a single good rg run.
+    assert len(calls) == 2
+    run_rules_scan(repo, rules, max_file_size_bytes=1000, max_files_per_repo=10)
+    assert len(calls) == 3
+
+    # Any other rg failure falls back to the Python matcher for the whole ruleset.
+    monkeypatch.setattr("code_scanner.scanners.rules.subprocess.Popen", _fake_ripgrep_popen(calls, events, bool))
+    findings = run_rules_scan(repo, rules, max_file_size_bytes=1000, max_files_per_repo=10)
+    assert [(item.line_number, item.detector) for item in findings] == [(1, "rules_py"), (2, "rules_py")]
+
+
+def test_required_literals_extracts_alternatives():
+    assert required_literals("\\b(openai|OpenAI)\\b") == frozenset({"openai"})
+    assert required_literals("\\.fit\\s*\\(") == frozenset({".fit"})
+    assert required_literals("(joblib|pickle)\\.(dump|load)\\s*\\(|torch\\.(save|load)\\s*\\(") == frozenset(
+        {"joblib", "pickle", "torch."}
+    )
+    assert required_literals("\\w+\\s*=") is None
+
+
+def test_literal_prefilter_selects_only_possible_rules():
+    prefilter = LiteralPrefilter(["\\bsklearn\\b", "\\b(torch|pytorch)\\b", "\\d+"], [re.IGNORECASE, 0, 0])
+
+    assert prefilter.candidates("import numpy as np\n") == [2]
+    assert prefilter.candidates("import SKLEARN\nimport pytorch_lightning\n") == [0, 1, 2]
+
+    # re.IGNORECASE equates "İ" and "ı" with "i", which case folding does not.
+    dotted = LiteralPrefilter(["\\bpipeline\\b"], [re.IGNORECASE])
+    assert re.search("\\bpipeline\\b", "PİPELıNE", re.IGNORECASE)
+    assert dotted.candidates("PİPELıNE = make()\n") == [0]
+
+
+def test_literal_prefilter_without_usable_literals_keeps_every_rule(tmp_path: Path, monkeypatch):
+    prefilter = LiteralPrefilter(["\\bai\\b", "\\d+"], [re.IGNORECASE, 0])
+    assert prefilter.candidates("import numpy\n") == [0, 1]
+
+    # A parser-less interpreter extracts no literals at all; rules still scan normally.
+    monkeypatch.setattr("code_scanner.scanners.prefilter.sre_parse", None)
+    monkeypatch.setattr("code_scanner.scanners.engine.ripgrep_available", lambda: False)
+    (tmp_path / "app.py").write_text("use ai here\n", encoding="utf-8")
+    rules = [SignalRule("ML_AI_MENTION", "genai", "low", "ai", "\\bai\\b", ignore_case=True)]
+    findings = scan_repository(tmp_path, rules, ScanSettings())
+    assert [(item.file_path, item.line_number) for item in findings if item.signal_code == "ML_AI_MENTION"] == [
+        ("app.py", 1)
+    ]
+
+
+def test_find_matching_lines_matches_per_line_semantics():
+    text = "import a;\r\n\r\n  import b;\r\nCREATE\nMODEL m\nfit (x)\n"
+    patterns = [
+        re.compile(r"^\s*import\s+\w+;"),
+        re.compile(r"\bCREATE\s+MODEL\b"),
+        re.compile(r"\bfit\s*\("),
+        re.compile(r"(?<!\s)MODEL"),
+        re.compile(r"CREATE(?!\s)"),
+    ]
+
+    expected = [
+        (line_number, pattern_index, line)
+        for line_number, line in enumerate(text.splitlines(), start=1)
+        for pattern_index, pattern in enumerate(patterns)
+        if pattern.search(line)
+    ]
+
+    assert find_matching_lines(text, patterns) == expected
+    assert [item[0] for item in expected] == [1, 3, 4, 5, 6]
+
+
+def test_findings_cache_reuses_results_for_identical_blobs(tmp_path: Path, monkeypatch):
+    cache = FindingsCache(tmp_path / "findings_cache.db")
+    settings = ScanSettings(max_file_size_bytes=200_000, max_files_per_repo=1000)
+
+    def make_repo(name: str) -> Path:
+        repo = tmp_path / name
+        repo.mkdir()
+        (repo / "model.py").write_text("import sklearn\nmodel.fit(X, y)\n", encoding="utf-8")
+        for args in (["init", "-q"], ["add", "-A"]):
+            subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+        return repo
+
+    first = scan_repository(make_repo("original"), [], settings, findings_cache=cache)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("detector should not run on a cache hit")
+
+    monkeypatch.setattr("code_scanner.scanners.python_ast.run_python_ast_scan", fail)
+    second = scan_repository(make_repo("fork"), [], settings, findings_cache=cache)
+    cache.close()
+
+    assert {item.signal_code for item in first} == {"AST_SKLEARN_IMPORT", "AST_TRAIN_CALL"}
+    assert second == first
+
+
+def test_findings_cache_ignores_rule_results_truncated_by_cap(tmp_path: Path):
+    cache = FindingsCache(tmp_path / "findings_cache.db")
+    settings = ScanSettings(max_file_size_bytes=200_000, max_files_per_repo=1000, max_matches_per_rule=3)
+    rules = [SignalRule("ML_INFERENCE_CALL", "model_lifecycle", "medium", "predict", "\\.predict\\s*\\(")]
+    shared = "model.predict(a)\nmodel.predict(b)\nmodel.predict(c)\n"
+
+    def make_repo(name: str, files: dict[str, str]) -> Path:
+        repo = tmp_path / name
+        repo.mkdir()
+        for file_name, text in files.items():
+            (repo / file_name).write_text(text, encoding="utf-8")
+        for args in (["init", "-q"], ["add", "-A"]):
+            subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+        return repo
+
+    def predict_lines(findings):
+        return sorted(
+            (item.file_path, item.line_number) for item in findings if item.signal_code == "ML_INFERENCE_CALL"
+        )
+
+    first = scan_repository(
+        make_repo("capped", {"a.py": "model.predict(x)\nmodel.predict(y)\n", "shared.py": shared}),
+        rules,
+        settings,
+        findings_cache=cache,
+    )
+    second = scan_repository(make_repo("fork", {"shared.py": shared}), rules, settings, findings_cache=cache)
+    third = scan_repository(
+        make_repo("wider", {"shared.py": shared, "z.py": "model.predict(z)\n"}),
+        rules,
+        settings,
+        findings_cache=cache,
+    )
+    cache.close()
+
+    assert predict_lines(first) == [("a.py", 1), ("a.py", 2), ("shared.py", 1)]
+    assert predict_lines(second) == [("shared.py", 1), ("shared.py", 2), ("shared.py", 3)]
+    assert predict_lines(third) == [("shared.py", 1), ("shared.py", 2), ("shared.py", 3)]
+
+
+def test_object_store_scan_matches_worktree_scan(tmp_path: Path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "model.py").write_text("import sklearn\r\nmodel.fit(X, y)\r\n", encoding="utf-8")
+    (source / "big.py").write_text("import torch\n" + "#" * 500 + "\n", encoding="utf-8")
+    (source / "node_modules").mkdir()
+    (source / "node_modules" / "vendored.py").write_text("import sklearn\n", encoding="utf-8")
+    for args in (
+        ["init", "-q"],
+        ["config", "uploadpack.allowFilter", "true"],
+        ["add", "-A"],
+        ["-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-q", "-m", "initial"],
+    ):
+        subprocess.run(["git", "-C", str(source), *args], check=True, capture_output=True)
+
+    rules = [
+        SignalRule(
+            signal_code="ML_SKLEARN_USAGE",
+            category="classical_ml",
+            severity="medium",
+            description="sklearn usage",
+            pattern=r"\bsklearn\b",
+        )
+    ]
+    settings = ScanSettings(max_file_size_bytes=200, max_files_per_repo=1000)
+    repo = RepoDescriptor(
+        provider_name="test",
+        provider_type="github",
+        external_id="1",
+        full_name="org/source",
+        clone_url=source.as_uri(),
+        default_branch=None,
+        web_url=None,
+    )
+    synced = sync_repo(
+        repo,
+        cache_root=tmp_path / "cache",
+        use_token_for_clone=False,
+        mode="object_store",
+        blob_size_limit=settings.max_file_size_bytes,
+    )
+
+    assert synced.object_store
+    assert not (synced.repo_path / "model.py").exists()
+    missing = subprocess.run(
+        ["git", "-C", str(synced.repo_path), "rev-list", "--objects", "--missing=print", "HEAD"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert any(line.startswith("?") for line in missing.splitlines())
+
+    from_objects = scan_repository(synced.repo_path, rules, settings, object_store=True)
+    from_worktree = scan_repository(source, rules, settings)
+
+    assert from_objects == from_worktree
+    assert {(item.file_path, item.signal_code) for item in from_objects} == {
+        ("model.py", "ML_SKLEARN_USAGE"),
+        ("model.py", "AST_SKLEARN_IMPORT"),
+        ("model.py", "AST_TRAIN_CALL"),
+    }
+
+
+def test_file_workers_match_sequential_scan(tmp_path: Path, monkeypatch):
+    for index in range(40):
+        (tmp_path / f"mod_{index:02d}.py").write_text(
+            f"import sklearn\nmodel_{index}.fit(X, y)\n", encoding="utf-8"
+        )
+        (tmp_path / f"page_{index:02d}.ts").write_text("import OpenAI from 'openai';\n", encoding="utf-8")
+    rules = [
+        SignalRule(
+            signal_code="ML_SKLEARN_USAGE",
+            category="classical_ml",
+            severity="medium",
+            description="sklearn usage",
+            pattern=r"\bsklearn\b",
+        )
+    ]
+    monkeypatch.setattr("code_scanner.scanners.rules.which", lambda name: None)
+    monkeypatch.setattr("code_scanner.scanners.engine.MIN_FILES_PER_CHUNK", 5)
+
+    sequential = scan_repository(tmp_path, rules, ScanSettings(max_matches_per_rule=25))
+    parallel = scan_repository(tmp_path, rules, ScanSettings(max_matches_per_rule=25, file_workers=2))
+
+    assert parallel == sequential
+    assert sum(item.signal_code == "ML_SKLEARN_USAGE" for item in parallel) == 25